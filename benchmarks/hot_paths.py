@@ -0,0 +1,249 @@
+"""
+Microbenchmarks of the CPU-side hot loops - transforms and csv writing - on fixture payloads
+shaped like the Tempo API responses (the synthetic tenant of the tests).
+
+    python benchmarks/hot_paths.py [--sizes 10000,100000,1000000] [--repeat 3] [--case map_worklog_to_table]
+                                   [--out benchmarks/results] [--compare benchmarks/results/hot_paths-<version>.json]
+
+Cases:
+  map_worklog_to_table - worklogs._map_worklog_to_table on raw worklogs
+  transform_periods    - approvals._transform_periods_for_keboola (sha256 approval ids), 10 worklogs per approval
+  worklog_attributes   - TempoClient.worklog_attributes flattening of attribute search responses (500 worklogs each)
+  attribute_config     - TempoClient.attribute_config json re-encoding of attribute values
+  write_out_data       - Component.write_out_data (encoding.CsvEncoder, value tuples) of worklog rows
+  write_out_processes  - Component.write_out_data encoded by 4 worker processes in chunks of 1 000 rows
+  dict_writer          - csv.DictWriter of worklog rows (the writer before encoding.CsvEncoder)
+  primary_key_filter   - dedup.PrimaryKeyFilter of worklog rows (tempo id key, latest "updated" kept)
+
+Rows are processed in chunks of at most 10 000 (the fixture chunk is reused, the output of
+a chunk is dropped like a streamed page), so 1M rows do not need 1M fixtures in memory.
+Reported per case and size:
+  ns/row      - best of --repeat runs
+  peak B/row  - peak of memory allocated while one chunk is processed (tracemalloc), per row
+  blocks/row  - memory blocks still held by the output of one chunk, per row
+Results are written to <out>/hot_paths-<git describe or --label>.json, --compare prints the change
+against the results of another version (benchmarks/results keeps the results of released versions).
+"""
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+from typing import Any, Callable, Optional
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "src"))
+sys.path.insert(0, str(ROOT_DIR))
+
+import approvals  # noqa: E402
+import csv  # noqa: E402
+import dedup  # noqa: E402
+import encoding  # noqa: E402
+import tempo  # noqa: E402
+import worklogs  # noqa: E402
+from component import Component  # noqa: E402
+from tests.synthetic import SyntheticTempo  # noqa: E402
+
+CHUNK_ROWS = 10_000
+DEFAULT_SIZES = "10000,100000,1000000"
+RESULTS_DIR = ROOT_DIR / "benchmarks" / "results"
+
+_ATTRIBUTE_BATCH = 500
+_WORKLOGS_PER_APPROVAL = 10
+
+
+def _tenant() -> SyntheticTempo:
+    return SyntheticTempo(worklogs=CHUNK_ROWS, attributes_per_worklog=2)
+
+
+def _map_worklogs(rows: int) -> Callable[[], Any]:
+    raw = [_tenant().worklog(i) for i in range(rows)]
+    return lambda: [worklogs._map_worklog_to_table(wl) for wl in raw]
+
+
+def _transform_periods(rows: int) -> Callable[[], Any]:
+    tenant = _tenant()
+    periods = []
+    for i in range(rows // _WORKLOGS_PER_APPROVAL):
+        week = i % 52
+        periods.append({
+            "period": {"from": f"2024-{1 + week // 5:02d}-{1 + week % 5 * 5:02d}",
+                       "to": f"2024-{1 + week // 5:02d}-{5 + week % 5 * 5:02d}"},
+            "status": "APPROVED" if i % 2 else "OPEN",
+            "user": tenant.account_id(i),
+            "reviewer": tenant.account_id(i + 1),
+            "approved_by": tenant.account_id(i + 1) if i % 2 else "",
+            "worklogs": list(range(i * _WORKLOGS_PER_APPROVAL, (i + 1) * _WORKLOGS_PER_APPROVAL))
+        })
+    return lambda: approvals._transform_periods_for_keboola(periods, team_id=1)
+
+
+def _worklog_attributes(rows: int) -> Callable[[], Any]:
+    tenant = _tenant()
+    ids = list(range(1, _ATTRIBUTE_BATCH + 1))
+    payload = tenant.post("/worklogs/work-attribute-values/search", {"tempoWorklogIds": ids}).json()
+    client = tempo.TempoClient("benchmark-token")
+    client._checked_post = lambda endpoint, data: payload
+    calls = max(1, rows // (_ATTRIBUTE_BATCH * tenant.attributes_per_worklog))
+    return lambda: [client.worklog_attributes(ids) for _ in range(calls)]
+
+
+def _attribute_config(rows: int) -> Callable[[], Any]:
+    page = {
+        "metadata": {"count": rows},
+        "results": [
+            {"key": f"_attr{i}_", "name": f"Attribute {i}", "type": "STATIC_LIST",
+             "values": [f"value-{v}" for v in range(10)]} if i % 2 else
+            {"key": f"_attr{i}_", "name": f"Attribute {i}", "type": "INPUT_FIELD"}
+            for i in range(rows)
+        ]
+    }
+    client = tempo.TempoClient("benchmark-token")
+    client._checked_get = lambda endpoint, params=None, project=None: page
+    return client.attribute_config
+
+
+def _worklog_table(rows: int) -> tuple[list[dict], list[str], SimpleNamespace]:
+    tenant = _tenant()
+    data = [worklogs._map_worklog_to_table(tenant.worklog(i)) for i in range(rows)]
+    fieldnames = list(worklogs.column_definitions().keys())
+    directory = TemporaryDirectory()
+    table = SimpleNamespace(full_path=str(Path(directory.name) / "worklogs.csv"), directory=directory)
+    return data, fieldnames, table
+
+
+def _write_out_data(rows: int, encoder: Optional[encoding.CsvEncoder] = None) -> Callable[[], Any]:
+    data, fieldnames, table = _worklog_table(rows)
+    component = SimpleNamespace(write_manifest=lambda table: None)
+    # every chunk replaces the file, the disk use stays at one chunk
+    return lambda: Component.write_out_data(component, table, fieldnames, data, encoder=encoder)
+
+
+def _write_out_processes(rows: int) -> Callable[[], Any]:
+    # the pool lives until the benchmark exits, its start is part of the warm up
+    return _write_out_data(rows, encoding.CsvEncoder(processes=4, chunk_rows=1_000))
+
+
+def _dict_writer(rows: int) -> Callable[[], Any]:
+    data, fieldnames, table = _worklog_table(rows)
+
+    def write():
+        with open(table.full_path, "wt", newline="", encoding="utf-8") as out_file:
+            csv.DictWriter(out_file, fieldnames=fieldnames).writerows(data)
+    return write
+
+
+def _primary_key_filter(rows: int) -> Callable[[], Any]:
+    tenant = _tenant()
+    data = [worklogs._map_worklog_to_table(tenant.worklog(i)) for i in range(rows)]
+    # a new filter per chunk, every row is a new key
+    return lambda: list(dedup.PrimaryKeyFilter([worklogs._COL_ID], dedup.UPDATED_COLUMN).filter(data))
+
+
+CASES: dict[str, Callable[[int], Callable[[], Any]]] = {
+    "map_worklog_to_table": _map_worklogs,
+    "transform_periods": _transform_periods,
+    "worklog_attributes": _worklog_attributes,
+    "attribute_config": _attribute_config,
+    "write_out_data": _write_out_data,
+    "write_out_processes": _write_out_processes,
+    "dict_writer": _dict_writer,
+    "primary_key_filter": _primary_key_filter,
+}
+
+
+def measure(make_case: Callable[[int], Callable[[], Any]], rows: int, repeat: int) -> dict[str, float]:
+    chunk = min(rows, CHUNK_ROWS)
+    chunks = max(1, rows // chunk)
+    run = make_case(chunk)
+    run()  # warm up
+
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter_ns()
+        for _ in range(chunks):
+            run()
+        elapsed = time.perf_counter_ns() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    gc.collect()
+    tracemalloc.start()
+    blocks_before = sys.getallocatedblocks()
+    output = run()
+    blocks = sys.getallocatedblocks() - blocks_before
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del output
+    return {
+        "ns_per_row": round(best / (chunks * chunk), 1),
+        "peak_bytes_per_row": round(peak / chunk, 1),
+        "blocks_per_row": round(max(0, blocks) / chunk, 2),
+    }
+
+
+def version() -> str:
+    try:
+        result = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=ROOT_DIR,
+                                capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: dict, baseline: dict):
+    print(f"change against {baseline['version']} (ns/row, peak B/row):")
+    for case, sizes in results["results"].items():
+        for size, current in sizes.items():
+            previous = baseline["results"].get(case, {}).get(size)
+            if previous is None:
+                continue
+            time_change = (current["ns_per_row"] / previous["ns_per_row"] - 1) * 100
+            memory_change = (current["peak_bytes_per_row"] / max(previous["peak_bytes_per_row"], 1) - 1) * 100
+            print(f"  {case:22s} {int(size):>9,d}  {time_change:+7.1f} %  {memory_change:+7.1f} %")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma separated row counts")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--case", action="append", choices=sorted(CASES.keys()), help="default: all cases")
+    parser.add_argument("--out", default=str(RESULTS_DIR), help="directory of result files, empty = not written")
+    parser.add_argument("--compare", help="result file of another version")
+    parser.add_argument("--label", help="version of the results, default: git describe of the tree")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results = {
+        "version": args.label or version(),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}",
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": {}
+    }
+    print(f"{'case':22s} {'rows':>9s} {'ns/row':>10s} {'peak B/row':>11s} {'blocks/row':>11s}")
+    for case in args.case or CASES.keys():
+        for size in sizes:
+            result = measure(CASES[case], size, args.repeat)
+            results["results"].setdefault(case, {})[str(size)] = result
+            print(f"{case:22s} {size:>9,d} {result['ns_per_row']:>10.1f} {result['peak_bytes_per_row']:>11.1f}"
+                  f" {result['blocks_per_row']:>11.2f}")
+
+    if args.out:
+        out_dir = Path(args.out)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        path = out_dir / f"hot_paths-{results['version']}.json"
+        path.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"results written to {path}")
+    if args.compare:
+        compare(results, json.loads(Path(args.compare).read_text()))
+
+
+if __name__ == "__main__":
+    main()
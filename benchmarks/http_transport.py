@@ -0,0 +1,185 @@
+"""
+Transport benchmark - HTTP/1.1 (requests) vs HTTP/2 (httpx + h2) Tempo client
+on a local mock server, at high concurrency.
+
+    pip install hypercorn     (openssl is needed too, for a self-signed certificate)
+    python benchmarks/http_transport.py [--concurrency 32] [--latency-ms 50] [--handshake-ms 100] [--pool-size 10]
+
+The mock server (hypercorn over TLS - HTTP/1.1 or HTTP/2 through ALPN, in its own process)
+serves the synthetic Tempo tenant of the tests and answers every request after latency-ms.
+The first request of every connection waits handshake-ms more - the round trips of TCP + TLS
+setup to a remote API, which a local server does not have.
+Two workloads are run with every transport:
+  attributes - worklog attribute searches (POST, 400 worklogs each), `concurrency` at a time
+  approvals  - timesheet approvals of a period with their worklog links (GET), `concurrency` teams at a time
+Reported are wall time, requests per second and the number of TCP connections the server accepted.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from urllib.parse import parse_qsl
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "src"))
+sys.path.insert(0, str(ROOT_DIR))
+
+import requests  # noqa: E402
+import tempo  # noqa: E402
+import transport  # noqa: E402
+from tests.synthetic import SyntheticTempo  # noqa: E402
+
+_STATS_PATH = "/_stats"
+
+
+def tenant(teams: int) -> SyntheticTempo:
+    return SyntheticTempo(worklogs=20_000, teams=teams, members_per_team=8, start=date.today() - timedelta(days=30))
+
+
+def serve(port: int, latency_sec: float, handshake_sec: float, teams: int, cert_dir: str):
+    """ runs the mock server until killed, GET /_stats returns and resets the accepted connections """
+    from hypercorn.asyncio import serve as hypercorn_serve
+    from hypercorn.config import Config
+
+    synthetic = tenant(teams)
+    synthetic.base_url = f"https://127.0.0.1:{port}"
+    connections: set[tuple] = set()
+
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        if tuple(scope["client"]) not in connections:
+            connections.add(tuple(scope["client"]))
+            await asyncio.sleep(handshake_sec)
+        if scope["path"] == _STATS_PATH:
+            status, payload = 200, json.dumps({"connections": len(connections) - 1}).encode()
+            connections.clear()
+        else:
+            await asyncio.sleep(latency_sec)
+            params = dict(parse_qsl(scope["query_string"].decode()))
+            if scope["method"] == "POST":
+                response = synthetic.post(scope["path"], json.loads(body))
+            else:
+                response = synthetic.get(scope["path"], params)
+            status, payload = response.status_code, response.content
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": payload})
+
+    config = Config()
+    config.bind = [f"127.0.0.1:{port}"]
+    config.loglevel = "ERROR"
+    config.h2_max_concurrent_streams = 1_000
+    config.keep_alive_max_requests = 1_000_000
+    config.certfile = os.path.join(cert_dir, "cert.pem")
+    config.keyfile = os.path.join(cert_dir, "key.pem")
+    asyncio.run(hypercorn_serve(app, config))
+
+
+class MockServer:
+    """
+    the mock server in a child process, its self-signed certificate is trusted
+    by both transports (REQUESTS_CA_BUNDLE / SSL_CERT_FILE) while the server runs
+    """
+
+    def __init__(self, latency_sec: float, handshake_sec: float, teams: int):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.url = f"https://127.0.0.1:{self.port}"
+        self._cert_dir = TemporaryDirectory(prefix="tempo-benchmark-")
+        self._args = [sys.executable, __file__, "--serve", str(self.port),
+                      "--latency-ms", str(latency_sec * 1000), "--handshake-ms", str(handshake_sec * 1000),
+                      "--teams", str(teams), "--cert-dir", self._cert_dir.name]
+
+    def __enter__(self):
+        cert = os.path.join(self._cert_dir.name, "cert.pem")
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                        "-keyout", os.path.join(self._cert_dir.name, "key.pem"), "-out", cert,
+                        "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1"],
+                       check=True, capture_output=True)
+        os.environ["REQUESTS_CA_BUNDLE"] = cert
+        os.environ["SSL_CERT_FILE"] = cert
+        # hypercorn logs TLS shutdown races of closed client connections
+        self._process = subprocess.Popen(self._args, stderr=subprocess.DEVNULL)
+        for _ in range(100):
+            try:
+                self.connections()
+                return self
+            except requests.ConnectionError:
+                time.sleep(0.1)
+        raise RuntimeError("mock server did not start")
+
+    def __exit__(self, *exc):
+        self._process.kill()
+        self._process.wait()
+        self._cert_dir.cleanup()
+
+    def connections(self) -> int:
+        """ connections accepted since the previous call """
+        return requests.get(f"{self.url}{_STATS_PATH}", headers={"Connection": "close"}).json()["connections"]
+
+
+def attributes(client: tempo.TempoClient, concurrency: int, batches: int) -> int:
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda b: client.worklog_attributes(list(range(b * 400, (b + 1) * 400))), range(batches)))
+    return batches
+
+
+def approvals(client: tempo.TempoClient, concurrency: int, teams: int) -> int:
+    period = str(date.today() - timedelta(days=7))
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda team: client.team_timesheet_approvals(team, period), range(1, teams + 1)))
+    return teams + sum(len(team_approvals) for team_approvals in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--handshake-ms", type=float, default=100)
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--batches", type=int, default=200, help="attribute searches")
+    parser.add_argument("--teams", type=int, default=100)
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--cert-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve is not None:
+        serve(args.serve, args.latency_ms / 1000, args.handshake_ms / 1000, args.teams, args.cert_dir)
+        return
+    if not transport.http2_available():
+        sys.exit("httpx and h2 are required: pip install 'httpx[http2]'")
+
+    print(f"concurrency {args.concurrency}, pool size {args.pool_size}, server latency {args.latency_ms} ms,"
+          f" connection setup {args.handshake_ms} ms")
+    print(f"{'workload':<12}{'transport':<10}{'requests':>10}{'wall [s]':>10}{'req/s':>10}{'connections':>13}")
+    with MockServer(args.latency_ms / 1000, args.handshake_ms / 1000, args.teams) as server:
+        for name, workload, size in (("attributes", attributes, args.batches), ("approvals", approvals, args.teams)):
+            for http_transport in (transport.TRANSPORT_REQUESTS, transport.TRANSPORT_HTTP2):
+                tempo_client = tempo.TempoClient("benchmark-token", base_url=server.url, pool_size=args.pool_size,
+                                                 http_transport=http_transport)
+                server.connections()
+                started = time.perf_counter()
+                requests_sent = workload(tempo_client, args.concurrency, size)
+                elapsed = time.perf_counter() - started
+                tempo_client.close()
+                print(f"{name:<12}{http_transport:<10}{requests_sent:>10}{elapsed:>10.2f}"
+                      f"{requests_sent / elapsed:>10.0f}{server.connections():>13}")
+
+
+if __name__ == "__main__":
+    main()
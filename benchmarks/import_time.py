@@ -0,0 +1,84 @@
+"""
+Startup benchmark - import time of the component and cost of parsing 'since'.
+
+    python benchmarks/import_time.py [--runs 5] [--top 15]
+
+Every run imports the component in a fresh interpreter with -X importtime
+and reports the median cumulative import time together with the slowest
+direct imports of the component in the median run.
+"""
+from pathlib import Path
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+
+def import_times(module: str) -> dict[str, int]:
+    """ returns { [module or its direct import]: cumulative import time in us } of one fresh interpreter """
+    code = f"import sys; sys.path.insert(0, {str(SRC_DIR)!r}); import {module}"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True, check=True)
+    times = {}
+    children = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # nesting is indented by two spaces, imports are listed before the module importing them
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children[name.strip()] = int(cumulative)
+        elif depth == 0:
+            if name.strip() == module:
+                times = {module: int(cumulative), **children}
+            children = {}
+    return times
+
+
+def parse_times(values: list[str]) -> list[tuple[str, float, float]]:
+    """ returns [(since, first call ms, next call ms), ...] measured in a fresh interpreter """
+    code = (
+        f"import sys, time; sys.path.insert(0, {str(SRC_DIR)!r}); import dates\n"
+        "for value in sys.argv[1:]:\n"
+        "    started = time.perf_counter(); dates.parse_since(value); first = time.perf_counter() - started\n"
+        "    started = time.perf_counter(); dates.parse_since(value); second = time.perf_counter() - started\n"
+        "    print(f'{value}|{first * 1000}|{second * 1000}')\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code, *values], capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stdout.splitlines():
+        value, first, second = line.split("|")
+        rows.append((value, float(first), float(second)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    runs = [import_times("component") for _ in range(args.runs)]
+    totals = [run["component"] for run in runs]
+    median_run = sorted(runs, key=lambda run: run["component"])[len(runs) // 2]
+    print(f"import component: median {statistics.median(totals) / 1000:.1f} ms,"
+          f" min {min(totals) / 1000:.1f} ms, max {max(totals) / 1000:.1f} ms ({args.runs} runs)")
+    print("slowest imports of the component (median run):")
+    slowest = sorted(median_run.items(), key=lambda item: item[1], reverse=True)[1:args.top + 1]
+    for name, cumulative in slowest:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    print("parse 'since' (first call includes lazy imports):")
+    for value, first, second in parse_times(["2 days ago", "2024-01-01", "3 months, 1 week and 1 day ago"]):
+        print(f"  {first:8.2f} ms / {second:6.2f} ms  {value!r}")
+    print(f"benchmark took {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,20 @@
 #!/usr/bin/env python3.10
 from keboola.component.dao import BaseType, ColumnDefinition, SupportedDataTypes, logging
 from datetime import datetime, timedelta
-from dateutil import relativedelta
+import deferred
 import tempo
+import tracing
+from progress import Progress
+from worklog_index import WorklogIndex
 import hashlib
-from typing import Optional
+from functools import partial
+from typing import Callable, Optional
 
 
 FILENAME_APPROVALS = "approvals.csv"
 FILENAME_APPROVAL_WORKLOGS = "approval_worklogs.csv"
 LOAD_JIRA_WORKLOGS = True
 LOAD_TEMPO_WORKLOGS = False
-READ_UNTIL_DATE = datetime.now() + relativedelta.relativedelta(months=1, day=1)
 
 
 _TABLE_APPROVALS = "approvals"
@@ -96,62 +99,105 @@ def table_column_definitions() -> dict[str, dict[str, ColumnDefinition]]:
         }}
 
 
-def run(since: datetime, worklog_data_source: bool) -> tuple[list[dict], list[dict]]:
+def run(client: tempo.TempoClient,
+        since: datetime,
+        worklog_data_source: bool,
+        on_team: Optional[Callable[[list[dict], list[dict]], None]] = None,
+        worklog_index: Optional[WorklogIndex] = None,
+        queue: Optional[deferred.DeferredQueue] = None) -> tuple[list[dict], list[dict]]:
     """
+    client: TempoClient
     since: datetime
     data_source: bool - LOAD_JIRA_WORKLOGS | LOAD_TEMPO_WORKLOGS,
                 determines type of identifier for worklogs (jira_id or tempo_id)
+    on_team: Optional[Callable] - streams (approvals, approval_worklogs) of every team instead of returning them
+    worklog_index: Optional[WorklogIndex] - worklogs downloaded in this run, approval worklogs found there
+                are not loaded from the API
+    queue: Optional[DeferredQueue] - teams failing with an API error are deferred to it instead of failing the run
 
     returns tupple(approvals, approval_worklogs)
     """
     logging.info("Started to download timesheet approvals")
     # Load Team info
-    all_teams = tempo.teams()
+    all_teams = client.teams()
     if all_teams is None:
         return ([], [])
     result: dict[str, list] = {
         "approvals": [],
         "approval_worklogs": []
     }
+    progress = Progress("timesheet approvals", total=len(all_teams), unit="teams")
+    read_until = read_until_date()
+    resolve_worklogs = worklog_index.resolve if worklog_index is not None else None
+    on_approval_worklogs = worklog_index.learn if worklog_index is not None else None
+    resolved, missed = (worklog_index.resolved, worklog_index.missed) if worklog_index is not None else (0, 0)
+
+    def load_team(team: dict):
+        with client.tracer.span("team", tracing.CAT_UNIT, team_id=team['id']):
+            # Load Approvals per team
+            raw_out: list[dict] = []
+            period_start_date = since
+            while period_start_date < read_until:
+                with client.tracer.span("period", tracing.CAT_UNIT,
+                                        team_id=team['id'], period_from=str(period_start_date.date())) as span:
+                    period = client.team_timesheet_approvals(team['id'],
+                                                             str(period_start_date.date()),
+                                                             worklog_source=worklog_data_source,
+                                                             progress=progress,
+                                                             resolve_worklogs=resolve_worklogs,
+                                                             on_approval_worklogs=on_approval_worklogs)
+                    span["approvals"] = len(period)
+                """
+                if period is None:
+                    logging.warning("Period is None - retry 5 times")
+                    logging.warning(f"(team: {team['id']} - {team['name']}; "
+                                    f"period_start: {str(period_start_date.date())})")
+                    # sometimes call fails for no apparent reason so retry if failed
+                    for i in range(5):
+                        time.sleep(10)
+                        period = tempo.team_timesheet_approvals(team['id'],
+                                                                str(period_start_date.date()),
+                                                                worklog_source=worklog_data_source)
+                        if period is not None:
+                            break
+                        logging.warning(f"team:{team['id']} Retry number {i+1} / 5")
+                        if i == 4:
+                            logging.error(f"Retrying approvals failed. Skipping team {team['id']}...")
+                if period is None:
+                    break
+                """
+                raw_out.extend(period)
+                next_period_start_date = _next_period_start_from_current(period)
+                if next_period_start_date is None:
+                    logging.debug("period_start_date is None increment manually (+1week)")
+                    next_period_start_date = period_start_date + timedelta(weeks=1)
+                period_start_date = next_period_start_date
+            appr, appr_worklogs = _transform_periods_for_keboola(all_periods=raw_out, team_id=team['id'])
+            if on_team is not None:
+                on_team(appr, appr_worklogs)
+            else:
+                result['approvals'].extend(appr)
+                result['approval_worklogs'].extend(appr_worklogs)
+
     for team in all_teams:
-        # Load Approvals per team
-        raw_out: list[dict] = []
-        period_start_date = since
-        while period_start_date < READ_UNTIL_DATE:
-            period = tempo.team_timesheet_approvals(team['id'],
-                                                    str(period_start_date.date()),
-                                                    worklog_source=worklog_data_source)
-            """
-            if period is None:
-                logging.warning("Period is None - retry 5 times")
-                logging.warning(f"(team: {team['id']} - {team['name']}; period_start: {str(period_start_date.date())})")
-                # sometimes call fails for no apparent reason so retry if failed
-                for i in range(5):
-                    time.sleep(10)
-                    period = tempo.team_timesheet_approvals(team['id'],
-                                                            str(period_start_date.date()),
-                                                            worklog_source=worklog_data_source)
-                    if period is not None:
-                        break
-                    logging.warning(f"team:{team['id']} Retry number {i+1} / 5")
-                    if i == 4:
-                        logging.error(f"Retrying approvals failed. Skipping team {team['id']}...")
-            if period is None:
-                break
-            """
-            raw_out.extend(period)
-            next_period_start_date = _next_period_start_from_current(period)
-            if next_period_start_date is None:
-                logging.debug("period_start_date is None increment manually (+1week)")
-                next_period_start_date = period_start_date + timedelta(weeks=1)
-            period_start_date = next_period_start_date
-        appr, appr_worklogs = _transform_periods_for_keboola(all_periods=raw_out, team_id=team['id'])
-        result['approvals'].extend(appr)
-        result['approval_worklogs'].extend(appr_worklogs)
+        deferred.run_unit(queue, f"team {team['id']}", partial(load_team, team))
+        progress.unit_done()
+    if queue is not None:
+        queue.retry()
+    progress.finish()
+    if worklog_index is not None:
+        logging.info(f"worklogs of {worklog_index.resolved - resolved} approvals found in downloaded worklogs, "
+                     f"{worklog_index.missed - missed} loaded from the API")
     logging.info("Finished loading timesheet approvals")
     return (result['approvals'], result['approval_worklogs'])
 
 
+def read_until_date(now: Optional[datetime] = None) -> datetime:
+    """ approvals are loaded until the first day of the next month """
+    now = now if now is not None else datetime.now()
+    return (now.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
 def _next_period_start_from_current(approvals: list[dict]) -> Optional[datetime]:
     if len(approvals) == 0:
         return
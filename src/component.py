@@ -1,19 +1,35 @@
-import csv
 import logging
 
 from keboola.component.dao import TableDefinition
 import approvals
 import team_membership
 import wl_attributes
+import timesheet
 import worklogs
 import tempo
-import jirac as jc
-import dateparser as dp
-from datetime import datetime
-from keboola.component.base import ComponentBase
+import jirac
+import profiling
+import tracing
+import paging
+import dates
+import deferred
+import planning
+import refresh
+import transport
+from datetime import date, datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterable, Optional
+from keboola.component.base import ComponentBase, sync_action
 from keboola.component.exceptions import UserException
+from keboola.component.sync_actions import MessageType, ValidationResult
 
-from configuration import Configuration
+from configuration import Configuration, BatchConfiguration
+from encoding import CsvEncoder
+from output import TableWriter
+from row_hash import RowHashStore
+from refresh import RefreshSchedule
+from staging import StagedTableWriter
+from worklog_index import WorklogIndex
 
 
 class Component(ComponentBase):
@@ -34,194 +50,435 @@ class Component(ComponentBase):
         """
         Main execution code
         """
-        # check for missing configuration parameters
-        params = Configuration(**self.configuration.parameters)
+        parameters = self.configuration.parameters
+        state = self.get_state_file()
+        if "tenants" in parameters:
+            self._run_batch(BatchConfiguration(**parameters), state)
+        else:
+            # check for missing configuration parameters
+            params = Configuration(**parameters)
+            self._run_tenant(params, state)
+        # only after a successful run - row hashes and the attribute index mark rows as loaded when they are
+        # written, the tables of a failed run are not imported and its rows must not be skipped by the next run
+        self.write_state_file(state)
 
-        # initialize modules
-        auth_tpl = (params.user_email, params.jira_token)
-        jc.init(params.org_name, auth_tpl)
-        tempo.init(params.tempo_token)
+    def _run_batch(self, batch: BatchConfiguration, state: dict):
+        """
+        Extracts several Tempo organisations in one process.
+        Tenants run concurrently on a shared pool of batch.max_workers threads,
+        each tenant may have at most batch.tenant_concurrency requests in flight
+        and writes its tables / files with "<tenant name>_" prefix.
+        State of every tenant is kept in state["tenants"][<tenant name>].
+        """
+        failed: dict[str, Exception] = {}
+        tenant_states = state.setdefault("tenants", {})
+        with ThreadPoolExecutor(max_workers=batch.max_workers, thread_name_prefix="tenant") as pool:
+            futures = {
+                pool.submit(
+                    self._run_tenant, params, tenant_states.setdefault(name, {}), name, batch.tenant_concurrency
+                ): name
+                for name, params in batch.tenant_configurations().items()
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    future.result()
+                    logging.info(f"[{name}] extraction finished")
+                except Exception as exc:
+                    logging.exception(f"[{name}] extraction failed")
+                    failed[name] = exc
+        if len(failed) > 0:
+            raise Exception(f"extraction failed for tenants: {', '.join(sorted(failed.keys()))}")
+
+    def _run_tenant(self,
+                    params: Configuration,
+                    state: dict,
+                    namespace: str = "",
+                    max_in_flight: Optional[int] = None):
+        """
+        extracts all selected datasets of one Tempo organisation,
+        the client is closed and the trace of the run is written also when the extraction fails
 
+        state: dict - state of this tenant, modified in place
+        namespace: str - prefix of output tables and files, empty for single tenant runs
+        max_in_flight: Optional[int] - max concurrent requests of this tenant
+        """
+        prefix = f"{namespace}_" if len(namespace) > 0 else ""
+        tracer = tracing.Tracer(
+            enabled=params.tracing or tracing.enabled_by_env(),
+            out_dir=self.files_out_path,
+            prefix=prefix
+        )
+        encoder = CsvEncoder(params.encode_processes)
+        # initialize api clients
+        tempo_client = tempo.TempoClient(
+            params.tempo_token,
+            pool_size=params.pool_size,
+            keep_alive=params.keep_alive,
+            session_per_thread=params.session_per_thread,
+            max_in_flight=self._max_in_flight(params, max_in_flight),
+            hedge_requests=params.hedge_requests,
+            circuit_breaker=params.circuit_breaker,
+            page_sizer=paging.PageSizer(state) if params.adaptive_paging else None,
+            stream_json=params.stream_json,
+            http_transport=self._http_transport(params),
+            tracer=tracer
+        )
+        try:
+            with tracer.span("run", tracing.CAT_RUN, tenant=namespace, datasets=params.datasets):
+                self._extract_tenant(params, state, prefix, tempo_client, tracer, encoder)
+        finally:
+            tempo_client.close()
+            encoder.close()
+            tracer.write()
+
+    def _extract_tenant(self,
+                        params: Configuration,
+                        state: dict,
+                        prefix: str,
+                        tempo_client: tempo.TempoClient,
+                        tracer: tracing.Tracer,
+                        encoder: CsvEncoder):
         since_date = self._parse_since_to_datetime(params.since)
+        memberships_active_on = self._parse_memberships_active_on(params.memberships_active_on)
+        profiler = profiling.StageProfiler(
+            enabled=params.profiling or profiling.enabled_by_env(),
+            out_dir=self.files_out_path,
+            prefix=prefix
+        )
+        writer_type = StagedTableWriter if params.staging == "sqlite" else TableWriter
+        writer = writer_type(
+            self,
+            prefix,
+            params.incremental,
+            row_hashes=RowHashStore(state, params.change_detection),
+            deduplicate=params.deduplicate,
+            encoder=encoder
+        )
+        refresh_schedule = RefreshSchedule(state, params.refresh_minutes)
+        datasets = refresh_schedule.select(params.datasets)
+        # failing teams / batches / partitions are retried at the end of their stage and reported, not raised
+        failures = deferred.FailureLog(params.deferred_retries) if params.isolate_failures else None
+
+        def queue(dataset: str) -> Optional[deferred.DeferredQueue]:
+            return failures.queue(dataset) if failures is not None else None
+
+        def extracted(dataset: str, reference_data=None):
+            # a dataset with failed units is extracted again by the next run
+            if failures is None or not failures.failed(dataset):
+                refresh_schedule.extracted(dataset, reference_data)
 
         # worklog authors
         # deprecated - should not be used
         """
         if "worklog_authors" in params.datasets:
             since_mls = int(since_date.timestamp()) * 1_000
-            data = worklog_author.run(since_mls)
+            jira_client = jirac.JiraClient(params.org_name, (params.user_email, params.jira_token))
+            data = worklog_author.run(tempo_client, jira_client, since_mls)
             if data is not None and len(data) > 0:
-                coldef = worklog_author.column_definitions()
-                table = self.create_out_table_definition(
-                    worklog_author.FILENAME,
-                    incremental=params.incremental,
-                    schema=coldef
-                )
-                self.write_out_data(table, list(coldef.keys()), data)
+                writer.write(worklog_author.FILENAME, worklog_author.column_definitions(), data)
             else:
                 raise Exception("no worklog_author")
         """
 
         # Worklogs
         worklogs_data = []
-        if "worklogs" in params.datasets:
-            data = worklogs.run(since_date)
-            worklogs_data = data
-            if data is not None and len(data) > 0:
-                coldef = worklogs.column_definitions()
-                table = self.create_out_table_definition(
-                    worklogs.FILENAME,
-                    incremental=params.incremental,
-                    schema=coldef
+        accumulator = None
+        if "timesheet" in datasets and "worklogs" in datasets:
+            accumulator = timesheet.TimesheetAccumulator(since_date)
+        # approval worklogs are looked up in the downloaded worklogs before paging them from the API
+        worklog_index = None
+        if "worklogs" in datasets and any(d in datasets for d in ("approvals_jira", "approvals_tempo")):
+            worklog_index = WorklogIndex()
+        # team membership is loaded at most once, the accounts strategy needs it before the teams stage
+        teams_data = None
+        if "worklogs" in datasets:
+            partitions = None
+            if params.worklogs_strategy == worklogs.STRATEGY_ACCOUNTS:
+                if "teams" in params.datasets and "teams" not in datasets and memberships_active_on is None:
+                    teams_data = refresh_schedule.cached("teams")
+                if teams_data is None:
+                    with profiler.stage("worklog_partitions"), tracer.span("worklog_partitions", tracing.CAT_DATASET):
+                        # all memberships - accounts of inactive members still have worklogs since
+                        teams_data = team_membership.run(tempo_client, params.teams_workers,
+                                                         queue=queue("worklogs"))
+                partitions = team_membership.account_ids(teams_data)
+                logging.warning("worklogs of accounts that are not members of any team are not loaded")
+            elif params.worklogs_strategy == worklogs.STRATEGY_PROJECTS:
+                with profiler.stage("worklog_partitions"), tracer.span("worklog_partitions", tracing.CAT_DATASET):
+                    jira_client = jirac.JiraClient(params.org_name, (params.user_email, params.jira_token))
+                    try:
+                        partitions = jira_client.project_ids()
+                    finally:
+                        jira_client.close()
+                if partitions is None:
+                    raise Exception("no projects")
+                logging.warning("worklogs of archived projects are not loaded")
+            with profiler.stage("worklogs"), tracer.span("worklogs", tracing.CAT_DATASET):
+                write_worklogs = writer.sink(worklogs.FILENAME, worklogs.column_definitions())
+
+                def on_worklog_page(page: list[dict]):
+                    # staged worklogs are read back from the staging store by the attribute stage
+                    if not writer.staged:
+                        worklogs_data.extend(page)
+                    write_worklogs(page)
+                    if accumulator is not None:
+                        accumulator.add_page(page)
+                    if worklog_index is not None:
+                        worklog_index.add_page(page)
+                worklogs.run(
+                    tempo_client,
+                    since_date,
+                    on_worklog_page,
+                    strategy=params.worklogs_strategy,
+                    partitions=partitions,
+                    max_workers=params.worklogs_workers,
+                    queue=queue("worklogs")
                 )
-                self.write_out_data(table, list(coldef.keys()), data)
-            else:
-                raise Exception("no worklogs")
+                if writer.row_count(worklogs.FILENAME) == 0:
+                    raise Exception("no worklogs")
+            extracted("worklogs")
 
         # Worklog attributes
-        if "worklogs" in params.datasets and "worklog_attributes" in params.datasets:
-            logging.debug("worklog attributes")
-            data = wl_attributes.run(worklogs_data)
-            coldefs = wl_attributes.column_definitions()
-            # attribute data
-            attributes = data[wl_attributes._TABLE_WL_ATTR]
-            if attributes is not None and len(attributes) > 0:
-                table = self.create_out_table_definition(
-                    wl_attributes.FILENAME_WL_ATTR,
-                    incremental=params.incremental,
-                    schema=coldefs[wl_attributes._TABLE_WL_ATTR]
-                )
-                self.write_out_data(
-                        table=table,
-                        fieldnames=list(coldefs[wl_attributes._TABLE_WL_ATTR].keys()),
-                        data=attributes
+        if "worklogs" in datasets and "worklog_attributes" in datasets:
+            with profiler.stage("worklog_attributes"), tracer.span("worklog_attributes", tracing.CAT_DATASET):
+                logging.debug("worklog attributes")
+                coldefs = wl_attributes.column_definitions()
+                index = self._attribute_index(params, state, since_date)
+                source_columns = [worklogs._COL_ID, worklogs._COL_UPDATED]
+                source = writer.staged_worklogs(source_columns) if writer.staged else worklogs_data
+                load_config = refresh_schedule.due(refresh.ATTRIBUTE_CONFIG)
+                data = wl_attributes.run(
+                    tempo_client,
+                    source,
+                    writer.sink(wl_attributes.FILENAME_WL_ATTR, coldefs[wl_attributes._TABLE_WL_ATTR]),
+                    index,
+                    load_config=load_config,
+                    queue=queue("worklog_attributes")
                 )
-            else:
-                logging.warning("no worklog attributes")
-            # attribute configs
-            configs = data[wl_attributes._TABLE_WL_ATTR_CONFIG]
-            if configs is not None and len(configs) > 0:
-                table = self.create_out_table_definition(
-                    wl_attributes.FILENAME_WL_ATTR_CONFIG,
-                    incremental=params.incremental,
-                    schema=coldefs[wl_attributes._TABLE_WL_ATTR_CONFIG]
-                )
-                self.write_out_data(
-                        table=table,
-                        fieldnames=list(coldefs[wl_attributes._TABLE_WL_ATTR_CONFIG].keys()),
-                        data=configs
-                )
-            else:
-                logging.warning("no attribute configs")
+                # attribute data
+                if writer.row_count(wl_attributes.FILENAME_WL_ATTR) == 0 and index is None:
+                    logging.warning("no worklog attributes")
+                # attribute configs
+                configs = data[wl_attributes._TABLE_WL_ATTR_CONFIG]
+                if not load_config:
+                    logging.info("attribute configs are fresh - not loaded")
+                elif configs is None or len(configs) == 0:
+                    logging.warning("no attribute configs")
+                elif index is not None and not index.config_changed(configs):
+                    logging.info("attribute configs unchanged since the previous run")
+                else:
+                    writer.write(
+                        wl_attributes.FILENAME_WL_ATTR_CONFIG,
+                        coldefs[wl_attributes._TABLE_WL_ATTR_CONFIG],
+                        configs
+                    )
+                    if index is not None:
+                        index.mark_config(configs)
+                if load_config:
+                    extracted(refresh.ATTRIBUTE_CONFIG)
+            extracted("worklog_attributes")
 
         # Approvals (Jira)
-        if "approvals_jira" in params.datasets:
-            logging.warning("this dataset is deprecated and should not be used")
-            logging.debug("approvals")
-            approvals_data, appr_worklogs_data = approvals.run(since_date, approvals.LOAD_JIRA_WORKLOGS)
-            coldefs = approvals.table_column_definitions()
-            if approvals_data is not None and len(approvals_data) > 0:
-                table = self.create_out_table_definition(
-                    approvals.FILENAME_APPROVALS,
-                    incremental=params.incremental,
-                    schema=coldefs[approvals._TABLE_APPROVALS]
-                )
-                self.write_out_data(table, list(coldefs[approvals._TABLE_APPROVALS].keys()), approvals_data)
-            else:
-                raise Exception("no approvals")
-            if appr_worklogs_data is not None and len(appr_worklogs_data) > 0:
-                table = self.create_out_table_definition(
-                    approvals.FILENAME_APPROVAL_WORKLOGS,
-                    incremental=params.incremental,
-                    schema=coldefs[approvals._TABLE_APPROVAL_WORKLOGS]
-                )
-                self.write_out_data(
-                    table,
-                    list(coldefs[approvals._TABLE_APPROVAL_WORKLOGS].keys()),
-                    appr_worklogs_data
-                )
-            else:
-                raise Exception("no appr_worklogs_data")
+        if "approvals_jira" in datasets:
+            with profiler.stage("approvals_jira"), tracer.span("approvals_jira", tracing.CAT_DATASET):
+                logging.warning("this dataset is deprecated and should not be used")
+                logging.debug("approvals")
+                self._run_approvals(tempo_client, writer, since_date, approvals.LOAD_JIRA_WORKLOGS, worklog_index,
+                                    queue("approvals_jira"))
+            extracted("approvals_jira")
 
         # Approvals (Tempo)
-        if "approvals_tempo" in params.datasets:
-            logging.debug("approvals tempo")
-            approvals_data, appr_worklogs_data = approvals.run(since_date, approvals.LOAD_TEMPO_WORKLOGS)
-            coldefs = approvals.table_column_definitions()
-            if approvals_data is not None and len(approvals_data) > 0:
-                table = self.create_out_table_definition(
-                    approvals.FILENAME_APPROVALS,
-                    incremental=params.incremental,
-                    schema=coldefs[approvals._TABLE_APPROVALS]
-                )
-                self.write_out_data(table, list(coldefs[approvals._TABLE_APPROVALS].keys()), approvals_data)
-            else:
-                raise Exception("no approvals")
-            if appr_worklogs_data is not None and len(appr_worklogs_data) > 0:
-                table = self.create_out_table_definition(
-                    approvals.FILENAME_APPROVAL_WORKLOGS,
-                    incremental=params.incremental,
-                    schema=coldefs[approvals._TABLE_APPROVAL_WORKLOGS]
-                )
-                self.write_out_data(
-                    table,
-                    list(coldefs[approvals._TABLE_APPROVAL_WORKLOGS].keys()),
-                    appr_worklogs_data
-                )
-            else:
-                raise Exception("no appr_worklogs_data")
+        if "approvals_tempo" in datasets:
+            with profiler.stage("approvals_tempo"), tracer.span("approvals_tempo", tracing.CAT_DATASET):
+                logging.debug("approvals tempo")
+                self._run_approvals(tempo_client, writer, since_date, approvals.LOAD_TEMPO_WORKLOGS, worklog_index,
+                                    queue("approvals_tempo"))
+            extracted("approvals_tempo")
 
         # Teams & Membership
-        if "teams" in params.datasets:
-            logging.debug("teams")
-            teams_data = team_membership.run()
-            coldefs = team_membership.table_column_definitions()
-            teams = teams_data[team_membership._TABLE_TEAMS]
-            if teams is not None and len(teams) > 0:
-                table = self.create_out_table_definition(
-                    team_membership.FILENAME_TEAMS,
-                    incremental=params.incremental,
-                    schema=coldefs[team_membership._TABLE_TEAMS]
-                )
-                self.write_out_data(
-                    table=table,
-                    fieldnames=list(coldefs[team_membership._TABLE_TEAMS].keys()),
-                    data=teams
-                )
-            else:
-                raise Exception("no teams")
-            membership = teams_data[team_membership._TABLE_TEAM_MEMBERSHIPS]
-            if membership is not None and len(membership) > 0:
-                table = self.create_out_table_definition(
-                    team_membership.FILENAME_TEAM_MEMBERSHIPS,
-                    incremental=params.incremental,
-                    schema=coldefs[team_membership._TABLE_TEAM_MEMBERSHIPS]
-                )
-                self.write_out_data(
-                    table=table,
-                    fieldnames=list(coldefs[team_membership._TABLE_TEAM_MEMBERSHIPS].keys()),
-                    data=membership
+        if "teams" in datasets:
+            with profiler.stage("teams"), tracer.span("teams", tracing.CAT_DATASET):
+                logging.debug("teams")
+                if teams_data is None or memberships_active_on is not None:
+                    teams_data = team_membership.run(tempo_client, params.teams_workers, memberships_active_on,
+                                                     queue("teams"))
+                coldefs = team_membership.table_column_definitions()
+                teams = teams_data[team_membership._TABLE_TEAMS]
+                if teams is not None and len(teams) > 0:
+                    writer.write(team_membership.FILENAME_TEAMS, coldefs[team_membership._TABLE_TEAMS], teams)
+                else:
+                    raise Exception("no teams")
+                membership = teams_data[team_membership._TABLE_TEAM_MEMBERSHIPS]
+                if membership is not None and len(membership) > 0:
+                    writer.write(
+                        team_membership.FILENAME_TEAM_MEMBERSHIPS,
+                        coldefs[team_membership._TABLE_TEAM_MEMBERSHIPS],
+                        membership
+                    )
+                else:
+                    raise Exception("no team membership")
+            extracted("teams", teams_data)
+        elif "teams" in params.datasets and teams_data is None:
+            # fresh teams, the timesheet still assigns teams from their last extraction
+            teams_data = refresh_schedule.cached("teams")
+
+        # Timesheet (daily aggregate of worklogs)
+        if accumulator is not None:
+            with profiler.stage("timesheet"), tracer.span("timesheet", tracing.CAT_DATASET):
+                logging.debug("timesheet")
+                accumulator.refresh(tempo_client, params.worklogs_workers)
+                memberships = None
+                if teams_data is not None:
+                    memberships = teams_data[team_membership._TABLE_TEAM_MEMBERSHIPS]
+                else:
+                    logging.warning("team membership is not loaded, timesheet team_id is left empty")
+                writer.write(timesheet.FILENAME, timesheet.column_definitions(), list(accumulator.rows(memberships)))
+            extracted("timesheet")
+
+        if failures is not None:
+            failed_units = failures.rows()
+            if len(failed_units) > 0:
+                writer.write(deferred.FILENAME, deferred.column_definitions(), failed_units)
+                logging.warning(f"{len(failed_units)} work units failed for good, their rows are missing - "
+                                f"see table {deferred.FILENAME}")
+            failures.save(state)
+
+        if writer.staged:
+            # staged tables are exported only now, the joined output needs both worklogs and approvals
+            with profiler.stage("export"), tracer.span("export", tracing.CAT_DATASET):
+                writer.finish(
+                    join_approval_worklogs=params.joined_outputs
+                    and "approvals_tempo" in datasets
+                    and "worklogs" in datasets
                 )
-            else:
-                raise Exception("no team membership")
+        else:
+            writer.finish()
+        refresh_schedule.commit()
+
+    @sync_action("plan")
+    def plan(self) -> ValidationResult:
+        """
+        Dry run - estimates requests and time of the configured extraction from a few cheap probes
+        (counts of worklogs, teams, sampled memberships and approval periods), nothing is downloaded or written.
+        Batch configurations are planned tenant by tenant.
+        """
+        parameters = self.configuration.parameters
+        if "tenants" in parameters:
+            batch = BatchConfiguration(**parameters)
+            sections = [
+                f"**{name}**\n\n{self._plan_tenant(params, batch.tenant_concurrency)}"
+                for name, params in batch.tenant_configurations().items()
+            ]
+            return ValidationResult("\n\n".join(sections), MessageType.INFO)
+        return ValidationResult(self._plan_tenant(Configuration(**parameters)), MessageType.INFO)
+
+    def _plan_tenant(self, params: Configuration, max_in_flight: Optional[int] = None) -> str:
+        max_in_flight = self._max_in_flight(params, max_in_flight)
+        tempo_client = tempo.TempoClient(
+            params.tempo_token,
+            pool_size=params.pool_size,
+            keep_alive=params.keep_alive,
+            max_in_flight=max_in_flight,
+            http_transport=self._http_transport(params)
+        )
+        try:
+            project_count = None
+            if "worklogs" in params.datasets and params.worklogs_strategy == worklogs.STRATEGY_PROJECTS:
+                jira_client = jirac.JiraClient(params.org_name, (params.user_email, params.jira_token))
+                try:
+                    project_ids = jira_client.project_ids()
+                finally:
+                    jira_client.close()
+                project_count = len(project_ids) if project_ids is not None else None
+            result = planning.run(
+                tempo_client,
+                self._parse_since_to_datetime(params.since),
+                params.datasets,
+                strategy=params.worklogs_strategy,
+                max_workers=params.worklogs_workers,
+                max_in_flight=max_in_flight,
+                project_count=project_count
+            )
+        finally:
+            tempo_client.close()
+        return planning.to_markdown(result)
+
+    @staticmethod
+    def _max_in_flight(params: Configuration, tenant_budget: Optional[int]) -> Optional[int]:
+        """ the smaller of max_in_flight of the configuration and the tenant budget of a batch run """
+        limits = [limit for limit in (params.max_in_flight, tenant_budget) if limit is not None]
+        return min(limits) if len(limits) > 0 else None
+
+    @staticmethod
+    def _http_transport(params: Configuration) -> str:
+        return transport.TRANSPORT_HTTP2 if params.http2 else transport.TRANSPORT_REQUESTS
+
+    def _attribute_index(self,
+                         params: Configuration,
+                         state: dict,
+                         since_date: datetime) -> Optional[wl_attributes.AttributeIndex]:
+        """
+        index of worklog versions with loaded attributes, None = load attributes of all worklogs
+        """
+        if not params.attributes_changed_only:
+            state.pop(wl_attributes.STATE_KEY, None)
+            return None
+        if not params.incremental:
+            # a full load replaces the table, attributes of unchanged worklogs would be lost
+            logging.warning("attributes_changed_only is ignored without incremental load")
+            state.pop(wl_attributes.STATE_KEY, None)
+            return None
+        return wl_attributes.AttributeIndex(state, str(since_date.date()))
+
+    def _run_approvals(self,
+                       tempo_client: tempo.TempoClient,
+                       writer: TableWriter,
+                       since_date: datetime,
+                       worklog_data_source: bool,
+                       worklog_index: Optional[WorklogIndex] = None,
+                       queue: Optional[deferred.DeferredQueue] = None):
+        coldefs = approvals.table_column_definitions()
+        write_approvals = writer.sink(approvals.FILENAME_APPROVALS, coldefs[approvals._TABLE_APPROVALS])
+        write_appr_worklogs = writer.sink(
+            approvals.FILENAME_APPROVAL_WORKLOGS,
+            coldefs[approvals._TABLE_APPROVAL_WORKLOGS]
+        )
+
+        def on_team(approvals_data: list[dict], appr_worklogs_data: list[dict]):
+            write_approvals(approvals_data)
+            write_appr_worklogs(appr_worklogs_data)
+        approvals.run(tempo_client, since_date, worklog_data_source, on_team, worklog_index, queue)
+        if writer.row_count(approvals.FILENAME_APPROVALS) == 0:
+            raise Exception("no approvals")
+        if writer.row_count(approvals.FILENAME_APPROVAL_WORKLOGS) == 0:
+            raise Exception("no appr_worklogs_data")
 
     def _parse_since_to_datetime(self, raw_since: str) -> datetime:
-        parser = dp.date.DateDataParser(languages=["en"])
-        date_data = parser.get_date_data(raw_since)
-        if date_data is None:
-            raise UserException("Invalid date 'since'")
-        date_from = date_data.date_obj
+        date_from = dates.parse_since(raw_since)
         if date_from is None:
-            raise UserException("datetime is empty")
+            raise UserException("Invalid date 'since'")
         return date_from
 
+    @staticmethod
+    def _parse_memberships_active_on(raw: str) -> Optional[date]:
+        if len(raw.strip()) == 0:
+            return None
+        active_on = dates.parse_since(raw)
+        if active_on is None:
+            raise UserException("Invalid date 'memberships_active_on'")
+        return active_on.date()
+
     def write_out_data(self,
                        table: TableDefinition,
                        fieldnames: list[str],
-                       data: list[dict]):
-        with open(table.full_path, "wt", newline="", encoding="utf-8") as out_file:
-            out = csv.DictWriter(out_file, fieldnames=fieldnames)
-            out.writerows(data)
+                       data: Iterable[dict],
+                       append: bool = False,
+                       encoder: Optional[CsvEncoder] = None):
+        """ encoder: Optional[CsvEncoder] - encodes the rows, in the calling thread by default """
+        encoder = encoder if encoder is not None else CsvEncoder()
+        with open(table.full_path, "ab" if append else "wb") as out_file:
+            encoder.write(out_file, fieldnames, data)
         self.write_manifest(table)
 
 
@@ -1,16 +1,57 @@
-from pydantic import BaseModel, ValidationError, Field
+from pydantic import BaseModel, ValidationError, Field, field_validator
+from typing import Literal, Optional
+import re
 from keboola.component.exceptions import UserException
 
 
+REFRESHABLE = ("worklogs", "worklog_attributes", "attribute_config", "teams", "approvals_jira", "approvals_tempo",
+               "timesheet")
+
+
 class Configuration(BaseModel):
     debug: bool = False
     incremental: bool = True
+    profiling: bool = False
+    tracing: bool = False
     org_name: str = Field()
     user_email: str = Field()
     tempo_token: str = Field(alias="#tempo_token")
     jira_token: str = Field(alias="#jira_token")
     since: str = Field()
     datasets: list[str] = Field()
+    pool_size: int = Field(default=10, gt=0)
+    keep_alive: bool = True
+    session_per_thread: bool = False
+    change_detection: list[str] = Field(default_factory=list)
+    deduplicate: bool = True
+    encode_processes: int = Field(default=0, ge=0)
+    staging: Literal["memory", "sqlite"] = "memory"
+    joined_outputs: bool = False
+    hedge_requests: bool = False
+    circuit_breaker: bool = False
+    worklogs_strategy: Literal["updated", "accounts", "projects"] = "updated"
+    worklogs_workers: int = Field(default=8, gt=0)
+    adaptive_paging: bool = False
+    stream_json: bool = False
+    attributes_changed_only: bool = False
+    http2: bool = False
+    teams_workers: int = Field(default=8, gt=0)
+    memberships_active_on: str = ""
+    max_in_flight: Optional[int] = Field(default=None, gt=0)
+    # refresh interval in minutes per dataset (or "attribute_config"), see refresh.RefreshSchedule
+    refresh_minutes: dict[str, int] = Field(default_factory=dict)
+    isolate_failures: bool = False
+    deferred_retries: int = Field(default=2, ge=0)
+
+    @field_validator("refresh_minutes")
+    @classmethod
+    def _check_refresh_minutes(cls, intervals: dict[str, int]) -> dict[str, int]:
+        for dataset, minutes in intervals.items():
+            if dataset not in REFRESHABLE:
+                raise ValueError(f"unknown dataset '{dataset}', use one of {', '.join(REFRESHABLE)}")
+            if minutes < 0:
+                raise ValueError(f"refresh interval of '{dataset}' must not be negative")
+        return intervals
 
     def __init__(self, **data):
         try:
@@ -18,3 +59,40 @@ class Configuration(BaseModel):
         except ValidationError as e:
             error_messages = [f"{err['loc'][0]}: {err['msg']}" for err in e.errors()]
             raise UserException(f"Validation Error: {', '.join(error_messages)}")
+
+
+class BatchConfiguration(BaseModel):
+    """
+    Multi-tenant configuration - shared parameters are the same as in Configuration
+    and every item of tenants overrides them for one Tempo organisation, e.g.
+        {"since": "2 days ago", "datasets": [...], "tenants": [{"name": "acme", "org_name": ..., ...}]}
+    """
+    tenants: list[dict] = Field(min_length=1)
+    max_workers: int = Field(default=4, gt=0)
+    tenant_concurrency: int = Field(default=4, gt=0)
+    shared: dict = Field(default_factory=dict)
+
+    def __init__(self, **data):
+        shared = {k: v for k, v in data.items() if k not in ("tenants", "max_workers", "tenant_concurrency")}
+        try:
+            super().__init__(**{k: v for k, v in data.items() if k not in shared}, shared=shared)
+        except ValidationError as e:
+            error_messages = [f"{err['loc'][0]}: {err['msg']}" for err in e.errors()]
+            raise UserException(f"Validation Error: {', '.join(error_messages)}")
+
+    def tenant_configurations(self) -> dict[str, Configuration]:
+        """
+        returns { [tenant name]: Configuration, ... }
+        """
+        result = {}
+        for tenant in self.tenants:
+            name = str(tenant.get("name", ""))
+            if not _TENANT_NAME.fullmatch(name):
+                raise UserException(f"Invalid tenant name '{name}' - use letters, digits, '_' and '-'")
+            if name in result:
+                raise UserException(f"Duplicate tenant name '{name}'")
+            result[name] = Configuration(**{**self.shared, **tenant})
+        return result
+
+
+_TENANT_NAME = re.compile(r"[A-Za-z0-9_-]{1,64}")
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Optional
+import re
+
+
+_RELATIVE = re.compile(
+    r"(?:(\d+)|an?)\s+(minute|min|hour|day|week|month|year)s?\s+ago",
+    re.IGNORECASE
+)
+_UNIT_DELTAS = {
+    "minute": timedelta(minutes=1),
+    "min": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+}
+
+
+def parse_since(raw: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    parses the 'since' parameter
+
+    ISO dates / datetimes and "N <unit>(s) ago" ("2 days ago", "a week ago", "3 months ago")
+    are parsed directly, anything else ("3 months, 1 week and 1 day ago", "yesterday", ...)
+    falls back to dateparser, which is imported only then
+
+    now: Optional[datetime] - reference time of relative forms, datetime.now() by default
+
+    returns None when the text can not be parsed
+    """
+    text = raw.strip()
+    parsed = _parse_iso(text)
+    if parsed is not None:
+        return parsed
+    match = _RELATIVE.fullmatch(text)
+    if match is not None:
+        count = int(match.group(1)) if match.group(1) is not None else 1
+        unit = match.group(2).lower()
+        now = now if now is not None else datetime.now()
+        if unit == "month":
+            return add_months(now, -count)
+        if unit == "year":
+            return add_months(now, -12 * count)
+        return now - count * _UNIT_DELTAS[unit]
+    date_data = _date_data_parser().get_date_data(text)
+    return date_data.date_obj if date_data is not None else None
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    """ shifts value by whole months, the day is clamped to the length of the target month """
+    month_index = value.month - 1 + months
+    year = value.year + month_index // 12
+    month = month_index % 12 + 1
+    next_month = datetime(year + month // 12, month % 12 + 1, 1)
+    last_day = (next_month - timedelta(days=1)).day
+    return value.replace(year=year, month=month, day=min(value.day, last_day))
+
+
+def _parse_iso(text: str) -> Optional[datetime]:
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    # timezone-aware values keep the dateparser handling (settings, timezone conversion)
+    return parsed if parsed.tzinfo is None else None
+
+
+@lru_cache(maxsize=1)
+def _date_data_parser():
+    import dateparser
+    return dateparser.date.DateDataParser(languages=["en"])
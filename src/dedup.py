@@ -0,0 +1,147 @@
+from array import array
+from hashlib import blake2b
+from typing import Any, Callable, Iterable, Iterator, Optional
+import csv
+import logging
+import os
+
+
+UPDATED_COLUMN = "updated"
+
+_INITIAL_CAPACITY = 1 << 10
+_SEPARATOR = "\x1f"
+# integer keys are stored as they are, digests (128-bit, low and high word) have the top bit of the low word set
+_DIGEST_BIT = 1 << 63
+_DIGEST_SIZE = 16
+_MAX_INTEGER_KEY = _DIGEST_BIT - 1
+# Fibonacci hashing spreads keys with a common stride (e.g. ids in steps of 1024) over the slots
+_MULTIPLIER = 0x9E3779B97F4A7C15
+_UINT64 = (1 << 64) - 1
+
+
+class PrimaryKeyFilter:
+    """
+    Drops rows of one output table whose primary key was already written during this run
+    (a worklog edited while its pages are loaded, approvals of overlapping periods, ...).
+
+    Rows go straight to the csv, so when a duplicate has a newer "updated" value than the written row,
+    it is written as well and the row it replaces is dropped from the csv by rewrite() - the table
+    keeps the row with the latest "updated" value, like the staged (SQLite) tables do.
+    Duplicates without a newer "updated" value (or of tables without the column) are dropped.
+
+    Keys are kept in an open addressing table of flat arrays - the value of a single integer key column,
+    a 128-bit blake2b digest of the key columns otherwise (both words are compared, colliding keys
+    are not expected before ~10^19 rows) - with the csv row number and the "updated" value
+    that is 24 - 32 bytes per slot, a third to two thirds of the slots are used.
+
+    primary_key: list[str] - primary key columns of the table
+    updated_column: Optional[str] - column with the last update time (ISO format), None = not compared
+    """
+
+    def __init__(self, primary_key: list[str], updated_column: Optional[str] = None):
+        self.primary_key = primary_key
+        self.updated_column = updated_column
+        self._allocate(_INITIAL_CAPACITY)
+        self._size = 0
+        self.rows_written = 0
+        self.dropped = 0
+        # csv row numbers of written rows replaced by a newer row
+        self.superseded: set[int] = set()
+
+    def _allocate(self, capacity: int):
+        self._mask = capacity - 1
+        self._shift = 64 - capacity.bit_length() + 1
+        # key 0 marks an empty slot, high words of digests (0 for integer keys) are in _checks
+        self._keys = array("Q", bytes(8 * capacity))
+        self._checks = array("Q", bytes(8 * capacity))
+        self._rows = array("q", bytes(8 * capacity))
+        self._updated = array("q", bytes(8 * capacity)) if self.updated_column is not None else None
+
+    def filter(self, rows: Iterable[dict[str, Any]]) -> Iterator[dict[str, Any]]:
+        """ yields rows that are to be written (appended) to the table, in their order """
+        key_of = self._key_function()
+        updated_column = self.updated_column
+        for row in rows:
+            key = key_of(row)
+            check = key >> 64
+            key &= _UINT64
+            updated = _sortable(row.get(updated_column)) if updated_column is not None else 0
+            # linear probing, inlined - this runs for every written row
+            keys, checks = self._keys, self._checks
+            slot = ((key * _MULTIPLIER) & _UINT64) >> self._shift
+            while keys[slot] != 0 and (keys[slot] != key or checks[slot] != check):
+                slot = (slot + 1) & self._mask
+            if keys[slot] == 0:
+                keys[slot] = key
+                checks[slot] = check
+                self._size += 1
+            elif updated_column is not None and updated > self._updated[slot]:
+                self.superseded.add(self._rows[slot])
+            else:
+                self.dropped += 1
+                continue
+            self._rows[slot] = self.rows_written
+            if updated_column is not None:
+                self._updated[slot] = updated
+            self.rows_written += 1
+            if 3 * self._size > 2 * self._mask:
+                self._grow()
+            yield row
+
+    def _key_function(self) -> Callable[[dict[str, Any]], int]:
+        """ key of a row - the value of a single non-negative integer key column, a 128-bit digest otherwise """
+        if len(self.primary_key) == 1:
+            column = self.primary_key[0]
+
+            def integer_key(row: dict[str, Any]) -> int:
+                value = row.get(column)
+                # + 1 keeps 0 free for empty slots, the integers can not collide with each other
+                if type(value) is int and 0 <= value < _MAX_INTEGER_KEY:
+                    return value + 1
+                return _digest(row, self.primary_key) | _DIGEST_BIT
+            return integer_key
+        return lambda row: _digest(row, self.primary_key) | _DIGEST_BIT
+
+    def _grow(self):
+        old_keys, old_checks, old_rows, old_updated = self._keys, self._checks, self._rows, self._updated
+        self._allocate(2 * len(old_keys))
+        keys, checks, rows, updated = self._keys, self._checks, self._rows, self._updated
+        mask, shift = self._mask, self._shift
+        for old_slot, key in enumerate(old_keys):
+            if key == 0:
+                continue
+            slot = ((key * _MULTIPLIER) & _UINT64) >> shift
+            while keys[slot] != 0:
+                slot = (slot + 1) & mask
+            keys[slot] = key
+            checks[slot] = old_checks[old_slot]
+            rows[slot] = old_rows[old_slot]
+            if updated is not None:
+                updated[slot] = old_updated[old_slot]
+
+    def rewrite(self, path: str, table: str):
+        """ removes superseded rows from the csv of the table (written without a header) """
+        if len(self.superseded) > 0:
+            tmp_path = f"{path}.dedup"
+            with open(path, "rt", newline="", encoding="utf-8") as in_file, \
+                    open(tmp_path, "wt", newline="", encoding="utf-8") as out_file:
+                out = csv.writer(out_file)
+                out.writerows(values for number, values in enumerate(csv.reader(in_file))
+                              if number not in self.superseded)
+            os.replace(tmp_path, path)
+        if self.dropped > 0 or len(self.superseded) > 0:
+            logging.info(f"[dedup] {table}: {self.dropped} duplicate rows dropped, "
+                         f"{len(self.superseded)} replaced by a newer row")
+
+
+def _digest(row: dict[str, Any], columns: list[str]) -> int:
+    payload = _SEPARATOR.join(str(row.get(col)) for col in columns).encode("utf-8")
+    return int.from_bytes(blake2b(payload, digest_size=_DIGEST_SIZE).digest(), "little")
+
+
+def _sortable(updated: Any) -> int:
+    """ ISO timestamp as a number that sorts the same way (digits of yyyy-mm-ddThh:mm:ss), 0 when missing """
+    try:
+        return int(updated[:19].replace("-", "").replace(":", "").replace("T", ""))
+    except (TypeError, ValueError):
+        return 0
@@ -0,0 +1,163 @@
+from keboola.component.dao import BaseType, ColumnDefinition, SupportedDataTypes, logging
+from datetime import datetime, timezone
+from exceptions import TempoResponseException
+from requests.exceptions import RequestException
+from typing import Callable, Optional
+import threading
+import time
+
+
+FILENAME = "failures.csv"
+STATE_KEY = "failures"
+DEFAULT_RETRIES = 2
+
+_BACKOFF_SEC = 60
+# failures of one unit that do not say anything about the others - the API gave up on it after retries
+_ISOLATED = (TempoResponseException, RequestException)
+
+_COL_RUN_STARTED = "run_started"
+_COL_DATASET = "dataset"
+_COL_UNIT = "unit"
+_COL_ERROR = "error"
+_COL_ATTEMPTS = "attempts"
+
+
+def column_definitions() -> dict[str, ColumnDefinition]:
+    return {
+        _COL_RUN_STARTED: ColumnDefinition(
+            data_types=BaseType(dtype=SupportedDataTypes.TIMESTAMP),
+            nullable=False,
+            primary_key=True,
+            description="Start of the run (UTC)"
+        ),
+        _COL_DATASET: ColumnDefinition(
+            data_types=BaseType(dtype=SupportedDataTypes.STRING, length="50"),
+            nullable=False,
+            primary_key=True,
+            description="Dataset of the work unit"
+        ),
+        _COL_UNIT: ColumnDefinition(
+            data_types=BaseType(dtype=SupportedDataTypes.STRING, length="300"),
+            nullable=False,
+            primary_key=True,
+            description="Work unit that failed (team, attribute batch, worklog partition)"
+        ),
+        _COL_ERROR: ColumnDefinition(
+            data_types=BaseType(dtype=SupportedDataTypes.STRING, length="1000"),
+            nullable=False,
+            primary_key=False,
+            description="Error of the last attempt"
+        ),
+        _COL_ATTEMPTS: ColumnDefinition(
+            data_types=BaseType(dtype=SupportedDataTypes.INTEGER, length="5"),
+            nullable=False,
+            primary_key=False,
+            description="Number of attempts"
+        ),
+    }
+
+
+class FailureLog:
+    """
+    Work units (teams, attribute batches, worklog partitions) of a run that failed for good.
+
+    Every stage gets a DeferredQueue from queue(): a failing unit does not stop the stage,
+    it is attempted again at the end of the stage, failures that remain are recorded here -
+    the datasets that succeeded are still delivered, rows() / save() report the failed units.
+
+    retries: int - rounds of attempts of the deferred units at the end of every stage
+    backoff_sec: float - pause before the first round, doubled every round
+    now: Optional[datetime] - start of the run (UTC)
+    """
+
+    def __init__(self, retries: int = DEFAULT_RETRIES, backoff_sec: float = _BACKOFF_SEC,
+                 now: Optional[datetime] = None):
+        self.retries = retries
+        self.backoff_sec = backoff_sec
+        self._now = now if now is not None else datetime.now(timezone.utc)
+        self._failures: list[dict] = []
+        self._lock = threading.Lock()
+
+    def queue(self, dataset: str) -> "DeferredQueue":
+        return DeferredQueue(dataset, self)
+
+    def record(self, dataset: str, unit: str, error: Exception, attempts: int):
+        logging.error(f"{dataset}: {unit} failed after {attempts} attempts - {error}")
+        with self._lock:
+            self._failures.append({
+                _COL_RUN_STARTED: self._now.isoformat(),
+                _COL_DATASET: dataset,
+                _COL_UNIT: unit,
+                _COL_ERROR: str(error)[:1000],
+                _COL_ATTEMPTS: attempts
+            })
+
+    def failed(self, dataset: str) -> bool:
+        with self._lock:
+            return any(failure[_COL_DATASET] == dataset for failure in self._failures)
+
+    def rows(self) -> list[dict]:
+        with self._lock:
+            return list(self._failures)
+
+    def save(self, state: dict):
+        """ failed units of this run replace those of the previous run in the state """
+        state[STATE_KEY] = [
+            {key: failure[key] for key in (_COL_DATASET, _COL_UNIT, _COL_ERROR)} for failure in self.rows()
+        ]
+
+
+class DeferredQueue:
+    """
+    Runs the work units of one stage (dataset) - a unit failing with a Tempo API error is deferred
+    and attempted again by retry() at the end of the stage, after a longer pause than the request retries.
+    Units must be safe to run again (their rows are written only when they succeed,
+    or repeated rows are dropped by the output's primary key). Safe to share between threads.
+
+    dataset: str - stage the units belong to
+    log: FailureLog - receives the units that still fail after the last round
+    """
+
+    def __init__(self, dataset: str, log: FailureLog):
+        self.dataset = dataset
+        self._log = log
+        self._deferred: list[tuple[str, Callable[[], None], Exception]] = []
+        self._lock = threading.Lock()
+
+    def run(self, unit: str, work: Callable[[], None]) -> bool:
+        """ runs work now, True when it succeeded - a failed unit is deferred """
+        try:
+            work()
+            return True
+        except _ISOLATED as e:
+            logging.warning(f"{self.dataset}: {unit} failed, retried at the end of the stage - {e}")
+            with self._lock:
+                self._deferred.append((unit, work, e))
+            return False
+
+    def retry(self):
+        """ attempts the deferred units in rounds with doubling pauses, the rest is recorded as failed """
+        attempt = 1
+        backoff = self._log.backoff_sec
+        while len(self._deferred) > 0 and attempt <= self._log.retries:
+            deferred, self._deferred = self._deferred, []
+            logging.info(f"{self.dataset}: retrying {len(deferred)} failed units in {backoff:.0f} s")
+            time.sleep(backoff)
+            for unit, work, _ in deferred:
+                try:
+                    work()
+                except _ISOLATED as e:
+                    self._deferred.append((unit, work, e))
+            attempt += 1
+            backoff *= 2
+        for unit, _, error in self._deferred:
+            self._log.record(self.dataset, unit, error, attempt)
+        self._deferred = []
+
+
+def run_unit(queue: Optional[DeferredQueue], unit: str, work: Callable[[], None]):
+    """ runs work as a unit of queue, without a queue a failure is raised as before """
+    if queue is None:
+        work()
+    else:
+        queue.run(unit, work)
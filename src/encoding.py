@@ -0,0 +1,93 @@
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from multiprocessing import get_context
+from operator import itemgetter
+from typing import Any, BinaryIO, Iterable, Iterator, Optional, Sequence
+import csv
+import io
+
+
+CHUNK_ROWS = 10_000
+
+
+def encode_rows(rows: Iterable[Sequence[Any]]) -> bytes:
+    """ csv (utf-8, \\r\\n line ends, no header) of value tuples - the same output as csv.DictWriter """
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def row_tuples(data: Iterable[dict[str, Any]], fieldnames: list[str]) -> Iterator[tuple]:
+    """
+    values of every row in fieldnames order, a missing column is written empty (as by csv.DictWriter)
+
+    Raises:
+        ValueError - the first row has keys that are not in fieldnames (as csv.DictWriter raises for any row,
+                     checked only once - rows of one table are built by one mapping)
+    """
+    values_of = itemgetter(*fieldnames) if len(fieldnames) > 1 else lambda row: (row[fieldnames[0]],)
+    first = True
+    for row in data:
+        if first:
+            extra = [key for key in row if key not in fieldnames]
+            if len(extra) > 0:
+                raise ValueError("dict contains fields not in fieldnames: " + ", ".join(repr(key) for key in extra))
+            first = False
+        try:
+            yield values_of(row)
+        except KeyError:
+            yield tuple(row.get(col, "") for col in fieldnames)
+
+
+class CsvEncoder:
+    """
+    Encodes output rows to csv from tuples in column order - csv.DictWriter looks up and checks
+    every key of every row. With processes > 1 chunks of chunk_rows rows are encoded on a process pool
+    (value tuples go to the workers, csv blocks come back) and appended in order, at most two chunks
+    per process are in flight. Row dicts are still built in the main process, the stages and filters
+    in front of the writer (index, accumulator, dedup, change detection) need them.
+
+    processes: int - worker processes, 0 / 1 = encode in the calling thread
+    chunk_rows: int - rows encoded at once (by one worker)
+    """
+
+    def __init__(self, processes: int = 0, chunk_rows: int = CHUNK_ROWS):
+        self.processes = processes
+        self.chunk_rows = chunk_rows
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def write(self, out_file: BinaryIO, fieldnames: list[str], data: Iterable[dict[str, Any]]):
+        """ appends data to the binary out_file """
+        rows = row_tuples(data, fieldnames)
+        if self.processes <= 1:
+            text_file = io.TextIOWrapper(out_file, encoding="utf-8", newline="")
+            try:
+                csv.writer(text_file).writerows(rows)
+            finally:
+                # out_file is closed by the caller
+                text_file.flush()
+                text_file.detach()
+            return
+        pending: deque[Future] = deque()
+        for chunk in iter(lambda: list(islice(rows, self.chunk_rows)), []):
+            # a table of one partial chunk is not worth the round trip to a worker
+            if len(chunk) < self.chunk_rows and len(pending) == 0:
+                out_file.write(encode_rows(chunk))
+                continue
+            if len(pending) >= 2 * self.processes:
+                out_file.write(pending.popleft().result())
+            pending.append(self._executor().submit(encode_rows, chunk))
+        for future in pending:
+            out_file.write(future.result())
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawned workers - forking would copy locks held by the request threads
+            self._pool = ProcessPoolExecutor(max_workers=self.processes, mp_context=get_context("spawn"))
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
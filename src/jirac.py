@@ -1,77 +1,117 @@
-from concurrent.futures import ThreadPoolExecutor
 from requests import Session
+from sessions import SessionProvider, DEFAULT_POOL_SIZE
 from typing import Optional
 import json
 
 
-_base_url = ""
-_s = Session()
-_pool = ThreadPoolExecutor(max_workers=5)
-
-
 _JQL_SEARCH_MAX_RESULTS = 100
+_PROJECT_SEARCH_MAX_RESULTS = 50
 
 
-def init(org_name, auth_tpl):
-    global _base_url
-    _base_url = f"https://{org_name}.atlassian.net"
-    _s.auth = auth_tpl
-    _s.headers = {
-        'Content-Type': "application/json",
-        'X-Atlassian-Token': "no-check"
-    }
+class JiraClient:
+    """
+    Jira Cloud REST API client for https://[org_name].atlassian.net
 
+    org_name: str - Atlassian organisation (subdomain)
+    auth_tpl: tuple - (user_email, jira_token)
+    pool_size: int - connection pool size per host
+    keep_alive: bool - reuse connections between requests
+    session_per_thread: bool - give every worker thread its own Session instead of sharing one
+    """
 
-def raw_get_jira(endpoint, params=None):
-    if endpoint is None and len(endpoint) == 0:
-        return None
-    raw_response = _s.get(f"{_base_url}{endpoint}", params=params)
-    return raw_response
+    def __init__(self,
+                 org_name: str,
+                 auth_tpl: tuple[str, str],
+                 pool_size: int = DEFAULT_POOL_SIZE,
+                 keep_alive: bool = True,
+                 session_per_thread: bool = False):
+        self.base_url = f"https://{org_name}.atlassian.net"
+        self._sessions = SessionProvider(
+            configure=lambda session: self._configure_session(session, auth_tpl),
+            pool_size=pool_size,
+            keep_alive=keep_alive,
+            per_thread=session_per_thread
+        )
 
+    @staticmethod
+    def _configure_session(session: Session, auth_tpl: tuple[str, str]):
+        session.auth = auth_tpl
+        session.headers.update({
+            'Content-Type': "application/json",
+            'X-Atlassian-Token': "no-check"
+        })
 
-def raw_put_jira(endpoint, data):
-    if endpoint is None and len(endpoint) == 0:
-        return None
-    raw_response = _s.put(f"{_base_url}{endpoint}", data=json.dumps(data))
-    return raw_response
+    def close(self):
+        self._sessions.close()
 
+    def raw_get_jira(self, endpoint, params=None):
+        if endpoint is None and len(endpoint) == 0:
+            return None
+        raw_response = self._sessions.get().get(f"{self.base_url}{endpoint}", params=params)
+        return raw_response
 
-def raw_post_jira(endpoint, data):
-    if endpoint is None and len(endpoint) == 0:
-        return None
-    raw_response = _s.post(f"{_base_url}{endpoint}", data=json.dumps(data))
-    return raw_response
+    def raw_put_jira(self, endpoint, data):
+        if endpoint is None and len(endpoint) == 0:
+            return None
+        raw_response = self._sessions.get().put(f"{self.base_url}{endpoint}", data=json.dumps(data))
+        return raw_response
 
+    def raw_post_jira(self, endpoint, data):
+        if endpoint is None and len(endpoint) == 0:
+            return None
+        raw_response = self._sessions.get().post(f"{self.base_url}{endpoint}", data=json.dumps(data))
+        return raw_response
 
-def worklog_ids(since: int, until: Optional[int] = None) -> Optional[list[int]]:
-    """
-        Get worklog ids from date since,
-        stop paging after response['until'] > param['until']
-            or reached last page
+    def worklog_ids(self, since: int, until: Optional[int] = None) -> Optional[list[int]]:
+        """
+            Get worklog ids from date since,
+            stop paging after response['until'] > param['until']
+                or reached last page
 
-        since: int (UNIX timestamp in milliseconds)
-        until: int (UNIX timestamp in milliseconds)
-    """
-    result = []
-    params = {
-        'since': since
-    }
-    resp = raw_get_jira("/rest/api/3/worklog/updated", params=params)
-    if resp.status_code < 200 or resp.status_code >= 300:
-        return None
-    data = resp.json()
-    result.extend([wl['worklogId'] for wl in data['values']])
-    limit_reached = until is not None and data['until'] > until
-    stop = limit_reached or bool(data['lastPage'])
-    while not stop:
+            since: int (UNIX timestamp in milliseconds)
+            until: int (UNIX timestamp in milliseconds)
+        """
+        result = []
         params = {
-            'since': data['until']
+            'since': since
         }
-        resp = raw_get_jira("/rest/api/3/worklog/updated", params=params)
+        resp = self.raw_get_jira("/rest/api/3/worklog/updated", params=params)
         if resp.status_code < 200 or resp.status_code >= 300:
-            continue
+            return None
         data = resp.json()
         result.extend([wl['worklogId'] for wl in data['values']])
         limit_reached = until is not None and data['until'] > until
         stop = limit_reached or bool(data['lastPage'])
-    return result
+        while not stop:
+            params = {
+                'since': data['until']
+            }
+            resp = self.raw_get_jira("/rest/api/3/worklog/updated", params=params)
+            if resp.status_code < 200 or resp.status_code >= 300:
+                continue
+            data = resp.json()
+            result.extend([wl['worklogId'] for wl in data['values']])
+            limit_reached = until is not None and data['until'] > until
+            stop = limit_reached or bool(data['lastPage'])
+        return result
+
+    def project_ids(self) -> Optional[list[str]]:
+        """
+            ids of all projects visible to the user (archived projects are not included)
+
+            returns None when a page can not be loaded
+        """
+        result = []
+        params = {
+            'startAt': 0,
+            'maxResults': _PROJECT_SEARCH_MAX_RESULTS
+        }
+        while True:
+            resp = self.raw_get_jira("/rest/api/3/project/search", params=params)
+            if resp.status_code < 200 or resp.status_code >= 300:
+                return None
+            data = resp.json()
+            result.extend([project['id'] for project in data['values']])
+            if bool(data.get('isLast', True)) or len(data['values']) == 0:
+                return result
+            params['startAt'] += len(data['values'])
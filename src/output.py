@@ -0,0 +1,114 @@
+from keboola.component.dao import ColumnDefinition
+from dedup import PrimaryKeyFilter, UPDATED_COLUMN
+from encoding import CsvEncoder
+from row_hash import RowHashStore
+from typing import Any, Callable, Iterable, Optional
+import threading
+
+
+class TableWriter:
+    """
+    Writes dataset rows of one tenant run into output tables.
+
+    component: Component - creates table definitions and writes csv + manifest
+    prefix: str - namespace of output tables (tenant name in batch runs)
+    incremental: bool - incremental load of output tables
+    row_hashes: Optional[RowHashStore] - drops rows unchanged since the previous run
+    deduplicate: bool - drop rows with a primary key already written during the run (dedup.PrimaryKeyFilter),
+                finish() removes rows replaced by a newer duplicate from the written csv files
+    encoder: Optional[CsvEncoder] - encodes csv files (e.g. on a process pool), in the writing thread by default
+    """
+
+    staged = False
+
+    def __init__(self,
+                 component,
+                 prefix: str,
+                 incremental: bool,
+                 row_hashes: Optional[RowHashStore] = None,
+                 deduplicate: bool = True,
+                 encoder: Optional[CsvEncoder] = None):
+        self.component = component
+        self.prefix = prefix
+        self.incremental = incremental
+        self.row_hashes = row_hashes
+        self.deduplicate = deduplicate
+        self.encoder = encoder
+        self._row_counts: dict[str, int] = {}
+        self._started: set[str] = set()
+        self._lock = threading.Lock()
+        # filename -> (primary key filter, csv path) of tables written during this run
+        self._deduplicated: dict[str, tuple[PrimaryKeyFilter, str]] = {}
+
+    def write(self,
+              filename: str,
+              schema: dict[str, ColumnDefinition],
+              data: list[dict[str, Any]],
+              append: bool = False):
+        """
+        filename: str - e.g. worklogs.FILENAME, the table name is the filename without ".csv"
+        schema: dict - column definitions, column order = csv column order
+        append: bool - add rows to what was already written into the table during this run
+        """
+        with self._lock:
+            self._started.add(filename)
+            self._count_rows(filename, data, append)
+            self._write_csv(filename, schema, data, append)
+
+    def sink(self, filename: str, schema: dict[str, ColumnDefinition]) -> Callable[[list[dict[str, Any]]], None]:
+        """
+        returns callback for streaming a table page by page (e.g. on_page of dataset runs)
+
+        the first page replaces whatever was written into the table during this run,
+        following pages are appended; the table is not touched until the first page arrives
+        """
+        with self._lock:
+            self._started.discard(filename)
+            self._row_counts[filename] = 0
+
+        def write_page(page: list[dict[str, Any]]):
+            self.write(filename, schema, page, append=filename in self._started)
+        return write_page
+
+    def row_count(self, filename: str) -> int:
+        """ number of rows passed to write() for the table during this run """
+        return self._row_counts.get(filename, 0)
+
+    def finish(self, join_approval_worklogs: bool = False):
+        """ tables are written directly, only rows replaced by newer duplicates are removed """
+        for filename, (primary_key_filter, path) in self._deduplicated.items():
+            primary_key_filter.rewrite(path, table_name(filename))
+        self._deduplicated = {}
+
+    def _count_rows(self, filename: str, data: list[dict[str, Any]], append: bool):
+        previous = self._row_counts.get(filename, 0) if append else 0
+        self._row_counts[filename] = previous + len(data)
+
+    def _write_csv(self,
+                   filename: str,
+                   schema: dict[str, ColumnDefinition],
+                   data: Iterable[dict[str, Any]],
+                   append: bool = False):
+        fieldnames = list(schema.keys())
+        if self.row_hashes is not None:
+            primary_key = [col for col, coldef in schema.items() if coldef.primary_key]
+            data = self.row_hashes.iter_changed(
+                table_name(filename), primary_key, fieldnames, data, self.incremental, append
+            )
+        table = self.component.create_out_table_definition(
+            self.prefix + filename,
+            incremental=self.incremental,
+            schema=schema
+        )
+        # staged tables are unique by their SQLite primary key already
+        primary_key = [col for col, coldef in schema.items() if coldef.primary_key]
+        if self.deduplicate and not self.staged and len(primary_key) > 0:
+            if not append or filename not in self._deduplicated:
+                updated_column = UPDATED_COLUMN if UPDATED_COLUMN in schema else None
+                self._deduplicated[filename] = (PrimaryKeyFilter(primary_key, updated_column), table.full_path)
+            data = self._deduplicated[filename][0].filter(data)
+        self.component.write_out_data(table, fieldnames, data, append, encoder=self.encoder)
+
+
+def table_name(filename: str) -> str:
+    return filename[:-len(".csv")] if filename.endswith(".csv") else filename
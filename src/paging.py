@@ -0,0 +1,106 @@
+from keboola.component.dao import logging
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import threading
+
+
+STATE_KEY = "page_sizes"
+
+# page size (limit) per paginated endpoint - (default, min, max)
+# defaults are the sizes the extractor always used, max is what the Tempo API accepts
+PAGE_LIMITS: dict[str, tuple[int, int, int]] = {
+    "worklogs": (5000, 250, 5000),
+    "worklog_id_mapping": (500, 50, 1000),
+    "teams": (50, 50, 1000),
+    "team_memberships": (50, 50, 1000),
+    "approval_worklogs": (50, 50, 1000),
+}
+
+# a full page answered faster than this is too small, slower is too big
+_FAST_PAGE_SEC = 1.0
+_SLOW_PAGE_SEC = 8.0
+_MAX_PAGE_BYTES = 32 * 1024 * 1024
+
+
+class PageSizer:
+    """
+    Tunes the page size of every paginated endpoint from the observed pages.
+
+    A full page that came back fast and small doubles the limit (up to the API maximum),
+    a slow or huge page halves it, a failed page halves it and the page is requested again
+    (the halved limit then stays the ceiling of the endpoint for the rest of the run).
+    Learned limits are kept in state[STATE_KEY] so the next run starts where this one ended.
+    Safe to share between threads.
+
+    state: Optional[dict] - tenant state, None = limits are not remembered
+    """
+
+    def __init__(self, state: Optional[dict] = None):
+        stored = state.setdefault(STATE_KEY, {}) if state is not None else {}
+        for key in list(stored.keys()):
+            if key not in PAGE_LIMITS:
+                del stored[key]
+            else:
+                stored[key] = _clamp(key, stored[key])
+        self._limits: dict[str, int] = stored
+        self._ceilings: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def limit(self, key: str) -> int:
+        with self._lock:
+            return self._limits.get(key, PAGE_LIMITS[key][0])
+
+    def record(self, key: str, limit: int, rows: int, latency_sec: float, size_bytes: int):
+        """
+        adapts the limit of the endpoint after a page was loaded
+
+        limit: int - limit the page was requested with
+        rows: int - rows in the page, only full pages tell whether a bigger page would pay off
+        """
+        if latency_sec > _SLOW_PAGE_SEC or size_bytes > _MAX_PAGE_BYTES:
+            self._set(key, limit // 2, f"{latency_sec:.1f} s / {size_bytes} B page")
+        elif rows >= limit and latency_sec < _FAST_PAGE_SEC and size_bytes < _MAX_PAGE_BYTES // 4:
+            with self._lock:
+                ceiling = self._ceilings.get(key, PAGE_LIMITS[key][2])
+            self._set(key, min(limit * 2, ceiling), f"{latency_sec:.1f} s / {size_bytes} B page")
+
+    def record_failure(self, key: str, limit: int) -> bool:
+        """
+        halves the limit after a failed page
+
+        returns False when the limit is already at its minimum and the failure has to be raised
+        """
+        if limit <= PAGE_LIMITS[key][1]:
+            return False
+        with self._lock:
+            self._ceilings[key] = min(self._ceilings.get(key, limit), _clamp(key, limit // 2))
+        self._set(key, limit // 2, "failed page")
+        return True
+
+    def _set(self, key: str, limit: int, reason: str):
+        limit = _clamp(key, limit)
+        with self._lock:
+            previous = self._limits.get(key, PAGE_LIMITS[key][0])
+            if previous == limit:
+                return
+            self._limits[key] = limit
+        logging.info(f"[paging] {key}: page size {previous} -> {limit} ({reason})")
+
+
+def default_limit(key: str) -> int:
+    return PAGE_LIMITS[key][0]
+
+
+def with_limit(endpoint: str, limit: int) -> str:
+    """
+    sets (or replaces) the limit query parameter of endpoint, e.g. next page links
+    """
+    url = urlsplit(endpoint)
+    query = [(k, v) for k, v in parse_qsl(url.query, keep_blank_values=True) if k != "limit"]
+    query.append(("limit", str(limit)))
+    return urlunsplit(url._replace(query=urlencode(query)))
+
+
+def _clamp(key: str, limit: int) -> int:
+    _, low, high = PAGE_LIMITS[key]
+    return max(low, min(high, int(limit)))
@@ -0,0 +1,251 @@
+from keboola.component.dao import logging
+from datetime import datetime
+from typing import Any, Optional
+import approvals
+import tempo
+import worklogs
+from paging import default_limit
+
+
+# teams whose membership is probed, the average is used for the others
+_SAMPLE_TEAMS = 5
+# worklogs per attribute search request (wl_attributes batch size)
+_ATTRIBUTE_BATCH = 400
+_DEFAULT_PERIOD_DAYS = 7
+
+
+class Prober:
+    """
+    Cheap probes of a Tempo organisation - every call is a single GET, mostly with limit=1.
+    Counts the probe requests, their response times and keeps the last rate limit headers.
+
+    client: TempoClient
+    """
+
+    def __init__(self, client: tempo.TempoClient):
+        self._client = client
+        self.base_url = client.base_url
+        self.requests = 0
+        self.seconds: list[float] = []
+        self.rate_limit: dict[str, str] = {}
+
+    def get(self, endpoint: str, params: Optional[dict] = None) -> dict[str, Any]:
+        data, elapsed, headers = self._client.probe(endpoint, params)
+        self.requests += 1
+        self.seconds.append(elapsed)
+        if len(headers) > 0:
+            self.rate_limit = headers
+        return data
+
+    def latency(self) -> float:
+        """ mean response time of the probes in seconds """
+        return sum(self.seconds) / len(self.seconds) if len(self.seconds) > 0 else 0.0
+
+    def count(self, endpoint: str, params: dict, limit: int) -> tuple[int, float]:
+        """
+        number of items of a paginated endpoint - the first page is loaded,
+        when there are more pages the end is found by probing offsets with limit=1
+        (doubling the offset, then bisecting, ~2 * log2(count) requests)
+
+        returns (item count, response time of the first page)
+        """
+        first = self.get(endpoint, dict(params, offset=0, limit=limit))
+        loaded = len(first['results'])
+        first_page_sec = self.seconds[-1]
+        if "next" not in first['metadata'] or loaded == 0:
+            return loaded, first_page_sec
+        present, missing = loaded - 1, 2 * loaded
+        while self._has_item(endpoint, params, missing):
+            present, missing = missing, 2 * missing
+        while missing - present > 1:
+            middle = (present + missing) // 2
+            if self._has_item(endpoint, params, middle):
+                present = middle
+            else:
+                missing = middle
+        return missing, first_page_sec
+
+    def _has_item(self, endpoint: str, params: dict, offset: int) -> bool:
+        return len(self.get(endpoint, dict(params, offset=offset, limit=1))['results']) > 0
+
+
+def run(client: tempo.TempoClient,
+        since: datetime,
+        datasets: list[str],
+        strategy: str = worklogs.STRATEGY_UPDATED,
+        max_workers: int = worklogs.DEFAULT_MAX_WORKERS,
+        max_in_flight: Optional[int] = None,
+        project_count: Optional[int] = None,
+        now: Optional[datetime] = None) -> dict[str, Any]:
+    """
+    estimates requests and wall time of a run without downloading the data
+
+    client: TempoClient
+    since: datetime
+    datasets: list - selected datasets
+    strategy: str - worklogs strategy (worklogs.STRATEGY_*)
+    max_workers: int - partitions loaded at the same time by the partitioned worklog strategies
+    max_in_flight: Optional[int] - max concurrent requests of the tenant (batch runs)
+    project_count: Optional[int] - number of Jira projects, for the projects strategy
+    now: Optional[datetime] - end of the approval periods, datetime.now() by default
+
+    returns {
+        datasets: {[dataset]: {requests: int, seconds: float, rows: int}},
+        requests: int, seconds: float - totals of the datasets (stages run one after another),
+        probe_requests: int,
+        rate_limit: {[header]: str} - rate limit headers of the last probe,
+        rate_limit_headroom: Optional[int] - remaining requests minus the estimated requests,
+        notes: [str]
+    }
+    """
+    logging.info("Started to probe the API")
+    prober = Prober(client)
+    estimates: dict[str, dict[str, Any]] = {}
+    notes: list[str] = []
+    since_str = str(since.date())
+    concurrency = max_workers if max_in_flight is None else min(max_workers, max_in_flight)
+
+    needs_worklogs = any(d in datasets for d in ("worklogs", "approvals_jira", "approvals_tempo"))
+    needs_teams = any(d in datasets for d in ("teams", "approvals_jira", "approvals_tempo")) \
+        or ("worklogs" in datasets and strategy == worklogs.STRATEGY_ACCOUNTS)
+
+    worklog_count, worklog_pages, page_sec = 0, 0, 0.0
+    worklog_limit = default_limit("worklogs")
+    if needs_worklogs:
+        worklog_count, page_sec = prober.count("/worklogs", {"updatedFrom": since_str}, worklog_limit)
+        worklog_pages = max(1, -(-worklog_count // worklog_limit))
+    sample_team_ids: list[int] = []
+    team_count = 0
+    members_per_team = 0.0
+    if needs_teams:
+        team_limit = default_limit("teams")
+        first_teams = prober.get("/teams", {"offset": 0, "limit": team_limit})
+        sample_team_ids = [team['id'] for team in first_teams['results'][:_SAMPLE_TEAMS]]
+        team_count = len(first_teams['results'])
+        if "next" in first_teams['metadata']:
+            team_count, _ = prober.count("/teams", {}, team_limit)
+        members_per_team = _members_per_team(prober, sample_team_ids)
+    small_sec = prober.latency()
+
+    if "worklogs" in datasets:
+        if strategy == worklogs.STRATEGY_UPDATED:
+            estimates["worklogs"] = _estimate(worklog_pages, worklog_pages * page_sec, worklog_count)
+        else:
+            if strategy == worklogs.STRATEGY_ACCOUNTS:
+                partitions = round(team_count * members_per_team)
+                notes.append("accounts strategy: team memberships are counted as accounts (upper bound)")
+            else:
+                partitions = project_count or 0
+                if project_count is None:
+                    notes.append("projects strategy: the number of Jira projects is unknown, not counted")
+            requests = partitions + worklog_pages
+            seconds = (partitions * small_sec + worklog_pages * page_sec) / concurrency
+            estimates["worklogs"] = _estimate(requests, seconds, worklog_count)
+        if "worklog_attributes" in datasets:
+            batches = -(-worklog_count // _ATTRIBUTE_BATCH)
+            requests = batches + 1
+            estimates["worklog_attributes"] = _estimate(requests, requests * small_sec, worklog_count)
+        if "timesheet" in datasets:
+            notes.append("timesheet: days changed before 'since' are reloaded per author, not estimated")
+
+    for dataset in ("approvals_jira", "approvals_tempo"):
+        if dataset in datasets:
+            estimates[dataset] = _estimate_approvals(
+                prober, since, now, sample_team_ids, team_count, members_per_team, dataset == "approvals_jira",
+                indexed="worklogs" in datasets
+            )
+
+    if "teams" in datasets:
+        membership_pages = max(1, -(-round(members_per_team) // default_limit("team_memberships")))
+        requests = -(-team_count // default_limit("teams")) + team_count * membership_pages
+        estimates["teams"] = _estimate(requests, requests * small_sec, round(team_count * members_per_team))
+
+    total_requests = sum(e["requests"] for e in estimates.values())
+    headroom = None
+    remaining = prober.rate_limit.get("x-ratelimit-remaining")
+    if remaining is not None and remaining.isdigit():
+        headroom = int(remaining) - total_requests
+        if headroom < 0:
+            notes.append("the estimated requests exceed the remaining rate limit, expect throttling")
+    elif len(prober.rate_limit) == 0:
+        notes.append("the API did not report rate limits")
+    logging.info(f"Probing finished - {prober.requests} requests")
+    return {
+        "datasets": estimates,
+        "requests": total_requests,
+        "seconds": round(sum(e["seconds"] for e in estimates.values()), 1),
+        "probe_requests": prober.requests,
+        "rate_limit": prober.rate_limit,
+        "rate_limit_headroom": headroom,
+        "notes": notes
+    }
+
+
+def to_markdown(plan: dict[str, Any]) -> str:
+    lines = [
+        "| dataset | requests | est. time [s] | rows |",
+        "|---|---:|---:|---:|",
+    ]
+    for dataset, estimate in plan["datasets"].items():
+        lines.append(f"| {dataset} | {estimate['requests']} | {estimate['seconds']} | {estimate['rows']} |")
+    lines.append(f"| **total** | {plan['requests']} | {plan['seconds']} | |")
+    lines.append("")
+    lines.append(f"probe requests: {plan['probe_requests']}")
+    if plan["rate_limit_headroom"] is not None:
+        lines.append(f"rate limit headroom: {plan['rate_limit_headroom']} requests")
+    for header, value in plan["rate_limit"].items():
+        lines.append(f"{header}: {value}")
+    lines.extend(f"note: {note}" for note in plan["notes"])
+    return "\n".join(lines)
+
+
+def _estimate(requests: int, seconds: float, rows: int) -> dict[str, Any]:
+    return {"requests": requests, "seconds": round(seconds, 1), "rows": rows}
+
+
+def _members_per_team(prober: Prober, sample: list[int]) -> float:
+    if len(sample) == 0:
+        return 0.0
+    limit = default_limit("team_memberships")
+    counts = [prober.count(f"/team-memberships/team/{team_id}", {}, limit)[0] for team_id in sample]
+    return sum(counts) / len(counts)
+
+
+def _estimate_approvals(prober: Prober,
+                        since: datetime,
+                        now: Optional[datetime],
+                        sample_team_ids: list[int],
+                        team_count: int,
+                        members_per_team: float,
+                        jira_ids: bool,
+                        indexed: bool = False) -> dict[str, Any]:
+    """
+    one request per team and period, worklog pages of every approval (counted on the approvals
+    of the first period of the first team), one id mapping request per approval with Jira worklog ids
+
+    indexed: bool - worklogs are downloaded in the same run, only approvals of the first period page
+                their worklogs (it starts before since and the UTC offsets of the authors are learned on it)
+    """
+    period_days = _DEFAULT_PERIOD_DAYS
+    pages_per_approval = 1.0
+    if len(sample_team_ids) > 0:
+        sample = prober.get(f"/timesheet-approvals/team/{sample_team_ids[0]}", {"from": str(since.date())})
+        if len(sample['results']) > 0:
+            period = sample['results'][0]['period']
+            period_days = (datetime.fromisoformat(period['to']) - datetime.fromisoformat(period['from'])).days + 1
+            pages_per_approval = _pages_per_approval(prober, sample['results'][:_SAMPLE_TEAMS])
+    periods = max(1, -(-(approvals.read_until_date(now) - since).days // period_days))
+    approval_count = round(team_count * periods * members_per_team)
+    paged_approvals = round(team_count * members_per_team) if indexed else approval_count
+    requests = team_count * periods + round(paged_approvals * pages_per_approval) + (approval_count if jira_ids else 0)
+    # approvals are loaded sequentially
+    return _estimate(requests, requests * prober.latency(), approval_count)
+
+
+def _pages_per_approval(prober: Prober, sample: list[dict]) -> float:
+    limit = default_limit("approval_worklogs")
+    pages = []
+    for approval in sample:
+        endpoint = str(approval['worklogs']['self'])[len(prober.base_url):]
+        pages.append(max(1, -(-prober.count(endpoint, {}, limit)[0] // limit)))
+    return sum(pages) / len(pages)
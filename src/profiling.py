@@ -0,0 +1,154 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Iterator
+
+
+PROFILING_ENV = "KBC_TEMPO_PROFILING"
+
+_TOP_ALLOCATIONS = 30
+_TOP_FUNCTIONS = 40
+
+_stage_lock = threading.Lock()
+
+
+def enabled_by_env() -> bool:
+    """
+    profiling can be switched on without touching the configuration
+    by setting KBC_TEMPO_PROFILING=1 (true/yes are accepted as well)
+    """
+    return os.environ.get(PROFILING_ENV, "").strip().lower() in ("1", "true", "yes")
+
+
+def unprofiled_thread():
+    """ initializer of long-lived pools - a thread started during a profiled stage is not profiled """
+    sys.setprofile(None)
+
+
+class _ThreadProfiles:
+    """ profiles of the threads started while installed """
+
+    def __init__(self):
+        self.profiles: list[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, frame, event, arg):
+        # threading calls this on the first event of a new thread, the thread's profile replaces it
+        profile = cProfile.Profile()
+        with self._lock:
+            self.profiles.append(profile)
+        profile.enable()
+
+    def install(self):
+        threading.setprofile(self)
+
+    def uninstall(self):
+        threading.setprofile(None)
+
+
+class StageProfiler:
+    """
+    Wraps dataset stages with cProfile and tracemalloc.
+
+    For every profiled stage three artefacts are written into out_dir:
+        <stage>.pstats       - raw cProfile output, open with `python -m pstats` or snakeviz
+        <stage>_cpu.txt      - top functions by cumulative time
+        <stage>_alloc.txt    - peak traced memory and top allocation sites
+    File names are prefixed with prefix (tenant namespace in batch runs).
+    When disabled, stage() is a no-op context manager.
+    tracemalloc is process wide, so profiled stages of concurrently running tenants are serialized.
+
+    cProfile sees only the thread it is enabled in - every thread started during the stage
+    (the worklogs, teams and timesheet pools) gets its own profile, merged into the stage stats,
+    so the stats show where the workers spend their time (socket reads vs. JSON parsing),
+    not just the calling thread waiting for their futures. Long-lived pools that outlive the stage
+    opt out with unprofiled_thread() as their initializer.
+    """
+
+    def __init__(self, enabled: bool, out_dir: str, top_n: int = _TOP_ALLOCATIONS, prefix: str = ""):
+        self.enabled = enabled
+        self.out_dir = out_dir
+        self.prefix = prefix
+        self.top_n = top_n
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        with _stage_lock:
+            yield from self._profiled(name)
+
+    def _profiled(self, name: str) -> Iterator[None]:
+        # do not interfere with tracing started by somebody else (tests, outer stage)
+        own_tracing = not tracemalloc.is_tracing()
+        if own_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        profiler = cProfile.Profile()
+        threads = _ThreadProfiles()
+        started = time.perf_counter()
+        threads.install()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            threads.uninstall()
+            elapsed = time.perf_counter() - started
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if own_tracing:
+                tracemalloc.stop()
+            self._write_artefacts(name, _merged_stats(profiler, threads.profiles), len(threads.profiles),
+                                  snapshot, elapsed, current, peak)
+
+    def _write_artefacts(self,
+                         name: str,
+                         stats: pstats.Stats,
+                         thread_count: int,
+                         snapshot: tracemalloc.Snapshot,
+                         elapsed: float,
+                         current: int,
+                         peak: int):
+        os.makedirs(self.out_dir, exist_ok=True)
+        name = f"{self.prefix}{name}"
+        stats.dump_stats(os.path.join(self.out_dir, f"{name}.pstats"))
+
+        cpu_summary = io.StringIO()
+        stats.stream = cpu_summary
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(_TOP_FUNCTIONS)
+        with open(os.path.join(self.out_dir, f"{name}_cpu.txt"), "wt", encoding="utf-8") as out_file:
+            out_file.write(f"stage: {name}\nwall time: {elapsed:.3f} s\n")
+            out_file.write(f"worker threads (merged, times summed over threads): {thread_count}\n\n")
+            out_file.write(cpu_summary.getvalue())
+
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        with open(os.path.join(self.out_dir, f"{name}_alloc.txt"), "wt", encoding="utf-8") as out_file:
+            out_file.write(f"stage: {name}\n")
+            out_file.write(f"peak traced memory: {peak / 1024 / 1024:.2f} MiB\n")
+            out_file.write(f"traced memory at stage end: {current / 1024 / 1024:.2f} MiB\n\n")
+            out_file.write(f"top {self.top_n} allocation sites (still allocated at stage end):\n")
+            for stat in snapshot.statistics("lineno")[:self.top_n]:
+                out_file.write(f"{stat}\n")
+        logging.info(f"[profiling] {name}: {elapsed:.2f} s, peak memory {peak / 1024 / 1024:.2f} MiB")
+
+
+def _merged_stats(profiler: cProfile.Profile, thread_profiles: list[cProfile.Profile]) -> pstats.Stats:
+    """ stats of the stage thread and of the worker threads, threads that did not call anything are skipped """
+    stats = pstats.Stats()
+    for profile in [profiler] + thread_profiles:
+        profile.create_stats()
+        if len(profile.stats) > 0:
+            stats.add(profile)
+    return stats
@@ -0,0 +1,79 @@
+import logging
+import threading
+import time
+from typing import Optional
+
+
+_LOG_INTERVAL_SEC = 30
+
+
+class Progress:
+    """
+    Periodic progress reporter for long running downloads.
+
+    Counts fetched rows and pages and finished work units (teams, attribute batches, ...).
+    At most once per interval_sec it logs the counters together with throughput
+    and - when the total number of work units is known - an ETA.
+    Safe to share between threads.
+
+    name: str - label used in the log lines
+    total: Optional[int] - expected number of work units, enables ETA
+    unit: str - name of the work unit used in the log lines
+    """
+
+    def __init__(self,
+                 name: str,
+                 total: Optional[int] = None,
+                 unit: str = "units",
+                 interval_sec: float = _LOG_INTERVAL_SEC):
+        self.name = name
+        self.total = total
+        self.unit = unit
+        self.interval_sec = interval_sec
+        self.rows = 0
+        self.pages = 0
+        self.done = 0
+        self._started = time.monotonic()
+        self._last_log = self._started
+        self._lock = threading.Lock()
+
+    def add(self, rows: int = 0, pages: int = 0):
+        """ records fetched rows / pages """
+        with self._lock:
+            self.rows += rows
+            self.pages += pages
+        self._maybe_log()
+
+    def unit_done(self, count: int = 1):
+        """ records finished work units (team, batch, period, ...) """
+        with self._lock:
+            self.done += count
+        self._maybe_log()
+
+    def set_total(self, total: int):
+        with self._lock:
+            self.total = total
+
+    def finish(self):
+        logging.info(f"[progress] {self.name} finished: {self._summary()}")
+
+    def _maybe_log(self):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_log < self.interval_sec:
+                return
+            self._last_log = now
+        logging.info(f"[progress] {self.name}: {self._summary()}")
+
+    def _summary(self) -> str:
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        summary = (f"{self.rows} rows, {self.pages} pages in {elapsed:.0f} s"
+                   + f" ({self.rows / elapsed:.1f} rows/s, {self.pages / elapsed:.2f} pages/s)")
+        if self.total is not None and self.total > 0:
+            summary += f", {self.done} / {self.total} {self.unit}"
+            if 0 < self.done < self.total:
+                eta = elapsed / self.done * (self.total - self.done)
+                summary += f", ETA {eta:.0f} s"
+        elif self.done > 0:
+            summary += f", {self.done} {self.unit}"
+        return summary
@@ -0,0 +1,70 @@
+from keboola.component.dao import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+
+STATE_KEY = "refreshed"
+_CACHE_KEY = "reference_data"
+
+# refresh interval key of the attribute config, part of the worklog_attributes dataset
+ATTRIBUTE_CONFIG = "attribute_config"
+
+
+class RefreshSchedule:
+    """
+    Per-dataset refresh cadence - a dataset with a refresh interval is extracted again only
+    when its last successful extraction is older than the interval.
+    Times of the last extraction and reference data of extracted datasets that other stages
+    need (e.g. team membership) are kept in the tenant state, so a skipped dataset
+    can still be used by the others.
+
+    state: dict - tenant state, times live in state[STATE_KEY], reference data in state["reference_data"]
+    intervals: dict - refresh interval in minutes per dataset, datasets without one are always extracted
+    now: Optional[datetime] - start of the run (UTC), the time recorded for extracted datasets
+    """
+
+    def __init__(self, state: dict, intervals: dict[str, int], now: Optional[datetime] = None):
+        self._refreshed: dict[str, str] = state.setdefault(STATE_KEY, {})
+        self._cache: dict[str, Any] = state.setdefault(_CACHE_KEY, {})
+        self._intervals = intervals
+        self._now = now if now is not None else datetime.now(timezone.utc)
+        self._extracted: list[str] = []
+
+    def due(self, dataset: str) -> bool:
+        """ True when the dataset should be extracted in this run """
+        interval = self._intervals.get(dataset)
+        last = self._refreshed.get(dataset)
+        if interval is None or last is None:
+            return True
+        return self._now - datetime.fromisoformat(last) >= timedelta(minutes=interval)
+
+    def select(self, datasets: list[str]) -> list[str]:
+        """ datasets to extract in this run, the others are logged as fresh """
+        selected = [dataset for dataset in datasets if self.due(dataset)]
+        for dataset in datasets:
+            if dataset not in selected:
+                logging.info(f"{dataset} was extracted at {self._refreshed[dataset]}, "
+                             f"it is refreshed every {self._intervals[dataset]} min - skipped")
+        return selected
+
+    def extracted(self, dataset: str, reference_data: Any = None):
+        """
+        records the dataset as extracted in this run (applied by commit())
+
+        reference_data: Any - json serializable data of the dataset other stages need when it is skipped
+        """
+        self._extracted.append(dataset)
+        if reference_data is not None and dataset in self._intervals:
+            self._cache[dataset] = reference_data
+
+    def cached(self, dataset: str) -> Any:
+        """ reference data of the last extraction of a skipped dataset, None when not kept """
+        return self._cache.get(dataset)
+
+    def commit(self):
+        """ stores the run start as the last extraction of all datasets extracted - call when the run succeeded """
+        for dataset in self._extracted:
+            self._refreshed[dataset] = self._now.isoformat()
+        for dataset in [dataset for dataset in self._cache.keys() if dataset not in self._intervals]:
+            del self._cache[dataset]
+        self._extracted = []
@@ -0,0 +1,134 @@
+from collections import deque
+from keboola.component.dao import logging
+import re
+import threading
+import time
+from typing import Optional
+
+
+_LATENCY_WINDOW = 200
+_LATENCY_MIN_SAMPLES = 20
+_HEDGE_MIN_DELAY_SEC = 0.5
+
+_BREAKER_WINDOW = 20
+_BREAKER_MIN_REQUESTS = 10
+_BREAKER_ERROR_RATE = 0.5
+_BREAKER_COOLDOWN_SEC = 30
+
+_ID_IN_PATH = re.compile(r"/\d+(?=/|$)")
+
+
+def endpoint_key(endpoint: str) -> str:
+    """
+    groups endpoints by shape, e.g. /timesheet-approvals/team/42?from=... -> /timesheet-approvals/team/{id}
+    """
+    return _ID_IN_PATH.sub("/{id}", endpoint.split("?", 1)[0])
+
+
+class LatencyTracker:
+    """
+    Keeps latencies of the last successful requests per endpoint shape
+    and derives the hedging delay from their 95th percentile.
+    """
+
+    def __init__(self, window: int = _LATENCY_WINDOW, min_samples: int = _LATENCY_MIN_SAMPLES):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, latency_sec: float):
+        key = endpoint_key(endpoint)
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(latency_sec)
+
+    def hedge_delay(self, endpoint: str) -> Optional[float]:
+        """ p95 latency of the endpoint shape, None until there are enough samples """
+        key = endpoint_key(endpoint)
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < self.min_samples:
+            return None
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        return max(p95, _HEDGE_MIN_DELAY_SEC)
+
+
+class CircuitBreaker:
+    """
+    Shared by all threads of one API client.
+
+    Tracks outcomes of the last requests (error responses and failed requests - timeouts, connection errors -
+    count as failures); when the error rate reaches error_rate the breaker opens and every caller of wait()
+    sleeps until cooldown_sec passes, so the workers back off together instead of each burning its own retries.
+    After the cooldown one caller is let through as a probe, the others keep waiting - the breaker closes
+    when the probe succeeds and stays open for another cooldown when it fails.
+    """
+
+    def __init__(self,
+                 window: int = _BREAKER_WINDOW,
+                 min_requests: int = _BREAKER_MIN_REQUESTS,
+                 error_rate: float = _BREAKER_ERROR_RATE,
+                 cooldown_sec: float = _BREAKER_COOLDOWN_SEC):
+        self.min_requests = min_requests
+        self.error_rate = error_rate
+        self.cooldown_sec = cooldown_sec
+        self._outcomes: deque = deque(maxlen=window)
+        self._open = False
+        self._open_until = 0.0
+        # thread of the probe request while the breaker is half-open and when it was let through
+        self._probe: Optional[int] = None
+        self._probe_sent = 0.0
+        self._changed = threading.Condition()
+
+    @property
+    def is_open(self) -> bool:
+        with self._changed:
+            return self._open
+
+    def wait(self):
+        """ blocks while the breaker is open, returns to a single caller (the probe) after the cooldown """
+        with self._changed:
+            while self._open:
+                remaining = self._open_until - time.monotonic()
+                if remaining > 0:
+                    self._changed.wait(remaining)
+                elif self._probe is None or time.monotonic() - self._probe_sent >= self.cooldown_sec:
+                    # a probe without an outcome for a whole cooldown is given up on
+                    self._probe = threading.get_ident()
+                    self._probe_sent = time.monotonic()
+                    logging.info("[circuit-breaker] cooldown is over - sending a probe request")
+                    return
+                else:
+                    # woken up by the outcome of the probe
+                    self._changed.wait(self.cooldown_sec - (time.monotonic() - self._probe_sent))
+
+    def record(self, success: bool):
+        """ outcome of a request sent after wait() returned """
+        with self._changed:
+            if self._open:
+                # late outcomes of requests sent before the breaker opened are ignored
+                if self._probe != threading.get_ident():
+                    return
+                self._probe = None
+                if success:
+                    self._open = False
+                    self._changed.notify_all()
+                    logging.info("[circuit-breaker] probe request succeeded - resuming requests")
+                else:
+                    self._open_until = time.monotonic() + self.cooldown_sec
+                    logging.warning(f"[circuit-breaker] probe request failed - pausing requests for "
+                                    f"another {self.cooldown_sec} s")
+                return
+            self._outcomes.append(success)
+            if len(self._outcomes) < self.min_requests:
+                return
+            failures = self._outcomes.count(False)
+            total = len(self._outcomes)
+            if failures / total < self.error_rate:
+                return
+            self._open = True
+            self._open_until = time.monotonic() + self.cooldown_sec
+            # start over after the pause, the old outcomes would reopen the breaker immediately
+            self._outcomes.clear()
+        logging.warning(f"[circuit-breaker] {failures} of last {total} requests failed"
+                        + f" - pausing requests for {self.cooldown_sec} s")
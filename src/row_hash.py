@@ -0,0 +1,84 @@
+from base64 import urlsafe_b64encode
+from hashlib import blake2b
+from typing import Any, Iterable, Iterator
+import logging
+
+
+STATE_KEY = "row_hashes"
+
+_DIGEST_SIZE = 8
+_SEPARATOR = "\x1f"
+
+
+class RowHashStore:
+    """
+    Change detection for incremental outputs.
+
+    Keeps a compact primary key -> content hash map per table (both 64-bit blake2b digests,
+    base64 encoded) inside the component state. filter_changed() drops rows whose content
+    is identical to the row loaded by one of the previous runs.
+
+    state: dict - tenant state, the store lives in state[STATE_KEY]
+    tables: list[str] - tables (e.g. "teams", "approvals") change detection is enabled for
+    """
+
+    def __init__(self, state: dict, tables: list[str]):
+        self.tables = set(tables)
+        stored = state.setdefault(STATE_KEY, {})
+        # forget tables that were switched off, so the state does not grow forever
+        for table in list(stored.keys()):
+            if table not in self.tables:
+                del stored[table]
+        self._hashes: dict[str, dict[str, str]] = stored
+
+    def enabled_for(self, table: str) -> bool:
+        return table in self.tables
+
+    def filter_changed(self,
+                       table: str,
+                       primary_key: list[str],
+                       fieldnames: list[str],
+                       rows: Iterable[dict[str, Any]],
+                       incremental: bool = True,
+                       append: bool = False) -> list[dict[str, Any]]:
+        """
+        returns rows that are new or changed since the previous runs and remembers their hashes
+
+        incremental: bool - False means the whole table is replaced in storage,
+                    so all rows are returned and the store is rebuilt from them
+        append: bool - rows continue a table already filtered during this run, do not rebuild
+        """
+        return list(self.iter_changed(table, primary_key, fieldnames, rows, incremental, append))
+
+    def iter_changed(self,
+                     table: str,
+                     primary_key: list[str],
+                     fieldnames: list[str],
+                     rows: Iterable[dict[str, Any]],
+                     incremental: bool = True,
+                     append: bool = False) -> Iterator[dict[str, Any]]:
+        """ streaming variant of filter_changed """
+        if not self.enabled_for(table):
+            yield from rows
+            return
+        if (not incremental and not append) or table not in self._hashes:
+            self._hashes[table] = {}
+        known = self._hashes[table]
+        changed = 0
+        total = 0
+        for row in rows:
+            total += 1
+            key = _digest(row, primary_key)
+            content = _digest(row, fieldnames)
+            if incremental and known.get(key) == content:
+                continue
+            known[key] = content
+            changed += 1
+            yield row
+        logging.info(f"[row_hash] {table}: {changed} of {total} rows new or changed")
+
+
+def _digest(row: dict[str, Any], columns: list[str]) -> str:
+    source = _SEPARATOR.join("" if row.get(col) is None else str(row.get(col)) for col in columns)
+    digest = blake2b(source.encode("utf-8"), digest_size=_DIGEST_SIZE).digest()
+    return urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
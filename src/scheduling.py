@@ -0,0 +1,112 @@
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator, Optional
+import threading
+
+
+FLOW_WORKLOGS = "worklogs"
+FLOW_WORKLOG_ATTRIBUTES = "worklog_attributes"
+FLOW_TEAMS = "teams"
+FLOW_APPROVALS = "approvals"
+FLOW_TIMESHEET = "timesheet"
+FLOW_OTHER = "other"
+
+# share of request slots of every flow while flows compete for them - worklog pages are
+# the critical path (attributes, timesheet and approval lookups are fed by them)
+FLOW_WEIGHTS: dict[str, int] = {
+    FLOW_WORKLOGS: 4,
+    FLOW_TEAMS: 2,
+    FLOW_WORKLOG_ATTRIBUTES: 2,
+    FLOW_APPROVALS: 1,
+    FLOW_TIMESHEET: 1,
+    FLOW_OTHER: 1,
+}
+
+
+class RequestScheduler:
+    """
+    Hands out request slots of one API client to flows (datasets) - at most max_in_flight
+    requests run at once, waiting requests get free slots by weighted fair queuing:
+    every flow advances its virtual time by 1 / weight per granted slot and the waiting flow
+    with the lowest virtual time goes next, so a flow of weight 4 gets 4 slots for every slot
+    of a flow of weight 1, but no waiting flow is starved.
+    Within a flow requests are served in arrival order. Safe to share between threads.
+
+    max_in_flight: Optional[int] - max concurrent requests, None = unlimited (slots are only counted)
+    weights: dict - weight per flow, unknown flows have weight 1
+    """
+
+    def __init__(self, max_in_flight: Optional[int] = None, weights: Optional[dict[str, int]] = None):
+        self.max_in_flight = max_in_flight
+        self._weights = weights if weights is not None else FLOW_WEIGHTS
+        self._in_flight = 0
+        self._queues: dict[str, deque[threading.Event]] = {}
+        # virtual finish time of the last slot of every flow, and of the last granted slot
+        self._finish: dict[str, float] = {}
+        self._virtual_time = 0.0
+        self._lock = threading.Lock()
+        self._current = threading.local()
+        self.granted: dict[str, int] = {}
+        self.waited: dict[str, int] = {}
+
+    @contextmanager
+    def flow(self, name: str) -> Iterator[None]:
+        """ requests of this thread within the block belong to the flow, unless an enclosing block set one """
+        if getattr(self._current, "flow", None) is not None:
+            yield
+            return
+        self._current.flow = name
+        try:
+            yield
+        finally:
+            self._current.flow = None
+
+    def current_flow(self) -> str:
+        return getattr(self._current, "flow", None) or FLOW_OTHER
+
+    @contextmanager
+    def slot(self, flow: Optional[str] = None) -> Iterator[None]:
+        """ holds one request slot, flow is the current flow of the thread by default """
+        self.acquire(flow or self.current_flow())
+        try:
+            yield
+        finally:
+            self.release()
+
+    def acquire(self, flow: str):
+        with self._lock:
+            if self.max_in_flight is None or (self._in_flight < self.max_in_flight and len(self._queues) == 0):
+                self._grant(flow)
+                return
+            waiter = threading.Event()
+            self._queues.setdefault(flow, deque()).append(waiter)
+            self.waited[flow] = self.waited.get(flow, 0) + 1
+        # the slot is granted (and counted) by release() of another request
+        waiter.wait()
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+            if len(self._queues) == 0:
+                return
+            flow = min(self._queues.keys(), key=lambda f: (self._start(f), -self._weight(f)))
+            queue = self._queues[flow]
+            waiter = queue.popleft()
+            if len(queue) == 0:
+                del self._queues[flow]
+            self._grant(flow)
+        waiter.set()
+
+    def _grant(self, flow: str):
+        start = self._start(flow)
+        self._virtual_time = start
+        self._finish[flow] = start + 1.0 / self._weight(flow)
+        self._in_flight += 1
+        self.granted[flow] = self.granted.get(flow, 0) + 1
+
+    def _start(self, flow: str) -> float:
+        # a flow that was idle does not get the slots it did not use
+        return max(self._finish.get(flow, 0.0), self._virtual_time)
+
+    def _weight(self, flow: str) -> int:
+        return self._weights.get(flow, 1)
@@ -0,0 +1,67 @@
+from requests import Session
+from requests.adapters import HTTPAdapter
+from typing import Callable
+import threading
+
+
+DEFAULT_POOL_SIZE = 10
+
+
+class SessionProvider:
+    """
+    Hands out configured requests.Session objects for an API client.
+
+    pool_size: int - max number of kept connections per host (HTTPAdapter pool_maxsize)
+    keep_alive: bool - when False every request asks the server to close the connection
+    per_thread: bool - True = every thread gets its own Session, False = one Session shared by all threads
+    configure: Callable[[Session], None] - sets auth / headers on a freshly created Session
+    """
+
+    def __init__(self,
+                 configure: Callable[[Session], None],
+                 pool_size: int = DEFAULT_POOL_SIZE,
+                 keep_alive: bool = True,
+                 per_thread: bool = False):
+        assert pool_size > 0
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self.per_thread = per_thread
+        self._configure = configure
+        self._local = threading.local()
+        self._shared = None
+        self._created: list[Session] = []
+        # reentrant - the shared session is created (and registered) while get() holds the lock
+        self._lock = threading.RLock()
+
+    def get(self) -> Session:
+        if self.per_thread:
+            session = getattr(self._local, "session", None)
+            if session is None:
+                session = self._new_session()
+                self._local.session = session
+            return session
+        if self._shared is None:
+            with self._lock:
+                if self._shared is None:
+                    self._shared = self._new_session()
+        return self._shared
+
+    def close(self):
+        with self._lock:
+            for session in self._created:
+                session.close()
+            self._created = []
+            self._shared = None
+        self._local = threading.local()
+
+    def _new_session(self) -> Session:
+        session = Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        self._configure(session)
+        if not self.keep_alive:
+            session.headers['Connection'] = "close"
+        with self._lock:
+            self._created.append(session)
+        return session
@@ -0,0 +1,202 @@
+from keboola.component.dao import ColumnDefinition, SupportedDataTypes
+from output import TableWriter, table_name
+from tempfile import TemporaryDirectory
+from typing import Any, Iterable, Iterator, Optional
+import approvals
+import logging
+import os
+import sqlite3
+import threading
+import worklogs
+
+
+FILENAME_APPROVAL_WORKLOGS_DETAIL = "approval_worklogs_detail.csv"
+
+_UPDATED_COL = "updated"
+_EXPORT_BATCH_SIZE = 10_000
+
+
+class StagingStore:
+    """
+    Scratch SQLite database for one extraction run.
+
+    Every table is created from its column definitions with the primary key as SQLite primary key,
+    so rows with an already staged key replace the old row (tables with an "updated" column keep
+    the row with the latest "updated" value). Rows are read back with cursors, never as whole lists.
+    Rows are deduplicated within the run only - the data folder does not outlive the job, rows of
+    different runs are merged by the incremental load of the output tables (their primary key) in Storage.
+
+    directory: Optional[str] - where to create the database, a temporary directory by default
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self._tmp_dir = None
+        if directory is None:
+            self._tmp_dir = TemporaryDirectory(prefix="tempo-staging-")
+            directory = self._tmp_dir.name
+        self.path = os.path.join(directory, "staging.sqlite")
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=OFF")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._lock = threading.Lock()
+        self._schemas: dict[str, dict[str, ColumnDefinition]] = {}
+
+    def create_table(self, table: str, schema: dict[str, ColumnDefinition]):
+        with self._lock:
+            self._conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+            columns = [f'"{col}" {_sqlite_type(coldef)}' for col, coldef in schema.items()]
+            primary_key = [f'"{col}"' for col, coldef in schema.items() if coldef.primary_key]
+            if len(primary_key) > 0:
+                columns.append(f"PRIMARY KEY ({', '.join(primary_key)})")
+            self._conn.execute(f'CREATE TABLE "{table}" ({", ".join(columns)})')
+            self._conn.commit()
+            self._schemas[table] = schema
+
+    def has_table(self, table: str) -> bool:
+        return table in self._schemas
+
+    def schema(self, table: str) -> dict[str, ColumnDefinition]:
+        return self._schemas[table]
+
+    def insert(self, table: str, rows: list[dict[str, Any]]):
+        schema = self._schemas[table]
+        columns = list(schema.keys())
+        quoted = ", ".join(f'"{col}"' for col in columns)
+        placeholders = ", ".join("?" for _ in columns)
+        primary_key = [col for col, coldef in schema.items() if coldef.primary_key]
+        sql = f'INSERT INTO "{table}" ({quoted}) VALUES ({placeholders})'
+        if len(primary_key) > 0:
+            conflict = ", ".join(f'"{col}"' for col in primary_key)
+            updates = ", ".join(f'"{col}" = excluded."{col}"' for col in columns if col not in primary_key)
+            if len(updates) == 0:
+                sql += f" ON CONFLICT ({conflict}) DO NOTHING"
+            else:
+                sql += f" ON CONFLICT ({conflict}) DO UPDATE SET {updates}"
+                if _UPDATED_COL in columns:
+                    sql += f' WHERE excluded."{_UPDATED_COL}" >= "{table}"."{_UPDATED_COL}"'
+        with self._lock:
+            self._conn.executemany(sql, ([row.get(col) for col in columns] for row in rows))
+            self._conn.commit()
+
+    def count(self, table: str) -> int:
+        with self._lock:
+            return self._conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+
+    def rows(self, table: str, columns: Optional[list[str]] = None) -> Iterator[dict[str, Any]]:
+        """ streams rows of table as dicts (all columns by default) """
+        if columns is None:
+            columns = list(self._schemas[table].keys())
+        quoted = ", ".join(f'"{col}"' for col in columns)
+        yield from self.query(f'SELECT {quoted} FROM "{table}"', columns)
+
+    def query(self, sql: str, columns: list[str], params: Iterable = ()) -> Iterator[dict[str, Any]]:
+        """ streams result of sql, columns name the selected expressions in order """
+        # a separate cursor per query, fetched in batches, so exports never hold the whole table
+        with self._lock:
+            cursor = self._conn.execute(sql, tuple(params))
+        while True:
+            with self._lock:
+                batch = cursor.fetchmany(_EXPORT_BATCH_SIZE)
+            if len(batch) == 0:
+                break
+            for values in batch:
+                yield dict(zip(columns, values))
+
+    def close(self):
+        self._conn.close()
+        if self._tmp_dir is not None:
+            self._tmp_dir.cleanup()
+
+
+class StagedTableWriter(TableWriter):
+    """
+    TableWriter that inserts rows into a StagingStore and exports
+    deduplicated csv files (plus optional joined outputs) in finish().
+    """
+
+    staged = True
+
+    def __init__(self,
+                 component,
+                 prefix: str,
+                 incremental: bool,
+                 row_hashes=None,
+                 store: Optional[StagingStore] = None,
+                 deduplicate: bool = True,
+                 encoder=None):
+        # staged tables are deduplicated by the primary key of their SQLite table
+        super().__init__(component, prefix, incremental, row_hashes, deduplicate, encoder)
+        self.store = store if store is not None else StagingStore()
+        self._filenames: dict[str, str] = {}
+
+    def write(self,
+              filename: str,
+              schema: dict[str, ColumnDefinition],
+              data: list[dict[str, Any]],
+              append: bool = False):
+        table = table_name(filename)
+        with self._lock:
+            self._started.add(filename)
+            if not append or not self.store.has_table(table):
+                self.store.create_table(table, schema)
+                self._filenames[table] = filename
+            self._count_rows(filename, data, append)
+        if len(data) > 0:
+            self.store.insert(table, data)
+
+    def staged_worklogs(self, columns: Optional[list[str]] = None) -> Iterator[dict[str, Any]]:
+        """ streams staged worklogs, empty when the worklogs dataset was not staged """
+        if not self.store.has_table(table_name(worklogs.FILENAME)):
+            return iter(())
+        return self.store.rows(table_name(worklogs.FILENAME), columns)
+
+    def finish(self, join_approval_worklogs: bool = False):
+        """
+        exports every staged table into its output csv
+
+        join_approval_worklogs: bool - also write approval_worklogs joined with worklogs,
+                    only meaningful when approval_worklogs hold tempo worklog ids
+        """
+        for table, filename in self._filenames.items():
+            schema = self.store.schema(table)
+            logging.info(f"[staging] exporting {table} ({self.store.count(table)} rows)")
+            self._write_csv(filename, schema, self.store.rows(table))
+        if join_approval_worklogs:
+            self._export_approval_worklogs_detail()
+        self.store.close()
+
+    def _export_approval_worklogs_detail(self):
+        appr_table = approvals._TABLE_APPROVAL_WORKLOGS
+        wl_table = table_name(worklogs.FILENAME)
+        if not self.store.has_table(appr_table) or not self.store.has_table(wl_table):
+            logging.warning("[staging] approval worklogs or worklogs not staged - skipping joined output")
+            return
+        schema = approval_worklogs_detail_column_definitions()
+        appr_cols = list(approvals.table_column_definitions()[appr_table].keys())
+        wl_cols = [col for col in schema.keys() if col not in appr_cols]
+        select = [f'a."{col}"' for col in appr_cols] + [f'w."{col}"' for col in wl_cols]
+        sql = (f'SELECT {", ".join(select)} FROM "{appr_table}" a '
+               + f'JOIN "{wl_table}" w ON w."{worklogs._COL_ID}" = a."{approvals._COL_WL_ID}"')
+        self._write_csv(FILENAME_APPROVAL_WORKLOGS_DETAIL, schema, self.store.query(sql, appr_cols + wl_cols))
+
+
+def approval_worklogs_detail_column_definitions() -> dict[str, ColumnDefinition]:
+    """ approval_worklogs columns followed by worklog columns (without the joined worklog id) """
+    schema = dict(approvals.table_column_definitions()[approvals._TABLE_APPROVAL_WORKLOGS])
+    for col, coldef in worklogs.column_definitions().items():
+        if col == worklogs._COL_ID:
+            continue
+        schema[col] = ColumnDefinition(
+            data_types=coldef.data_types,
+            nullable=coldef.nullable,
+            primary_key=False,
+            description=coldef.description
+        )
+    return schema
+
+
+def _sqlite_type(coldef: ColumnDefinition) -> str:
+    base_type = coldef.data_types.get("base") if isinstance(coldef.data_types, dict) else None
+    if base_type is not None and base_type.dtype == SupportedDataTypes.INTEGER:
+        return "INTEGER"
+    return "TEXT"
@@ -0,0 +1,71 @@
+from typing import Any, BinaryIO, Callable, Optional
+
+try:
+    import ijson
+except ImportError:  # optional dependency - pages are parsed with json.loads without it
+    ijson = None
+
+
+_RESULT_ITEM = "results.item"
+_METADATA = "metadata"
+
+
+def available() -> bool:
+    return ijson is not None
+
+
+class CountingReader:
+    """
+    File-like wrapper counting bytes read from a response stream (page size for the page sizer)
+    """
+
+    def __init__(self, stream: BinaryIO):
+        self._stream = stream
+        self.bytes = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._stream.read(size)
+        self.bytes += len(chunk)
+        return chunk
+
+
+def parse_page(stream: BinaryIO, project: Optional[Callable[[dict], Any]] = None) -> dict[str, Any]:
+    """
+    parses a Tempo page {"metadata": {...}, "results": [...]} from a byte stream
+
+    Every item of results is built on its own and passed to project right away,
+    so only the projected rows are kept - the page is never held as a whole,
+    neither as text nor as a tree of dicts.
+
+    project: Optional[Callable] - maps one result item to the kept row, None keeps whole items
+
+    returns {"metadata": dict, "results": list} - other top level keys are skipped
+    raises ValueError - invalid or truncated JSON
+    """
+    try:
+        return _parse_page(stream, project)
+    except ijson.JSONError as e:
+        raise ValueError(str(e)) from e
+
+
+def _parse_page(stream: BinaryIO, project: Optional[Callable[[dict], Any]]) -> dict[str, Any]:
+    page: dict[str, Any] = {_METADATA: {}, "results": []}
+    builder = None
+    builder_prefix = ""
+    for prefix, event, value in ijson.parse(stream, use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+            if prefix == builder_prefix and event in ("end_map", "end_array"):
+                if builder_prefix == _METADATA:
+                    page[_METADATA] = builder.value
+                else:
+                    page["results"].append(project(builder.value) if project is not None else builder.value)
+                builder = None
+        elif prefix in (_RESULT_ITEM, _METADATA) and event in ("start_map", "start_array"):
+            builder = ijson.ObjectBuilder()
+            builder_prefix = prefix
+            builder.event(event, value)
+        elif prefix == _RESULT_ITEM:
+            # scalar result items (e.g. plain ids)
+            page["results"].append(project(value) if project is not None else value)
+    return page
@@ -1,11 +1,18 @@
 #!/usr/bin/env python3.10
 from keboola.component.dao import BaseType, ColumnDefinition, SupportedDataTypes
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from functools import partial
+import deferred
 import tempo
+import tracing
+from progress import Progress
 from typing import Optional
 
 
 FILENAME_TEAMS = "teams.csv"
 FILENAME_TEAM_MEMBERSHIPS = "team_membership.csv"
+DEFAULT_MAX_WORKERS = 8
 
 _TABLE_TEAMS = "teams"
 _TABLE_TEAM_MEMBERSHIPS = "team_membership"
@@ -55,24 +62,52 @@ def table_column_definitions() -> dict[str, dict[str, ColumnDefinition]]:
         }}
 
 
-def run() -> dict[str, Optional[list[dict]]]:
-    team_data = list()
-    team_membership_data = list()
+def run(client: tempo.TempoClient,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        active_on: Optional[date] = None,
+        queue: Optional[deferred.DeferredQueue] = None) -> dict[str, Optional[list[dict]]]:
+    """
+    teams and their memberships, memberships of max_workers teams are loaded at the same time
+
+    client: TempoClient
+    max_workers: int - teams whose memberships are loaded at the same time
+    active_on: Optional[date] - keep only memberships active on this date, None = all memberships
+    queue: Optional[DeferredQueue] - teams failing with an API error are deferred to it instead of failing the run,
+                teams that fail for good have no memberships
+
+    returns { "teams": [...], "team_membership": [...] } in the order of teams
+    """
     # Process Teams
-    teams = tempo.teams()
+    teams = client.teams()
     if teams is None:
         return {_TABLE_TEAMS: None, _TABLE_TEAM_MEMBERSHIPS: None}
-    for team in teams:
-        team_data.append(_transform_team(team))
+    progress = Progress("team membership", total=len(teams), unit="teams")
+
+    team_memberships: list[list[dict]] = [[] for _ in teams]
+
+    def load(index: int):
         # Load Users in Team
-        memberships = tempo.team_membership(team['id'])
-        if memberships is None:
-            return {_TABLE_TEAMS: None, _TABLE_TEAM_MEMBERSHIPS: None}
-        for membership in memberships:
-            team_membership_data.append(_transform_team_membership(membership))
+        team = teams[index]
+        with client.tracer.span("team", tracing.CAT_UNIT, team_id=team['id']):
+            memberships = client.team_membership(team['id'], progress=progress)
+        team_memberships[index] = [
+            _transform_team_membership(membership)
+            for membership in memberships
+            if active_on is None or _is_active(membership, active_on)
+        ]
+
+    def load_unit(index: int):
+        deferred.run_unit(queue, f"team {teams[index]['id']}", partial(load, index))
+        progress.unit_done()
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="teams") as pool:
+        list(pool.map(load_unit, range(len(teams))))
+    if queue is not None:
+        queue.retry()
+    progress.finish()
     return {
-        _TABLE_TEAMS: team_data,
-        _TABLE_TEAM_MEMBERSHIPS: team_membership_data
+        _TABLE_TEAMS: [_transform_team(team) for team in teams],
+        _TABLE_TEAM_MEMBERSHIPS: [row for rows in team_memberships for row in rows]
     }
 
 
@@ -89,3 +124,18 @@ def _transform_team_membership(membership: dict) -> dict:
         _COL_TEAM_ID: membership['team']['id'],
         _COL_USER_ID: membership['member']['accountId']
     }
+
+
+def _is_active(membership: dict, on: date) -> bool:
+    """ membership period <from, to> contains the date, a missing bound is open """
+    day = str(on)
+    return (membership.get('from') is None or membership['from'] <= day) and \
+        (membership.get('to') is None or day <= membership['to'])
+
+
+def account_ids(data: dict[str, Optional[list[dict]]]) -> list[str]:
+    """
+    distinct account ids of team members in data returned by run()
+    """
+    memberships = data[_TABLE_TEAM_MEMBERSHIPS] or []
+    return list(dict.fromkeys(membership[_COL_USER_ID] for membership in memberships))
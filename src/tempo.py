@@ -1,361 +1,750 @@
 from keboola.component.dao import logging
-from requests import Session, Response
-from requests.exceptions import JSONDecodeError
+from requests import Response
+from requests.exceptions import JSONDecodeError, RequestException, Timeout
 from exceptions import TempoResponseException
-from typing import Optional, Callable, Any
+from typing import Optional, Callable, Any, Iterator
+from functools import partial, wraps
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from resilience import CircuitBreaker, LatencyTracker
+from paging import PageSizer, default_limit, with_limit
+from progress import Progress
+import profiling
+import scheduling
+import streaming
+import tracing
+from sessions import DEFAULT_POOL_SIZE
+import transport
 import json
+import threading
 import time
 
 
-_base_url = "https://api.eu.tempo.io/4"
-_s = Session()
+DEFAULT_BASE_URL = "https://api.eu.tempo.io/4"
 _RETRY_DELAY_SEC = 10
 _MAX_RETRY_COUNT = 5
+# a hedged request waits for a response at most this many times the hedge delay, then the duplicate takes over
+_HEDGE_CUTOFF = 2
 
 
-def init(token):
-    _s.headers = {
-        'Content-Type': "application/json",
-        'Authorization': f"Bearer {token}"
-    }
+def _flow(name: str):
+    """ requests of the decorated client method are scheduled as the flow (dataset) """
+    def decorate(method):
+        @wraps(method)
+        def scheduled(self, *args, **kwargs):
+            with self.scheduler.flow(name):
+                return method(self, *args, **kwargs)
+        return scheduled
+    return decorate
 
 
-def tempo_to_jira_worklog_ids(tempo_worklog_ids: list[int]) -> dict[int, int]:
+class TempoClient:
+    """
+    Tempo REST API (v4) client.
+
+    Holds everything that used to be module state (base url, session, auth headers),
+    so several clients - e.g. one per Tempo organisation - can live in one process.
+
+    token: str - Tempo API token
+    base_url: str - API root, all endpoints are relative to it
+    pool_size: int - connection pool size per host
+    keep_alive: bool - reuse connections between requests
+    session_per_thread: bool - give every worker thread its own Session instead of sharing one
+    max_in_flight: Optional[int] - max concurrent requests of this client (tenant budget), None = unlimited,
+                    waiting requests of datasets are served by weighted fair queuing (scheduling.FLOW_WEIGHTS)
+    hedge_requests: bool - GETs slower than p95 of their endpoint are duplicated, the first response wins
+    circuit_breaker: bool - pause all requests of this client when the error rate spikes
+    page_sizer: Optional[PageSizer] - tunes page sizes of paginated endpoints, None = fixed default sizes
+    stream_json: bool - parse worklog pages incrementally from the response stream (needs ijson),
+                    not used for hedged requests
+    http_transport: str - transport.TRANSPORT_REQUESTS (HTTP/1.1) or transport.TRANSPORT_HTTP2
+                    (needs httpx + h2, concurrent requests share pool_size connections, session_per_thread
+                    does not apply)
+    tracer: Optional[tracing.Tracer] - records page and request spans (every attempt), None = not traced
     """
-        maps between tempo worklog id and jira worklog id
 
-        tempo_worklog_ids: list of unique tempo worklog ids
+    def __init__(self,
+                 token: str,
+                 base_url: str = DEFAULT_BASE_URL,
+                 pool_size: int = DEFAULT_POOL_SIZE,
+                 keep_alive: bool = True,
+                 session_per_thread: bool = False,
+                 max_in_flight: Optional[int] = None,
+                 hedge_requests: bool = False,
+                 circuit_breaker: bool = False,
+                 page_sizer: Optional[PageSizer] = None,
+                 stream_json: bool = False,
+                 http_transport: str = transport.TRANSPORT_REQUESTS,
+                 tracer: Optional[tracing.Tracer] = None):
+        self.base_url = base_url
+        self.tracer = tracer if tracer is not None else tracing.Tracer(False)
+        self._headers = {
+            'Content-Type': "application/json",
+            'Authorization': f"Bearer {token}"
+        }
+        if http_transport == transport.TRANSPORT_HTTP2 and not transport.http2_available():
+            logging.warning("httpx / h2 is not installed - HTTP/1.1 transport is used")
+            http_transport = transport.TRANSPORT_REQUESTS
+        if http_transport == transport.TRANSPORT_HTTP2:
+            self._transport = transport.Http2Transport(self._headers, pool_size=pool_size, keep_alive=keep_alive)
+        else:
+            self._transport = transport.RequestsTransport(
+                self._headers,
+                pool_size=pool_size,
+                keep_alive=keep_alive,
+                per_thread=session_per_thread
+            )
+        self.scheduler = scheduling.RequestScheduler(max_in_flight)
+        self._latency: Optional[LatencyTracker] = None
+        self._hedge_pool: Optional[ThreadPoolExecutor] = None
+        if hedge_requests:
+            self._latency = LatencyTracker()
+            # lives as long as the client, a profiler of the stage that starts its threads would outlive the stage
+            self._hedge_pool = ThreadPoolExecutor(max_workers=2 * pool_size, thread_name_prefix="tempo-hedge",
+                                                  initializer=profiling.unprofiled_thread)
+        self._breaker: Optional[CircuitBreaker] = CircuitBreaker() if circuit_breaker else None
+        self._page_sizer = page_sizer
+        # payload size of the last successful response of every thread, for the page sizer
+        self._last_page = threading.local()
+        self._stream_json = stream_json and streaming.available() and not hedge_requests
+        if stream_json and not streaming.available():
+            logging.warning("ijson is not installed - worklog pages are parsed without streaming")
+
+    def close(self):
+        if len(self.scheduler.waited) > 0:
+            logging.info(f"requests per dataset: {self.scheduler.granted}, "
+                         f"waited for a free request slot: {self.scheduler.waited}")
+        if self._hedge_pool is not None:
+            self._hedge_pool.shutdown(wait=False)
+        self._transport.close()
+
+    @_flow(scheduling.FLOW_OTHER)
+    def tempo_to_jira_worklog_ids(self, tempo_worklog_ids: list[int]) -> dict[int, int]:
+        """
+            maps between tempo worklog id and jira worklog id
+
+            tempo_worklog_ids: list of unique tempo worklog ids
+
+            returns {
+                [tempo_worklog_id : int]: [jira_worklog_id : int],
+                ...
+            }
+        """
+        result = {}
+        req = {
+            'tempoWorklogIds': tempo_worklog_ids
+        }
+        fetch = partial(self._checked_post, data=req)
+        for data in self._paginate("/worklogs/tempo-to-jira", fetch, page_key="worklog_id_mapping"):
+            for map in data['results']:
+                result[map['tempoWorklogId']] = map['jiraWorklogId']
+        return result
+
+    @_flow(scheduling.FLOW_OTHER)
+    def jira_to_tempo_worklog_ids(self, jira_worklog_ids: list[int]) -> dict[int, int]:
+        """
+            maps between jira worklog id and internal tempo worklog
+
+            jira_worklog_ids: list of unique jira worklog ids
+
+            returns {
+                [tempo_worklog_id : int]: [jira_worklog_id : int],
+                ...
+            }
+        """
+        result = {}
+        req = {
+            'jiraWorklogIds': jira_worklog_ids
+        }
+        fetch = partial(self._checked_post, data=req)
+        for data in self._paginate("/worklogs/jira-to-tempo", fetch, page_key="worklog_id_mapping"):
+            for map in data['results']:
+                result[map['tempoWorklogId']] = map['jiraWorklogId']
+        return result
+
+    @_flow(scheduling.FLOW_TEAMS)
+    def team_membership(self, team_id: int, progress: Optional[Progress] = None) -> list[dict]:
+        """
+        List of users in Tempo Team (all pages).
+        https://apidocs.tempo.io/#tag/Team-Memberships/operation/getAllMemberships
+
+        progress: Optional[Progress] - receives row / page counts
+
+        returns [
+            { id: int, team: { id }, member: { accountId }, role: {...}, from: date, to: date, ... }, ...
+        ]
+        """
+        memberships = []
+        endpoint = f"/team-memberships/team/{team_id}"
+        for data in self._paginate(endpoint, self._checked_get, progress=progress, page_key="team_memberships"):
+            memberships.extend(data['results'])
+        return memberships
+
+    @_flow(scheduling.FLOW_TEAMS)
+    def teams(self) -> list[dict]:
+        """
+        List of teams in tempo. https://apidocs.tempo.io/#tag/Team
+
+        returns [
+            { id: text, summary: text, name: text, members: link }, ...
+        ]
+        """
+        teams = []
+        req = {
+            "offset": 0
+        }
+        for data in self._paginate("/teams", partial(self._checked_get, params=req), page_key="teams"):
+            teams.extend(data['results'])
+        return teams
 
+    @_flow(scheduling.FLOW_WORKLOG_ATTRIBUTES)
+    def attribute_config(self) -> list[dict[str, Any]]:
+        """
         returns {
-            [tempo_worklog_id : int]: [jira_worklog_id : int],
-            ...
+            attribute_key: str,
+            attribute_name: str,
+            attribute_type: str,
+            attribute_values: str(json)
         }
-    """
-    result = {}
-    req = {
-        'tempoWorklogIds': tempo_worklog_ids
-    }
-    data = _checked_post("/worklogs/tempo-to-jira?limit=500", data=req)
-    for map in data['results']:
-        result[map['tempoWorklogId']] = map['jiraWorklogId']
-    next = _parse_next(data['metadata'])
-    while next is not None:
-        data = _checked_post(next, data=req)
-        for map in data['results']:
-            result[map['tempoWorklogId']] = map['jiraWorklogId']
-        next = _parse_next(data['metadata'])
-    return result
-
-
-def jira_to_tempo_worklog_ids(jira_worklog_ids: list[int]) -> dict[int, int]:
-    """
-        maps between jira worklog id and internal tempo worklog
+        """
+        def transform_data(data):
+            transformed_output = []
+            for item in data['results']:
+                transformed_output.append({
+                    "attribute_key": item['key'],
+                    "attribute_name": item['name'],
+                    "attribute_type": item['type'],
+                    "attribute_values": json.dumps(item['values']) if 'values' in item.keys() else ""
+                })
+            return transformed_output
+        result = []
+        for data in self._paginate("/work-attributes", self._checked_get):
+            result.extend(transform_data(data))
+        return result
+
+    @_flow(scheduling.FLOW_WORKLOG_ATTRIBUTES)
+    def worklog_attributes(self, worklogs: list) -> list[dict]:
+        """
+        loads attributes for specified worklogs
+
+        worklogs: list(max length 500) - list of worklogs to load attributes for
 
-        jira_worklog_ids: list of unique jira worklog ids
+        returns {
+                tempo_worklog_id: int,
+                attribute_key: str
+                attribute_value: str
+        }
+        """
+        if len(worklogs) > 500:
+            logging.error("[tempo.worklog_attributes] reached limit of worklogs (500)")
+            return
+        req = {
+            "tempoWorklogIds": worklogs
+        }
+        data = self._checked_post("/worklogs/work-attribute-values/search", req)
+        result = []
+        for wl_attrs in data:
+            worklog_id = wl_attrs['tempoWorklogId']
+            for attribute in wl_attrs['workAttributeValues']:
+                result.append({
+                    "tempo_worklog_id": worklog_id,
+                    "attribute_key": attribute['key'],
+                    "attribute_value": attribute['value']
+                })
+        return result
+
+    @_flow(scheduling.FLOW_APPROVALS)
+    def team_timesheet_approvals(self,
+                                 team_id: int,
+                                 date_from: str,
+                                 load_worklogs: bool = True,
+                                 worklog_source: bool = False,
+                                 progress: Optional[Progress] = None,
+                                 resolve_worklogs: Optional[Callable[[dict], Optional[list[int]]]] = None,
+                                 on_approval_worklogs: Optional[Callable[[dict, list[int]], None]] = None
+                                 ) -> list[dict]:
+        """
+        timesheet approvals for specific team in Tempo Period
+
+        team_id: int - id of the team
+        date_from: str - date format yyyy-mm-dd
+        load_worklogs: load worklogs for approvals
+        worklog_source: bool - which worklog ids to load [TEMPO | JIRA]
+        progress: Optional[Progress] - counts fetched approvals and pages
+        resolve_worklogs: Optional[Callable] - tempo worklog ids of an approval known locally
+                    (e.g. WorklogIndex.resolve), None = not known, the worklogs link of the approval is paged
+        on_approval_worklogs: Optional[Callable] - receives (approval, tempo worklog ids) of every paged approval
 
         returns {
-            [tempo_worklog_id : int]: [jira_worklog_id : int],
-            ...
+            period: {from: str, to: str},
+            status: str,
+            user: str (account_id),
+            reviewer: Optional[str] (account_id),
+            approved_by: Optional[str] (account_id),
+            worklogs: [worklog_id, worklog_id, ...]
         }
-    """
-    result = {}
-    req = {
-        'jiraWorklogIds': jira_worklog_ids
-    }
-    data = _checked_post("/worklogs/jira-to-tempo?limit=500", data=req)
-    for map in data['results']:
-        result[map['tempoWorklogId']] = map['jiraWorklogId']
-    next = _parse_next(data['metadata'])
-    while next is not None:
-        data = _checked_post(next, data=req)
-        for map in data['results']:
-            result[map['tempoWorklogId']] = map['jiraWorklogId']
-        next = _parse_next(data['metadata'])
-    return result
-
-
-def team_membership(team_id: int) -> list[dict]:
-    """
-    List of users in Tempo Team. https://apidocs.tempo.io/#tag/Team-Memberships/operation/getAllMemberships
-    """
-    data = _checked_get(f"/team-memberships/team/{team_id}")
-    return data['results']
+        """
+        results: list[dict] = []
+        req = {
+            "from": date_from
+        }
+        data = self._checked_get(f"/timesheet-approvals/team/{team_id}", params=req)
+        if progress is not None:
+            progress.add(rows=len(data['results']), pages=1)
+        for approval in data['results']:
+            approved_by = ""
+            if approval['status']['key'] == "APPROVED":
+                approved_by = approval['status']['actor']['accountId']
+            out = {
+                "period": approval['period'],
+                "status": approval['status']['key'],
+                "user": approval['user']['accountId'],
+                "reviewer": approval['reviewer']['accountId'] if 'reviewer' in approval.keys() else None,
+                "approved_by": approved_by,
+                "worklogs": []
+            }
+            if load_worklogs:
+                tempo_worklog_ids = resolve_worklogs(approval) if resolve_worklogs is not None else None
+                if tempo_worklog_ids is None:
+                    tempo_worklog_ids = []
+                    worklogs = self._worklogs_from_approval(approval, progress)
+                    if worklogs is None:
+                        continue
+                    for worklog in worklogs:
+                        tempo_worklog_ids.append(worklog['tempoWorklogId'])
+                    if on_approval_worklogs is not None:
+                        on_approval_worklogs(approval, tempo_worklog_ids)
+                if worklog_source:  # Loads Jira
+                    map_ttj = self.tempo_to_jira_worklog_ids(tempo_worklog_ids)
+                    if map_ttj is None:
+                        continue
+                    out['worklogs'] = list(map_ttj.values())
+                else:  # Loads Tempo
+                    out['worklogs'] = tempo_worklog_ids
+            results.append(out)
+        return results
+
+    def _worklogs_from_approval(self, approval: dict, progress: Optional[Progress] = None) -> list[dict]:
+        """ worklogs of the approval, only their tempoWorklogId is kept """
+        worklogs_url = str(approval['worklogs']['self'])
+        parsed_url = str(worklogs_url[len(self.base_url):])
+        results = []
+        fetch = partial(self._checked_get, project=_worklog_id_only)
+        for data in self._paginate(parsed_url, fetch, progress, page_key="approval_worklogs"):
+            results.extend(data['results'])
+        return results
+
+    @_flow(scheduling.FLOW_WORKLOGS)
+    def worklogs_updated_from(self,
+                              since: str,
+                              modify_result: Callable = None,
+                              progress: Optional[Progress] = None,
+                              on_page: Optional[Callable[[list[dict]], None]] = None) -> list[dict]:
+        """
+        since: string <yyyy-MM-dd['T'HH:mm:ss]['Z']>
+        progress: Optional[Progress] - counts fetched worklogs and pages
+        on_page: Optional[Callable] - receives every (modified) page as soon as it is loaded,
+                    pages are not collected then and an empty list is returned
+        """
+        return self._updated_worklogs("/worklogs", since, modify_result, progress, on_page)
+
+    @_flow(scheduling.FLOW_WORKLOGS)
+    def worklogs_by_account(self,
+                            account_id: str,
+                            since: str,
+                            modify_result: Callable = None,
+                            progress: Optional[Progress] = None,
+                            on_page: Optional[Callable[[list[dict]], None]] = None) -> list[dict]:
+        """
+        worklogs of one author updated from since, same arguments as worklogs_updated_from
+        https://apidocs.tempo.io/#tag/Worklogs/operation/getWorklogsByUser
+        """
+        return self._updated_worklogs(f"/worklogs/user/{account_id}", since, modify_result, progress, on_page)
+
+    @_flow(scheduling.FLOW_WORKLOGS)
+    def worklogs_by_project(self,
+                            project_id: int | str,
+                            since: str,
+                            modify_result: Callable = None,
+                            progress: Optional[Progress] = None,
+                            on_page: Optional[Callable[[list[dict]], None]] = None) -> list[dict]:
+        """
+        worklogs of one Jira project updated from since, same arguments as worklogs_updated_from
+        https://apidocs.tempo.io/#tag/Worklogs/operation/getWorklogsByProject
+        """
+        return self._updated_worklogs(f"/worklogs/project/{project_id}", since, modify_result, progress, on_page)
+
+    @_flow(scheduling.FLOW_TIMESHEET)
+    def account_worklogs(self,
+                         account_id: str,
+                         date_from: str,
+                         date_to: str,
+                         modify_result: Callable = None) -> list[dict]:
+        """
+        all worklogs of one author with start date in <date_from, date_to> (yyyy-mm-dd, inclusive)
+        https://apidocs.tempo.io/#tag/Worklogs/operation/getWorklogsByUser
+        """
+        result = []
+        req = {
+            "from": date_from,
+            "to": date_to
+        }
+        fetch = partial(self._checked_get, params=req, project=modify_result)
+        for data in self._paginate(f"/worklogs/user/{account_id}", fetch, page_key="worklogs"):
+            result.extend(data['results'])
+        return result
+
+    def _updated_worklogs(self,
+                          endpoint: str,
+                          since: str,
+                          modify_result: Callable = None,
+                          progress: Optional[Progress] = None,
+                          on_page: Optional[Callable[[list[dict]], None]] = None) -> list[dict]:
+        result = []
+        req = {
+            "updatedFrom": since
+        }
+        # items are modified while the page is parsed, the raw page is not kept
+        fetch = partial(self._checked_get, params=req, project=modify_result)
+        for data in self._paginate(endpoint, fetch, progress, page_key="worklogs"):
+            page = data['results']
+            if on_page is not None:
+                on_page(page)
+            else:
+                result.extend(page)
+        return result
+
+    def probe(self, endpoint: str, params: Optional[dict] = None) -> tuple[dict[str, Any], float, dict[str, str]]:
+        """
+        one GET without retries, for cost estimates
+
+        returns (response json, response time in seconds, rate limit headers of the response)
+        raises TempoResponseException - response code is not 2xx
+        """
+        started = time.perf_counter()
+        raw_resp = self._raw_get(endpoint, params)
+        elapsed = time.perf_counter() - started
+        if raw_resp.status_code < 200 or raw_resp.status_code >= 300:
+            raise TempoResponseException(endpoint, raw_resp)
+        headers = {
+            key.lower(): value for key, value in raw_resp.headers.items()
+            if "ratelimit" in key.lower() or key.lower() == "retry-after"
+        }
+        return raw_resp.json(), elapsed, headers
+
+    def worklog_author(self, worklog_id: int) -> str:
+        data = self._checked_get(f"/worklogs/{worklog_id}")
+        return data['author']['accountId']
+
+    def _paginate(self,
+                  endpoint: str,
+                  fetch: Callable[[str], dict[str, Any]],
+                  progress: Optional[Progress] = None,
+                  page_key: Optional[str] = None) -> Iterator[dict[str, Any]]:
+        """
+        yields pages starting at endpoint, following metadata.next until the last page
+
+        fetch: Callable - loads one page, e.g. _checked_get or a partial binding params / request body
+        progress: Optional[Progress] - receives row (metadata.count) and page counts
+        page_key: Optional[str] - paging.PAGE_LIMITS key, the limit of every page request is then set
+                    by the page sizer (or the default limit of the endpoint)
+        """
+        limit = self._page_limit(page_key) if page_key is not None else None
+        next: Optional[str] = endpoint if limit is None else with_limit(endpoint, limit)
+        while next is not None:
+            started = time.perf_counter()
+            try:
+                with self.tracer.span("page", tracing.CAT_PAGE, endpoint=next) as span:
+                    data = fetch(next)
+                    span["rows"] = len(data['results'])
+            except (TempoResponseException, RequestException) as exc:
+                # a smaller page may get through where the big one times out or errors,
+                # client errors other than a rejected page size are not about the page
+                if (self._page_sizer is None or page_key is None
+                        or not _page_size_related(exc)
+                        or not self._page_sizer.record_failure(page_key, limit)):
+                    raise
+                limit = self._page_sizer.limit(page_key)
+                next = with_limit(next, limit)
+                continue
+            if self._page_sizer is not None and page_key is not None:
+                self._page_sizer.record(
+                    page_key,
+                    limit,
+                    len(data['results']),
+                    time.perf_counter() - started,
+                    getattr(self._last_page, "bytes", 0)
+                )
+                limit = self._page_sizer.limit(page_key)
+            if progress is not None:
+                progress.add(rows=data['metadata'].get('count', len(data['results'])), pages=1)
+            yield data
+            next = self._parse_next(data['metadata'])
+            if next is not None and limit is not None:
+                next = with_limit(next, limit)
+
+    def _page_limit(self, page_key: str) -> int:
+        return self._page_sizer.limit(page_key) if self._page_sizer is not None else default_limit(page_key)
+
+    def _parse_next(self, metadata: dict) -> Optional[str]:
+        next: Optional[str] = metadata['next'] if "next" in metadata.keys() else None
+        if next is not None:
+            return next[len(self.base_url):]
+        return None
+
+    def _raw_get(self, endpoint, params=None, stream: bool = False, timeout: Optional[float] = None) -> Response:
+        assert endpoint is not None and len(endpoint) > 0
+        with self.scheduler.slot():
+            raw_response = self._transport.get(f"{self.base_url}{endpoint}", params=params, stream=stream,
+                                               timeout=timeout)
+        return raw_response
+
+    def _raw_post(self, endpoint, data: Optional[dict] = None) -> Response:
+        assert endpoint is not None and len(endpoint) > 0
+        with self.scheduler.slot():
+            raw_response = self._transport.post(f"{self.base_url}{endpoint}", json.dumps(data))
+        return raw_response
+
+    def _hedged_get(self, endpoint: str, params: Optional[dict] = None) -> Response:
+        """
+        GET that is duplicated when it has not returned within the p95 latency of the endpoint.
+        The request runs on the calling thread, only the duplicate is sent from the hedge pool - when the delay
+        has passed since the request started, so time spent waiting for a pool thread never counts against it.
+        The request waits for a response at most _HEDGE_CUTOFF times the delay, the duplicate wins when it
+        answered first or when the request timed out or failed; the other response is discarded.
+        """
+        delay = self._latency.hedge_delay(endpoint)
+        if delay is None:
+            return self._timed_get(endpoint, params)
+        returned, sent = threading.Event(), threading.Event()
+        hedge = self._hedge_pool.submit(self._hedge, endpoint, params, self.scheduler.current_flow(),
+                                        time.monotonic() + delay, returned, sent)
+        response: Optional[Response] = None
+        error: Optional[RequestException] = None
+        try:
+            response = self._timed_get(endpoint, params, timeout=_HEDGE_CUTOFF * delay)
+            returned.set()
+        except Timeout as e:
+            # the duplicate is sent even when it is still waiting for a pool thread
+            error = e
+        except RequestException as e:
+            error = e
+            returned.set()
+        if _succeeded(response) and not (hedge.done() and _succeeded(_result_or_none(hedge))):
+            _discard(hedge)
+            return response
+        if sent.is_set() or not returned.is_set():
+            duplicate = _result_or_none(hedge)
+            if duplicate is not None and (_succeeded(duplicate) or response is None):
+                if response is not None:
+                    response.close()
+                return duplicate
+        _discard(hedge)
+        if response is not None:
+            return response
+        raise error
+
+    def _hedge(self,
+               endpoint: str,
+               params: Optional[dict],
+               flow: str,
+               deadline: float,
+               returned: threading.Event,
+               sent: threading.Event) -> Optional[Response]:
+        """ duplicate of a hedged GET, sent when the request has not returned by the deadline """
+        if returned.wait(max(0.0, deadline - time.monotonic())):
+            return None
+        sent.set()
+        logging.debug(f"TEMPO-API {endpoint} slow - sending hedged request")
+        return self._timed_get(endpoint, params, flow)
+
+    def _timed_get(self,
+                   endpoint: str,
+                   params: Optional[dict] = None,
+                   flow: Optional[str] = None,
+                   timeout: Optional[float] = None) -> Response:
+        started = time.monotonic()
+        if flow is None:
+            raw_resp = self._raw_get(endpoint, params, timeout=timeout)
+        else:
+            # runs on a hedging thread, the flow of the caller is passed along
+            with self.scheduler.flow(flow):
+                raw_resp = self._raw_get(endpoint, params, timeout=timeout)
+        if _succeeded(raw_resp):
+            self._latency.record(endpoint, time.monotonic() - started)
+        return raw_resp
+
+    def _request_span(self, method: str, endpoint: str, attempt: int):
+        """ span of one request attempt, named by the endpoint path (without the query of pagination links) """
+        return self.tracer.span(f"{method} {endpoint.split('?')[0]}", tracing.CAT_REQUEST,
+                                endpoint=endpoint, attempt=attempt, flow=self.scheduler.current_flow())
+
+    def _record_outcome(self, raw_resp: Optional[Response]):
+        """ None = the request failed (timeout, connection error, ...) """
+        if self._breaker is not None:
+            self._breaker.record(_succeeded(raw_resp))
+
+    def _checked_get(self,
+                     endpoint: str,
+                     params: Optional[dict] = None,
+                     project: Optional[Callable[[dict], Any]] = None,
+                     _retry_count: int = 0) -> dict[str, Any]:
+        """
+        Description:
+            calls the specified endpoint with GET method, then validates the response and returns it as a python-dict
+            on fail call will be retried _MAX_RETRY_COUNT number of times with delay of _RETRY_DELAY_SEC
+            with hedging enabled a slow call is duplicated, with circuit breaker enabled the call waits
+            while the breaker is open
+        Args:
+            endpoint: str - tempo endpoint to call,
+                            for example in url: https://api.tempo.io/4/worklogs/tempo-to-jira
+                            endpoint = /worklogs/tempo-to-jira
+            params: *optional* dict - data that will be sent as request parameters
+            project: *optional* Callable - maps every item of page results, with stream_json the page
+                            is parsed from the response stream and only the projected items are kept
+        Returns:
+            Response.json()
+        Raises:
+            TempoResponseException - response code is not 2xx
+            Exception - Response object is None or when the response content is empty string or invalid JSON
+        """
+        assert endpoint is not None and len(endpoint) > 0
+        stream = project is not None and self._stream_json
+        if self._breaker is not None:
+            self._breaker.wait()
+        with self._request_span("GET", endpoint, _retry_count) as span:
+            try:
+                if self._latency is not None:
+                    raw_resp = self._hedged_get(endpoint, params)
+                else:
+                    raw_resp = self._raw_get(endpoint, params, stream=stream)
+            except BaseException:
+                self._record_outcome(None)
+                raise
+            _trace_status(span, raw_resp)
+        self._record_outcome(raw_resp)
+        if raw_resp is None:
+            raise Exception(f"Response object is None - {endpoint}")
+        if raw_resp.status_code < 200 or raw_resp.status_code >= 300:
+            if _retry_count < _MAX_RETRY_COUNT:
+                raw_resp.close()
+                with self.tracer.span("retry wait", tracing.CAT_REQUEST, endpoint=endpoint):
+                    time.sleep(_RETRY_DELAY_SEC)
+                logging.warning(f"WARN TEMPO-API {endpoint} [{raw_resp.status_code}]"
+                                + f" failed - retrying {_retry_count} / {_MAX_RETRY_COUNT}")
+                return self._checked_get(endpoint, params, project, _retry_count + 1)
+            else:
+                raise TempoResponseException(endpoint, raw_resp)
+        if stream:
+            return self._parse_streamed(endpoint, raw_resp, project)
+        if self._page_sizer is not None:
+            self._last_page.bytes = len(raw_resp.content)
+        data = {}
+        try:
+            data = raw_resp.json()
+        except JSONDecodeError:
+            raise Exception(f"Invalid JSON in response from TEMPO-API ({endpoint}) - response.text='{raw_resp.text}'")
+        if project is not None:
+            data['results'] = [project(item) for item in data['results']]
+        return data
+
+    def _parse_streamed(self, endpoint: str, raw_resp: Response, project: Callable[[dict], Any]) -> dict[str, Any]:
+        # undo gzip / deflate, the raw stream is what came over the wire
+        raw_resp.raw.decode_content = True
+        reader = streaming.CountingReader(raw_resp.raw)
+        try:
+            data = streaming.parse_page(reader, project)
+        except ValueError as e:
+            raise Exception(f"Invalid JSON in response from TEMPO-API ({endpoint}) - {e}")
+        finally:
+            raw_resp.close()
+        self._last_page.bytes = reader.bytes
+        return data
+
+    def _checked_post(self, endpoint: str, data: Optional[dict] = None, _retry_count: int = 0) -> dict[str, Any]:
+        """
+        Description:
+            calls the specified endpoint with POST method, then validates the response and returns it as a python-dict
+            on fail call will be retried _MAX_RETRY_COUNT number of times with delay of _RETRY_DELAY_SEC
+        Args:
+            endpoint: str - tempo endpoint to call,
+                            for example in url: https://api.tempo.io/4/worklogs/tempo-to-jira
+                            endpoint = /worklogs/tempo-to-jira
+            data: *optional* dict - data that will be sent in request body as JSON
+        Returns:
+            Response.json()
+        Raises:
+            TempoResponseException - response code is not 2xx
+            Exception - Response object is None or when the response content is empty string or invalid JSON
+        """
+        assert endpoint is not None and len(endpoint) > 0
+        if self._breaker is not None:
+            self._breaker.wait()
+        with self._request_span("POST", endpoint, _retry_count) as span:
+            try:
+                raw_resp = self._raw_post(endpoint, data)
+            except BaseException:
+                self._record_outcome(None)
+                raise
+            _trace_status(span, raw_resp)
+        self._record_outcome(raw_resp)
+        if raw_resp is None:
+            raise Exception(f"Response object is None - {endpoint}")
+        if raw_resp.status_code < 200 or raw_resp.status_code >= 300:
+            if _retry_count < _MAX_RETRY_COUNT:
+                with self.tracer.span("retry wait", tracing.CAT_REQUEST, endpoint=endpoint):
+                    time.sleep(_RETRY_DELAY_SEC)
+                logging.warning(f"WARN TEMPO-API {endpoint} [{raw_resp.status_code}]"
+                                + f" failed - retrying {_retry_count} / {_MAX_RETRY_COUNT}")
+                return self._checked_post(endpoint, data, _retry_count + 1)
+            else:
+                raise TempoResponseException(endpoint, raw_resp)
+        if self._page_sizer is not None:
+            self._last_page.bytes = len(raw_resp.content)
+        data = {}
+        try:
+            data = raw_resp.json()
+        except JSONDecodeError:
+            raise Exception(f"Invalid JSON in response from TEMPO-API ({endpoint}) - response.text='{raw_resp.text}'")
+        return data
+
+
+def _succeeded(raw_resp: Optional[Response]) -> bool:
+    return raw_resp is not None and 200 <= raw_resp.status_code < 300
+
+
+def _result_or_none(future: Future) -> Optional[Response]:
+    """ response of a hedged request, None when it was not sent or failed """
+    try:
+        return future.result()
+    except (CancelledError, RequestException):
+        return None
 
 
-def teams() -> list[dict]:
-    """
-    List of teams in tempo. https://apidocs.tempo.io/#tag/Team
+def _discard(future: Future):
+    """ a hedged request that lost is not sent or its response is closed once it arrives """
+    if not future.cancel():
+        future.add_done_callback(_close_result)
 
-    returns [
-        { id: text, summary: text, name: text, members: link }, ...
-    ]
-    """
-    teams = []
-    req = {
-        "offset": 0,
-        "limit": 50
-    }
-    data = _checked_get("/teams", params=req)
-    teams.extend(data['results'])
-    next = _parse_next(data['metadata'])
-    while next is not None:
-        data = _checked_get(next, params=req)
-        teams.extend(data['results'])
-        next = _parse_next(data['metadata'])
-    return teams
-
-
-def attribute_config() -> list[dict[str, Any]]:
-    """
-    returns {
-        attribute_key: str,
-        attribute_name: str,
-        attribute_type: str,
-        attribute_values: str(json)
-    }
-    """
-    def transform_data(data):
-        transformed_output = []
-        for item in data['results']:
-            transformed_output.append({
-                "attribute_key": item['key'],
-                "attribute_name": item['name'],
-                "attribute_type": item['type'],
-                "attribute_values": json.dumps(item['values']) if 'values' in item.keys() else ""
-            })
-        return transformed_output
-    result = []
-    data = _checked_get("/work-attributes")
-    result.extend(transform_data(data))
-    next = _parse_next(data['metadata'])
-    while next is not None:
-        data = _checked_get(next)
-        result.extend(transform_data(data))
-        next = _parse_next(data['metadata'])
-    return result
-
-
-def worklog_attributes(worklogs: list) -> list[dict]:
-    """
-    loads attributes for specified worklogs
 
-    worklogs: list(max length 500) - list of worklogs to load attributes for
+def _close_result(future: Future):
+    response = _result_or_none(future)
+    if response is not None:
+        response.close()
 
-    returns {
-            tempo_worklog_id: int,
-            attribute_key: str
-            attribute_value: str
-    }
-    """
-    if len(worklogs) > 500:
-        logging.error("[tempo.worklog_attributes] reached limit of worklogs (500)")
-        return
-    req = {
-        "tempoWorklogIds": worklogs
-    }
-    data = _checked_post("/worklogs/work-attribute-values/search", req)
-    result = []
-    for wl_attrs in data:
-        worklog_id = wl_attrs['tempoWorklogId']
-        for attribute in wl_attrs['workAttributeValues']:
-            result.append({
-                "tempo_worklog_id": worklog_id,
-                "attribute_key": attribute['key'],
-                "attribute_value": attribute['value']
-            })
-    return result
-
-
-def team_timesheet_approvals(team_id: int,
-                             date_from: str,
-                             load_worklogs: bool = True,
-                             worklog_source: bool = False) -> list[dict]:
-    """
-    timesheet approvals for specific team in Tempo Period
-
-    team_id: int - id of the team
-    date_from: str - date format yyyy-mm-dd
-    load_worklogs: load worklogs for approvals
-    worklog_source: bool - which worklog ids to load [TEMPO | JIRA]
-
-    returns {
-        period: {from: str, to: str},
-        status: str,
-        user: str (account_id),
-        reviewer: Optional[str] (account_id),
-        approved_by: Optional[str] (account_id),
-        worklogs: [worklog_id, worklog_id, ...]
-    }
-    """
-    results: list[dict] = []
-    req = {
-        "from": date_from
-    }
-    data = _checked_get(f"/timesheet-approvals/team/{team_id}", params=req)
-    for approval in data['results']:
-        approved_by = ""
-        if approval['status']['key'] == "APPROVED":
-            approved_by = approval['status']['actor']['accountId']
-        out = {
-            "period": approval['period'],
-            "status": approval['status']['key'],
-            "user": approval['user']['accountId'],
-            "reviewer": approval['reviewer']['accountId'] if 'reviewer' in approval.keys() else None,
-            "approved_by": approved_by,
-            "worklogs": []
-        }
-        if load_worklogs:
-            tempo_worklog_ids = []
-            worklogs = _worklogs_from_approval(approval)
-            if worklogs is None:
-                continue
-            for worklog in worklogs:
-                tempo_worklog_ids.append(worklog['tempoWorklogId'])
-            if worklog_source:  # Loads Jira
-                map_ttj = tempo_to_jira_worklog_ids(tempo_worklog_ids)
-                if map_ttj is None:
-                    continue
-                out['worklogs'] = list(map_ttj.values())
-            else:  # Loads Tempo
-                out['worklogs'] = tempo_worklog_ids
-        results.append(out)
-    return results
-
-
-def _worklogs_from_approval(approval: dict) -> list[dict]:
-    worklogs_url = str(approval['worklogs']['self'])
-    parsed_url = str(worklogs_url[len(_base_url):])
-    results = []
-    # Load first page
-    data = _checked_get(parsed_url)
-    results.extend(data['results'])
-    next = _parse_next(data['metadata'])
-    # Load rest of the pages if exists
-    while next is not None:
-        data = _checked_get(next)
-        results.extend(data['results'])
-        next = _parse_next(data['metadata'])
-    return results
-
-
-def worklogs_updated_from(since: str, modify_result: Callable = None) -> list[dict]:
-    """
-    since: string <yyyy-MM-dd['T'HH:mm:ss]['Z']>
-    """
-    result = []
-    req = {
-        "updatedFrom": since,
-        "limit": 5000
-    }
-    data = _checked_get("/worklogs", params=req)
-    for item in data['results']:
-        modified_item = item
-        if modify_result is not None:
-            modified_item = modify_result(item)
-        result.append(modified_item)
-    next = _parse_next(data['metadata'])
-    while next is not None:
-        data = _checked_get(next, params=req)
-        for item in data['results']:
-            modified_item = item
-            if modify_result is not None:
-                modified_item = modify_result(item)
-            result.append(modified_item)
-        next = _parse_next(data['metadata'])
-    return result
-
-
-def worklog_author(worklog_id: int) -> str:
-    data = _checked_get(f"/worklogs/{worklog_id}")
-    return data['author']['accountId']
-
-
-def _parse_next(metadata: dict) -> Optional[str]:
-    next: Optional[str] = metadata['next'] if "next" in metadata.keys() else None
-    if next is not None:
-        return next[len(_base_url):]
-    return None
-
-
-def _raw_get(endpoint, params=None) -> Response:
-    assert endpoint is not None and len(endpoint) > 0
-    raw_response = _s.get(f"{_base_url}{endpoint}", params=params)
-    return raw_response
-
-
-def _raw_post(endpoint, data: Optional[dict] = None) -> Response:
-    assert endpoint is not None and len(endpoint) > 0
-    raw_response = _s.post(f"{_base_url}{endpoint}", data=json.dumps(data))
-    return raw_response
-
-
-def _checked_get(endpoint: str, params: Optional[dict] = None, _retry_count: int = 0) -> dict[str, Any]:
-    """
-    Description:
-        calls the specified endpoint with GET method, then validates the response and returns it as a python-dict
-        on fail call will be retried _MAX_RETRY_COUNT number of times with delay of _RETRY_DELAY_SEC
-    Args:
-        endpoint: str - tempo endpoint to call,
-                        for example in url: https://api.tempo.io/4/worklogs/tempo-to-jira
-                        endpoint = /worklogs/tempo-to-jira
-        params: *optional* dict - data that will be sent as request parameters
-    Returns:
-        Response.json()
-    Raises:
-        TempoResponseException - response code is not 2xx
-        Exception - Response object is None or when the response content is empty string or invalid JSON
-    """
-    assert endpoint is not None and len(endpoint) > 0
-    raw_resp = _raw_get(endpoint, params)
-    if raw_resp is None:
-        raise Exception(f"Response object is None - {endpoint}")
-    if raw_resp.status_code < 200 or raw_resp.status_code >= 300:
-        if _retry_count < _MAX_RETRY_COUNT:
-            time.sleep(_RETRY_DELAY_SEC)
-            logging.warning(f"WARN TEMPO-API {endpoint} [{raw_resp.status_code}]"
-                            + f" failed - retrying {_retry_count} / {_MAX_RETRY_COUNT}")
-            return _checked_get(endpoint, params, _retry_count + 1)
-        else:
-            raise TempoResponseException(endpoint, raw_resp)
-    data = {}
-    try:
-        data = raw_resp.json()
-    except JSONDecodeError:
-        raise Exception(f"Invalid JSON in response from TEMPO-API ({endpoint}) - response.text='{raw_resp.text}'")
-    return data
 
+def _trace_status(span: dict, raw_resp: Optional[Response]):
+    if raw_resp is not None:
+        span["status"] = raw_resp.status_code
+        if raw_resp.status_code < 200 or raw_resp.status_code >= 300:
+            span["outcome"] = f"http {raw_resp.status_code}"
 
-def _checked_post(endpoint: str, data: Optional[dict] = None, _retry_count: int = 0) -> dict[str, Any]:
-    """
-    Description:
-        calls the specified endpoint with POST method, then validates the response and returns it as a python-dict
-        on fail call will be retried _MAX_RETRY_COUNT number of times with delay of _RETRY_DELAY_SEC
-    Args:
-        endpoint: str - tempo endpoint to call,
-                        for example in url: https://api.tempo.io/4/worklogs/tempo-to-jira
-                        endpoint = /worklogs/tempo-to-jira
-        data: *optional* dict - data that will be sent in request body as JSON
-    Returns:
-        Response.json()
-    Raises:
-        TempoResponseException - response code is not 2xx
-        Exception - Response object is None or when the response content is empty string or invalid JSON
-    """
-    assert endpoint is not None and len(endpoint) > 0
-    raw_resp = _raw_post(endpoint, data)
-    if raw_resp is None:
-        raise Exception(f"Response object is None - {endpoint}")
-    if raw_resp.status_code < 200 or raw_resp.status_code >= 300:
-        if _retry_count < _MAX_RETRY_COUNT:
-            time.sleep(_RETRY_DELAY_SEC)
-            logging.warning(f"WARN TEMPO-API {endpoint} [{raw_resp.status_code}]"
-                            + f" failed - retrying {_retry_count} / {_MAX_RETRY_COUNT}")
-            return _checked_post(endpoint, data, _retry_count + 1)
-        else:
-            raise TempoResponseException(endpoint, raw_resp)
-    data = {}
-    try:
-        data = raw_resp.json()
-    except JSONDecodeError:
-        raise Exception(f"Invalid JSON in response from TEMPO-API ({endpoint}) - response.text='{raw_resp.text}'")
-    return data
+
+def _page_size_related(exc: Exception) -> bool:
+    """ failures a smaller page can help with - timeouts, dropped connections, 5xx, 400 and 413 """
+    if isinstance(exc, TempoResponseException):
+        return exc.httpcode >= 500 or exc.httpcode in (400, 413)
+    return True
+
+
+def _worklog_id_only(worklog: dict) -> dict:
+    return {'tempoWorklogId': worklog['tempoWorklogId']}
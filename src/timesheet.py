@@ -0,0 +1,146 @@
+from keboola.component.dao import BaseType, ColumnDefinition, SupportedDataTypes, logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Any, Iterator, Optional
+import tempo
+import team_membership
+import threading
+import worklogs
+
+
+FILENAME = "timesheet_daily.csv"
+
+_COL_ACCOUNT_ID = "account_id"
+_COL_DATE = "date"
+_COL_TEAM_ID = "team_id"
+_COL_TIME_SPENT_SECONDS = "time_spent_seconds"
+_COL_WORKLOG_COUNT = "worklog_count"
+
+_NO_TEAM = ""
+
+
+def column_definitions() -> dict[str, ColumnDefinition]:
+    return {
+        _COL_ACCOUNT_ID: ColumnDefinition(
+            data_types=BaseType(dtype=SupportedDataTypes.STRING, length="300"),
+            nullable=False,
+            primary_key=True,
+            description="author of the worklogs"
+        ),
+        _COL_DATE: ColumnDefinition(
+            data_types=BaseType(dtype=SupportedDataTypes.DATE),
+            nullable=False,
+            primary_key=True,
+            description="UTC start date of the worklogs"
+        ),
+        _COL_TEAM_ID: ColumnDefinition(
+            data_types=BaseType(dtype=SupportedDataTypes.STRING, length="20"),
+            nullable=False,
+            primary_key=True,
+            description="team of the author, empty when the author is not a member of any team"
+        ),
+        _COL_TIME_SPENT_SECONDS: ColumnDefinition(
+            data_types=BaseType(dtype=SupportedDataTypes.INTEGER),
+            nullable=False,
+            primary_key=False,
+            description="time spent by the author on the day"
+        ),
+        _COL_WORKLOG_COUNT: ColumnDefinition(
+            data_types=BaseType(dtype=SupportedDataTypes.INTEGER),
+            nullable=False,
+            primary_key=False,
+            description="number of worklogs of the author on the day"
+        ),
+    }
+
+
+class TimesheetAccumulator:
+    """
+    Daily time spent per author, summed from worklog pages while they are downloaded.
+
+    Only (author, day) buckets touched by a worklog updated since `since` are kept and emitted.
+    Buckets dated since `since` are complete from the streamed pages (their worklogs were all
+    created, so updated, since then), buckets dated before it hold only the changed worklogs
+    and are recomputed from the per-author worklog listing by refresh().
+
+    since: datetime - updatedFrom of the worklog download
+    """
+
+    def __init__(self, since: datetime):
+        self._since = str(since.date())
+        # (account_id, yyyy-mm-dd) -> [time spent seconds, worklog count]
+        self._buckets: dict[tuple[str, str], list[int]] = {}
+        self._lock = threading.Lock()
+
+    def add_page(self, page: list[dict[str, Any]]):
+        """ page: list - worklogs mapped by worklogs._map_worklog_to_table, may be called from several threads """
+        with self._lock:
+            _add_worklogs(self._buckets, page)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def refresh(self, client: tempo.TempoClient, max_workers: int = worklogs.DEFAULT_MAX_WORKERS):
+        """
+        recomputes buckets dated before since from all worklogs of their authors
+        """
+        stale: dict[str, set[str]] = {}
+        for account_id, day in self._buckets.keys():
+            if day < self._since:
+                stale.setdefault(account_id, set()).add(day)
+        if len(stale) == 0:
+            return
+        logging.info(f"recomputing timesheet days changed before {self._since} of {len(stale)} accounts")
+
+        def load(account_id: str):
+            days = stale[account_id]
+            # startDate filter of the API is in the author's timezone, buckets are UTC days
+            date_from = date.fromisoformat(min(days)) - timedelta(days=1)
+            date_to = date.fromisoformat(max(days)) + timedelta(days=1)
+            data = client.account_worklogs(account_id, str(date_from), str(date_to), worklogs._map_worklog_to_table)
+            buckets: dict[tuple[str, str], list[int]] = {}
+            _add_worklogs(buckets, (wl for wl in data if _day(wl) in days))
+            with self._lock:
+                for day in days:
+                    # a day left without worklogs (all deleted / moved) is kept with zero time
+                    self._buckets[(account_id, day)] = buckets.get((account_id, day), [0, 0])
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="timesheet") as pool:
+            for future in [pool.submit(load, account_id) for account_id in stale.keys()]:
+                future.result()
+
+    def rows(self, memberships: Optional[list[dict]] = None) -> Iterator[dict[str, Any]]:
+        """
+        one row per bucket and team of its author
+
+        memberships: Optional[list] - team membership table rows, None = team_id is left empty
+        """
+        teams: dict[str, list[str]] = {}
+        for membership in memberships or []:
+            teams.setdefault(membership[team_membership._COL_USER_ID], []).append(
+                str(membership[team_membership._COL_TEAM_ID])
+            )
+        for (account_id, day), (seconds, count) in sorted(self._buckets.items()):
+            for team_id in teams.get(account_id, [_NO_TEAM]):
+                yield {
+                    _COL_ACCOUNT_ID: account_id,
+                    _COL_DATE: day,
+                    _COL_TEAM_ID: team_id,
+                    _COL_TIME_SPENT_SECONDS: seconds,
+                    _COL_WORKLOG_COUNT: count
+                }
+
+
+def _add_worklogs(buckets: dict[tuple[str, str], list[int]], data):
+    for wl in data:
+        key = (wl[worklogs._COL_AUTHOR_ACCOUNT_ID], _day(wl))
+        bucket = buckets.get(key)
+        if bucket is None:
+            buckets[key] = [wl[worklogs._COL_TIME_SPENT_SECONDS], 1]
+        else:
+            bucket[0] += wl[worklogs._COL_TIME_SPENT_SECONDS]
+            bucket[1] += 1
+
+
+def _day(wl: dict[str, Any]) -> str:
+    return wl[worklogs._COL_START_DATE_TIME_UTC][:10]
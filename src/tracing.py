@@ -0,0 +1,107 @@
+from keboola.component.dao import logging
+from contextlib import contextmanager
+from typing import Any, Iterator
+import json
+import os
+import threading
+import time
+
+
+TRACING_ENV = "KBC_TEMPO_TRACING"
+FILENAME = "trace.json"
+
+# span levels (Chrome trace categories)
+CAT_RUN = "run"
+CAT_DATASET = "dataset"
+CAT_UNIT = "unit"
+CAT_PAGE = "page"
+CAT_REQUEST = "request"
+
+OUTCOME_OK = "ok"
+
+
+def enabled_by_env() -> bool:
+    """ tracing can be switched on without touching the configuration by setting KBC_TEMPO_TRACING=1 """
+    return os.environ.get(TRACING_ENV, "").strip().lower() in ("1", "true", "yes")
+
+
+class Tracer:
+    """
+    Records spans of a run - run, dataset, unit of work (team / period), page and HTTP request
+    (every attempt and retry wait) - and writes them as a Chrome trace
+    (open in chrome://tracing or https://ui.perfetto.dev), every thread is one row of the waterfall.
+
+    Every span has its start and duration, the endpoint where it applies, and args.outcome:
+    "ok", the HTTP status of a failed request ("http 429") or the exception that ended it.
+    When disabled, span() is a no-op context manager. Safe to share between threads.
+
+    enabled: bool - record spans
+    out_dir: str - directory of the trace file
+    prefix: str - prefix of the trace file name (tenant namespace in batch runs)
+    """
+
+    def __init__(self, enabled: bool, out_dir: str = "", prefix: str = ""):
+        self.enabled = enabled
+        self.out_dir = out_dir
+        self.prefix = prefix
+        self._events: list[dict[str, Any]] = []
+        self._threads: dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    @contextmanager
+    def span(self, name: str, cat: str, **args: Any) -> Iterator[dict[str, Any]]:
+        """
+        records the block as a span, yields its args - values added to them are kept with the span,
+        an "outcome" set within the block replaces "ok"
+        """
+        if not self.enabled:
+            yield args
+            return
+        started = time.perf_counter_ns()
+        try:
+            yield args
+        except BaseException as e:
+            args["outcome"] = f"error: {type(e).__name__}"
+            raise
+        finally:
+            args.setdefault("outcome", OUTCOME_OK)
+            self._record(name, cat, started, time.perf_counter_ns(), args)
+
+    def _record(self, name: str, cat: str, started: int, finished: int, args: dict[str, Any]):
+        thread = threading.current_thread()
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": started / 1000,
+            "dur": (finished - started) / 1000,
+            "pid": self._pid,
+            "tid": thread.ident,
+            "args": args
+        }
+        with self._lock:
+            self._events.append(event)
+            self._threads.setdefault(thread.ident, thread.name)
+
+    def events(self) -> list[dict[str, Any]]:
+        """ recorded spans in the order they finished """
+        with self._lock:
+            return list(self._events)
+
+    def write(self) -> str:
+        """ writes <prefix>trace.json into out_dir, returns its path (nothing is written when disabled) """
+        if not self.enabled:
+            return ""
+        with self._lock:
+            names = [
+                {"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid, "args": {"name": name}}
+                for tid, name in self._threads.items()
+            ]
+            trace = {"traceEvents": names + self._events, "displayTimeUnit": "ms"}
+            os.makedirs(self.out_dir, exist_ok=True)
+            path = os.path.join(self.out_dir, f"{self.prefix}{FILENAME}")
+            with open(path, "wt", encoding="utf-8") as out_file:
+                json.dump(trace, out_file, default=str)
+            logging.info(f"[tracing] {len(self._events)} spans written to {path}")
+        return path
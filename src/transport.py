@@ -0,0 +1,198 @@
+from requests import Response
+from requests import exceptions as requests_exceptions
+from sessions import SessionProvider, DEFAULT_POOL_SIZE
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+import json
+
+try:
+    import httpx
+except ImportError:  # optional dependency - the requests transport is used without it
+    httpx = None
+
+
+TRANSPORT_REQUESTS = "requests"
+TRANSPORT_HTTP2 = "http2"
+
+# requests failed because the server terminated their connection are sent again this many times
+_MAX_RECONNECTS = 2
+
+
+def http2_available() -> bool:
+    """ httpx with the h2 package installed """
+    if httpx is None:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class RequestsTransport:
+    """
+    HTTP/1.1 transport on requests Sessions - every concurrent request needs its own connection.
+
+    headers: dict - sent with every request
+    pool_size: int - max number of kept connections per host
+    keep_alive: bool - reuse connections between requests
+    per_thread: bool - give every worker thread its own Session instead of sharing one
+    """
+
+    def __init__(self,
+                 headers: dict[str, str],
+                 pool_size: int = DEFAULT_POOL_SIZE,
+                 keep_alive: bool = True,
+                 per_thread: bool = False):
+        self._sessions = SessionProvider(
+            configure=lambda session: session.headers.update(headers),
+            pool_size=pool_size,
+            keep_alive=keep_alive,
+            per_thread=per_thread
+        )
+
+    def get(self, url: str, params: Optional[dict] = None, stream: bool = False,
+            timeout: Optional[float] = None) -> Response:
+        """ timeout: Optional[float] - max seconds to wait for the connection and for every read, None = no limit """
+        return self._sessions.get().get(url, params=params, stream=stream, timeout=timeout)
+
+    def post(self, url: str, body: str) -> Response:
+        return self._sessions.get().post(url, data=body)
+
+    def close(self):
+        self._sessions.close()
+
+
+class Http2Transport:
+    """
+    HTTP/2 transport on one thread-safe httpx Client - concurrent requests are multiplexed
+    as streams over a few connections, so pool_size connections serve any number of threads.
+
+    Responses and errors are adapted to what requests returns / raises,
+    the client code is the same for both transports. Requests of a connection the server closed
+    or dropped (GOAWAY, e.g. after its max requests per connection) are sent again on a new one -
+    with multiplexing a lost connection fails all requests in flight at once.
+
+    headers: dict - sent with every request
+    pool_size: int - max number of connections
+    keep_alive: bool - reuse connections between requests
+
+    HTTP/2 is negotiated through TLS ALPN, servers without it are talked to over HTTP/1.1.
+    """
+
+    def __init__(self,
+                 headers: dict[str, str],
+                 pool_size: int = DEFAULT_POOL_SIZE,
+                 keep_alive: bool = True):
+        assert http2_available(), "httpx and h2 are required for the HTTP/2 transport"
+        self._client = httpx.Client(
+            headers=headers,
+            http2=True,
+            limits=httpx.Limits(max_connections=pool_size,
+                                max_keepalive_connections=pool_size if keep_alive else 0),
+            # no overall limit - same as requests, slow pages are handled by retries / hedging
+            timeout=httpx.Timeout(None, connect=30.0, pool=None)
+        )
+
+    def get(self, url: str, params: Optional[dict] = None, stream: bool = False,
+            timeout: Optional[float] = None) -> "Http2Response":
+        """ timeout: Optional[float] - max seconds to wait for every read, None = no limit """
+        # params are added to the query of the url (pagination links) like requests does,
+        # httpx would replace it
+        url = httpx.URL(url).copy_merge_params(params) if params else url
+        request = self._client.build_request("GET", url)
+        if timeout is not None:
+            request.extensions["timeout"] = httpx.Timeout(None, connect=30.0, read=timeout, pool=None).as_dict()
+        return self._send(request, stream)
+
+    def post(self, url: str, body: str) -> "Http2Response":
+        # POSTs of the Tempo client are searches / id mappings, safe to send again
+        return self._send(self._client.build_request("POST", url, content=body), False)
+
+    def _send(self, request: "httpx.Request", stream: bool) -> "Http2Response":
+        with _mapped_errors():
+            for attempt in range(_MAX_RECONNECTS + 1):
+                try:
+                    return Http2Response(self._client.send(request, stream=stream))
+                except (httpx.RemoteProtocolError, httpx.ReadError, httpx.WriteError):
+                    if attempt == _MAX_RECONNECTS:
+                        raise
+
+    def close(self):
+        self._client.close()
+
+
+class Http2Response:
+    """
+    requests.Response look-alike of a httpx response (the part used by the API clients)
+    """
+
+    def __init__(self, response: "httpx.Response"):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self._raw: Optional[_StreamReader] = None
+
+    @property
+    def http_version(self) -> str:
+        return self._response.http_version
+
+    @property
+    def content(self) -> bytes:
+        with _mapped_errors():
+            return self._response.read()
+
+    @property
+    def text(self) -> str:
+        with _mapped_errors():
+            self._response.read()
+        return self._response.text
+
+    @property
+    def raw(self) -> "_StreamReader":
+        """ file-like body stream, already decoded (gzip / deflate) like raw with decode_content=True """
+        if self._raw is None:
+            self._raw = _StreamReader(self._response.iter_bytes())
+        return self._raw
+
+    def json(self) -> Any:
+        text = self.text
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError as e:
+            raise requests_exceptions.JSONDecodeError(e.msg, e.doc, e.pos)
+
+    def close(self):
+        self._response.close()
+
+
+class _StreamReader:
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._buffer = b""
+        self.decode_content = True
+
+    def read(self, size: int = -1) -> bytes:
+        with _mapped_errors():
+            if size < 0:
+                data = self._buffer + b"".join(self._chunks)
+                self._buffer = b""
+                return data
+            while len(self._buffer) < size:
+                chunk = next(self._chunks, None)
+                if chunk is None:
+                    break
+                self._buffer += chunk
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+            return data
+
+
+@contextmanager
+def _mapped_errors():
+    """ raises httpx transport errors as the matching requests exceptions """
+    try:
+        yield
+    except httpx.TimeoutException as e:
+        raise requests_exceptions.Timeout(str(e)) from e
+    except httpx.TransportError as e:
+        raise requests_exceptions.ConnectionError(str(e)) from e
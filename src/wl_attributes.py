@@ -1,7 +1,13 @@
 #!/usr/bin/env python3.10
 from keboola.component.dao import BaseType, ColumnDefinition, SupportedDataTypes, logging
+import deferred
 import tempo
-from typing import Any
+from progress import Progress
+from functools import partial
+from typing import Any, Callable, Iterable, Optional
+import hashlib
+import json
+import threading
 
 
 _TABLE_WL_ATTR = "worklog_attributes"
@@ -10,6 +16,8 @@ _TABLE_WL_ATTR_CONFIG = "worklog_attributes_config"
 FILENAME_WL_ATTR = "worklog_attributes.csv"
 FILENAME_WL_ATTR_CONFIG = "worklog_attributes_config.csv"
 
+STATE_KEY = "worklog_attributes"
+
 _ATTR_COL_WORKLOG_ID = "tempo_worklog_id"
 _ATTR_COL_ATTRIBUTE_KEY = "attribute_key"
 _ATTR_COL_ATTRIBUTE_VALUE = "attribute_value"
@@ -71,11 +79,34 @@ def column_definitions() -> dict[str, Any]:
     }
 
 
-def run(worklogs: list) -> dict[str, [dict[str, Any]]]:
+def run(client: tempo.TempoClient,
+        worklogs: Iterable[dict],
+        on_batch: Optional[Callable[[list[dict]], None]] = None,
+        index: Optional["AttributeIndex"] = None,
+        load_config: bool = True,
+        queue: Optional[deferred.DeferredQueue] = None) -> dict[str, [dict[str, Any]]]:
     """
-    worklogs: list - previously loaded worklogs so we don't double load
+    client: TempoClient
+    worklogs: Iterable - previously loaded worklogs so we don't double load
+    on_batch: Optional[Callable] - streams attribute rows of every batch instead of returning them
+    index: Optional[AttributeIndex] - attributes are loaded only for worklogs updated since they were last loaded,
+                worklogs need the "updated" column then
+    load_config: bool - load the attribute configs too, an empty config list is returned otherwise
+    queue: Optional[DeferredQueue] - batches failing with an API error are deferred to it instead of failing the run,
+                worklogs of batches that fail for good stay unmarked in the index and are loaded by the next run
     """
-    if worklogs is None or len(worklogs) == 0:
+    if worklogs is None:
+        worklogs = []
+    if index is not None:
+        worklog_updates = {
+            wl['tempo_id']: wl['updated'] for wl in worklogs if index.changed(wl['tempo_id'], wl['updated'])
+        }
+        worklog_ids = list(worklog_updates.keys())
+        # nothing changed is fine, the attribute config is still checked
+        logging.info(f"{len(worklog_ids)} worklogs changed since their attributes were loaded")
+    else:
+        worklog_ids = [wl['tempo_id'] for wl in worklogs]
+    if len(worklog_ids) == 0 and index is None:
         logging.error("no worklogs provided")
         return {
             _TABLE_WL_ATTR: [],
@@ -83,24 +114,82 @@ def run(worklogs: list) -> dict[str, [dict[str, Any]]]:
         }
     logging.info("Started to download worklog attributes")
     # tempo can not load attributes for more than 500 worklogs at the same time
-    worklog_ids = [wl['tempo_id'] for wl in worklogs]
     buffer_size = 400
     buffer_start = 0
     attribute_data = []
-    while buffer_start < len(worklogs):
+    progress = Progress("worklog attributes", total=-(-len(worklog_ids) // buffer_size), unit="batches")
+
+    def load_batch(buffered_worklog_ids: list[int]):
+        attributes = client.worklog_attributes(buffered_worklog_ids)
+        if attributes is not None:
+            if on_batch is not None:
+                on_batch(attributes)
+            else:
+                attribute_data.extend(attributes)
+            progress.add(rows=len(attributes), pages=1)
+            if index is not None:
+                for worklog_id in buffered_worklog_ids:
+                    index.mark(worklog_id, worklog_updates[worklog_id])
+
+    while buffer_start < len(worklog_ids):
         buffered_worklog_ids = worklog_ids[buffer_start:buffer_start+buffer_size]
         buffer_start = buffer_start + buffer_size
-        attributes = tempo.worklog_attributes(buffered_worklog_ids)
-        if attributes is not None:
-            attribute_data.extend(attributes)
+        unit = f"worklogs {buffered_worklog_ids[0]} - {buffered_worklog_ids[-1]}"
+        deferred.run_unit(queue, unit, partial(load_batch, buffered_worklog_ids))
+        progress.unit_done()
+    if queue is not None:
+        queue.retry()
+    progress.finish()
     logging.info("Finished loading worklog attributes")
-    logging.info("Started to download attribute configs")
     config_data = []
-    configs = tempo.attribute_config()
-    if configs is not None:
-        config_data = configs
-    logging.info("Finished loading attribute configs")
+    if load_config:
+        logging.info("Started to download attribute configs")
+        configs = client.attribute_config()
+        if configs is not None:
+            config_data = configs
+        logging.info("Finished loading attribute configs")
     return {
         _TABLE_WL_ATTR: attribute_data,
         _TABLE_WL_ATTR_CONFIG: config_data
     }
+
+
+class AttributeIndex:
+    """
+    Remembers which version (updatedAt) of every worklog its attributes were loaded for,
+    so following runs load attributes only of worklogs updated since then.
+    Also remembers a hash of the attribute config, so an unchanged config is not written again.
+
+    state: dict - tenant state, the index lives in state[STATE_KEY]
+    since: str - yyyy-mm-dd, worklogs last updated before it are not listed any more and are forgotten
+    """
+
+    def __init__(self, state: dict, since: str):
+        stored = state.setdefault(STATE_KEY, {})
+        updated = stored.setdefault("updated", {})
+        for worklog_id in [wl_id for wl_id, wl_updated in updated.items() if wl_updated < since]:
+            del updated[worklog_id]
+        self._stored = stored
+        self._updated: dict[str, str] = updated
+        self._lock = threading.Lock()
+
+    def changed(self, worklog_id: int, updated: str) -> bool:
+        """ True when attributes of the worklog were not loaded for this (or a newer) version yet """
+        with self._lock:
+            known = self._updated.get(str(worklog_id))
+        return known is None or known < str(updated)
+
+    def mark(self, worklog_id: int, updated: str):
+        with self._lock:
+            self._updated[str(worklog_id)] = str(updated)
+
+    def config_changed(self, configs: list[dict[str, Any]]) -> bool:
+        return self._stored.get("config_hash") != _config_hash(configs)
+
+    def mark_config(self, configs: list[dict[str, Any]]):
+        self._stored["config_hash"] = _config_hash(configs)
+
+
+def _config_hash(configs: list[dict[str, Any]]) -> str:
+    source = json.dumps(sorted(configs, key=lambda config: config[_CONF_COL_ATTRIBUTE_KEY]), sort_keys=True)
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
@@ -29,11 +29,15 @@ def column_definitions() -> dict[str, ColumnDefinition]:
     }
 
 
-def run(since_mls: int) -> Optional[list[dict[str, str | int]]]:
+def run(tempo_client: tempo.TempoClient,
+        jira_client: jc.JiraClient,
+        since_mls: int) -> Optional[list[dict[str, str | int]]]:
     """
     loads jira worklog ids from 'since' and
     maps them to tempo worklog id and than finds author info from tempo
 
+    tempo_client: TempoClient
+    jira_client: JiraClient
     since_mls: timestamp in miliseconds
 
     returns
@@ -44,13 +48,13 @@ def run(since_mls: int) -> Optional[list[dict[str, str | int]]]:
     """
     logging.info("started worklog_authors")
     # load jira worklog ids
-    worklog_ids = jc.worklog_ids(since_mls)
+    worklog_ids = jira_client.worklog_ids(since_mls)
     if worklog_ids is None:
         logging.error("[worklog_authors] failed to get jira worklogs")
         return
     logging.debug("[worklog_authors] loaded jira worklogs")
     # get mapping between jira id and tempo id
-    mapped = tempo.jira_to_tempo_worklog_ids(worklog_ids)
+    mapped = tempo_client.jira_to_tempo_worklog_ids(worklog_ids)
     if mapped is None:
         logging.error("Failed to get mapping")
         return
@@ -58,7 +62,7 @@ def run(since_mls: int) -> Optional[list[dict[str, str | int]]]:
     # get author id
     file_ouput = []
     for tempo_id, jira_id in mapped.items():
-        author = tempo.worklog_author(tempo_id)
+        author = tempo_client.worklog_author(tempo_id)
         if author is None:
             logging.warning(f"[worklog_authors] unable to find author for jira_worklog_id {jira_id}")
             continue
@@ -0,0 +1,113 @@
+from array import array
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Iterable, Iterator, Optional
+import threading
+import worklogs
+
+
+# UTC offsets a worklog start may have in the author's timezone, in 30 minute steps
+_OFFSETS_MIN = range(-12 * 60, 14 * 60 + 1, 30)
+
+
+class WorklogIndex:
+    """
+    Worklogs by (author, UTC start date), filled from worklog pages while they are downloaded,
+    so worklogs of timesheet approvals can be resolved locally instead of paging
+    through the worklogs link of every approval.
+
+    Approval periods are in the author's local dates, the index knows only UTC start times.
+    resolve() shifts the worklogs around the period by the UTC offsets the author may have and accepts
+    the worklogs only when they add up to the time spent of the approval and all offsets that add up
+    select the same worklogs - anything else (worklogs updated before the indexed download,
+    a DST change within the period, days of equal time spent at both ends, ...) is left to the API.
+    learn() narrows the offsets of the author to those selecting the worklogs the API returned,
+    so usually only the first approval of every author is paged.
+
+    Every worklog takes three 64 bit integers (start, tempo id, seconds).
+    add_page() may be called from several threads, resolve() / learn() from one.
+    """
+
+    def __init__(self):
+        # (account_id, yyyy-mm-dd) -> [start epoch seconds, tempo id, time spent seconds, ...]
+        self._worklogs: dict[tuple[str, str], array] = {}
+        # account_id -> UTC offsets (minutes) consistent with the worklogs of its approvals
+        self._offsets: dict[str, tuple[int, ...]] = {}
+        self._lock = threading.Lock()
+        self.resolved = 0
+        self.missed = 0
+
+    def add_page(self, page: list[dict[str, Any]]):
+        """ page: list - worklogs mapped by worklogs._map_worklog_to_table, may be called from several threads """
+        with self._lock:
+            for wl in page:
+                started = wl[worklogs._COL_START_DATE_TIME_UTC]
+                key = (wl[worklogs._COL_AUTHOR_ACCOUNT_ID], started[:10])
+                values = self._worklogs.get(key)
+                if values is None:
+                    values = self._worklogs[key] = array("q")
+                values.extend((_epoch(started), wl[worklogs._COL_ID], wl[worklogs._COL_TIME_SPENT_SECONDS]))
+
+    def __len__(self) -> int:
+        return sum(len(values) for values in self._worklogs.values()) // 3
+
+    def resolve(self, approval: dict) -> Optional[list[int]]:
+        """
+        tempo ids of worklogs of the approval, None when the index can not tell them for sure
+
+        approval: dict - timesheet approval of the API ({ user, period, timeSpentSeconds, ... })
+        """
+        time_spent = approval.get('timeSpentSeconds')
+        account_id = approval['user']['accountId']
+        selections: dict[frozenset[int], list[int]] = {}
+        if time_spent is not None:
+            for offset, selected in self._selections(approval, self._offsets.get(account_id, _OFFSETS_MIN)):
+                if sum(selected.values()) == time_spent:
+                    selections.setdefault(frozenset(selected.keys()), []).append(offset)
+        if len(selections) != 1:
+            self.missed += 1
+            return None
+        tempo_ids, offsets = selections.popitem()
+        self._offsets[account_id] = tuple(offsets)
+        self.resolved += 1
+        return sorted(tempo_ids)
+
+    def learn(self, approval: dict, tempo_ids: list[int]):
+        """
+        narrows the UTC offsets of the approval's author to those selecting tempo_ids,
+        nothing is learned when the worklogs are not all indexed
+
+        tempo_ids: list - tempo ids of worklogs of the approval loaded from the API
+        """
+        account_id = approval['user']['accountId']
+        expected = set(tempo_ids)
+        offsets = [offset for offset, selected in self._selections(approval, _OFFSETS_MIN)
+                   if selected.keys() == expected]
+        if len(offsets) == 0:
+            return
+        previous = self._offsets.get(account_id, ())
+        # offsets of a DST change replace the previous ones
+        self._offsets[account_id] = tuple(o for o in offsets if o in previous) or tuple(offsets)
+
+    def _selections(self, approval: dict, offsets: Iterable[int]) -> Iterator[tuple[int, dict[int, int]]]:
+        """ yields (offset, { tempo id: seconds } of worklogs in the period shifted by the offset) """
+        account_id = approval['user']['accountId']
+        first = date.fromisoformat(approval['period']['from'][:10])
+        last = date.fromisoformat(approval['period']['to'][:10])
+        candidates: list[tuple[int, int, int]] = []
+        day = first - timedelta(days=1)
+        while day <= last + timedelta(days=1):
+            values = self._worklogs.get((account_id, str(day)), ())
+            candidates.extend(zip(values[0::3], values[1::3], values[2::3]))
+            day += timedelta(days=1)
+        period_start = _epoch(f"{first}T00:00:00Z")
+        period_end = _epoch(f"{last + timedelta(days=1)}T00:00:00Z")
+        for offset in offsets:
+            shift = offset * 60
+            yield offset, {
+                tempo_id: seconds for started, tempo_id, seconds in candidates
+                if period_start <= started + shift < period_end
+            }
+
+
+def _epoch(utc: str) -> int:
+    return int(datetime.fromisoformat(utc[:19]).replace(tzinfo=timezone.utc).timestamp())
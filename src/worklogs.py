@@ -1,11 +1,22 @@
 from keboola.component.dao import BaseType, ColumnDefinition, SupportedDataTypes, logging
 from datetime import datetime
+import deferred
 import tempo
-from typing import Any
+import tracing
+from progress import Progress
+from typing import Any, Callable, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import threading
 
 
 FILENAME = "worklogs.csv"
 
+STRATEGY_UPDATED = "updated"
+STRATEGY_ACCOUNTS = "accounts"
+STRATEGY_PROJECTS = "projects"
+DEFAULT_MAX_WORKERS = 8
+
 _COL_ID = "tempo_id"
 _COL_ISSUE_ID = "issue_id"
 _COL_AUTHOR_ACCOUNT_ID = "author_account_id"
@@ -62,26 +73,99 @@ def column_definitions() -> dict[str, Any]:
     }
 
 
-def run(since: datetime) -> list[dict[str, Any]]:
+def run(client: tempo.TempoClient,
+        since: datetime,
+        on_page: Optional[Callable[[list[dict]], None]] = None,
+        strategy: str = STRATEGY_UPDATED,
+        partitions: Optional[list[str]] = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        queue: Optional[deferred.DeferredQueue] = None) -> list[dict[str, Any]]:
     """
+    client: TempoClient
     since: datetime
+    on_page: Optional[Callable] - streams mapped pages instead of returning them
+    strategy: str - STRATEGY_UPDATED walks the global /worklogs listing,
+                STRATEGY_ACCOUNTS / STRATEGY_PROJECTS load worklogs of every account / project in parallel
+    partitions: Optional[list] - account ids or project ids for the partitioned strategies
+    max_workers: int - partitions loaded at the same time
+    queue: Optional[DeferredQueue] - partitions failing with an API error are deferred to it instead of failing
+                the run - the STRATEGY_UPDATED listing is one unit, every page link comes from the previous page
     """
-    def map_worklog_to_table(original_wl: dict) -> dict:
-        startDTUTC = ""
-        if "startDateTimeUtc" in original_wl.keys():
-            startDTUTC = original_wl['startDateTimeUtc']
-        else:
-            startDTUTC = f"{original_wl['startDate']}T{original_wl['startTime']}.000Z"
-        return {
-            _COL_ID: original_wl['tempoWorklogId'],
-            _COL_ISSUE_ID: original_wl['issue']['id'],
-            _COL_AUTHOR_ACCOUNT_ID: original_wl['author']['accountId'],
-            _COL_TIME_SPENT_SECONDS: original_wl['timeSpentSeconds'],
-            _COL_START_DATE_TIME_UTC: startDTUTC,
-            _COL_CREATED: original_wl['createdAt'],
-            _COL_UPDATED: original_wl['updatedAt']
-        }
     logging.info("Started to download worklogs")
-    data = tempo.worklogs_updated_from(str(since.date()), map_worklog_to_table)
+    if strategy == STRATEGY_UPDATED:
+        progress = Progress("worklogs")
+        data = client.worklogs_updated_from(str(since.date()), _map_worklog_to_table, progress, on_page)
+    else:
+        progress = Progress("worklogs", total=len(partitions or []), unit=strategy)
+        data = _run_partitioned(client, since, on_page, strategy, partitions or [], max_workers, progress, queue)
+    progress.finish()
     logging.info("Download finished successfully")
     return data
+
+
+def _run_partitioned(client: tempo.TempoClient,
+                     since: datetime,
+                     on_page: Optional[Callable[[list[dict]], None]],
+                     strategy: str,
+                     partitions: list[str],
+                     max_workers: int,
+                     progress: Progress,
+                     queue: Optional[deferred.DeferredQueue] = None) -> list[dict[str, Any]]:
+    """
+    loads worklogs partition by partition on a thread pool,
+    a worklog seen in more than one partition (e.g. issue moved to another project during the run,
+    or a deferred partition loaded again) is passed on only once
+    """
+    if strategy == STRATEGY_ACCOUNTS:
+        load_partition = client.worklogs_by_account
+    elif strategy == STRATEGY_PROJECTS:
+        load_partition = client.worklogs_by_project
+    else:
+        raise ValueError(f"unknown worklogs strategy '{strategy}'")
+    result = []
+    seen: set[int] = set()
+    lock = threading.Lock()
+
+    def deduplicate(page: list[dict]):
+        with lock:
+            page = [wl for wl in page if wl[_COL_ID] not in seen]
+            seen.update(wl[_COL_ID] for wl in page)
+            if on_page is None:
+                result.extend(page)
+                return
+        if len(page) > 0:
+            on_page(page)
+
+    def load(partition: str):
+        with client.tracer.span(f"{strategy} partition", tracing.CAT_UNIT, partition=partition):
+            load_partition(partition, str(since.date()), _map_worklog_to_table, progress, deduplicate)
+
+    def load_unit(partition: str):
+        deferred.run_unit(queue, f"{strategy} {partition}", partial(load, partition))
+        progress.unit_done()
+
+    # a partition may repeat (account in several teams), it is loaded only once
+    unique_partitions = list(dict.fromkeys(partitions))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="worklogs") as pool:
+        for future in [pool.submit(load_unit, partition) for partition in unique_partitions]:
+            future.result()
+    if queue is not None:
+        queue.retry()
+    return result
+
+
+def _map_worklog_to_table(original_wl: dict) -> dict:
+    startDTUTC = ""
+    if "startDateTimeUtc" in original_wl.keys():
+        startDTUTC = original_wl['startDateTimeUtc']
+    else:
+        startDTUTC = f"{original_wl['startDate']}T{original_wl['startTime']}.000Z"
+    return {
+        _COL_ID: original_wl['tempoWorklogId'],
+        _COL_ISSUE_ID: original_wl['issue']['id'],
+        _COL_AUTHOR_ACCOUNT_ID: original_wl['author']['accountId'],
+        _COL_TIME_SPENT_SECONDS: original_wl['timeSpentSeconds'],
+        _COL_START_DATE_TIME_UTC: startDTUTC,
+        _COL_CREATED: original_wl['createdAt'],
+        _COL_UPDATED: original_wl['updatedAt']
+    }
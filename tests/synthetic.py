@@ -0,0 +1,252 @@
+"""
+Deterministic synthetic Tempo tenant.
+
+Serves Tempo-shaped payloads (worklogs, teams, memberships, work attributes,
+timesheet approvals with nested worklog links) for a TempoClient without any network.
+Everything is computed from the item index, so a tenant with millions of worklogs
+costs no memory until a page is requested.
+"""
+from datetime import date, timedelta
+from urllib.parse import parse_qs, urlsplit
+from typing import Optional
+import io
+import json
+import re
+
+import tempo
+
+
+class SyntheticResponse:
+    def __init__(self, payload, status_code: int = 200, headers: Optional[dict] = None):
+        self._payload = payload
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def json(self):
+        return self._payload
+
+    @property
+    def raw(self) -> io.BytesIO:
+        return io.BytesIO(self.content)
+
+    def close(self):
+        pass
+
+    @property
+    def text(self) -> str:
+        return json.dumps(self._payload)
+
+    @property
+    def content(self) -> bytes:
+        return self.text.encode("utf-8")
+
+
+class SyntheticTempo:
+    """
+    worklogs: int - number of worklogs returned by /worklogs
+    teams: int - number of teams
+    members_per_team: int - members of every team (account ids are shared across teams)
+    attributes_per_worklog: int - work attribute values of every worklog
+    projects: int - number of projects, worklog i belongs to project 1 + i % projects
+    max_page_size: int - the server caps requested limits to this page size (as Tempo does)
+    reject_page_size: Optional[int] - requests with a bigger limit fail with 500 (e.g. a timeout behind a proxy)
+    start: date - worklog start dates are spread over 365 days from this date
+    rate_limit: Optional[int] - GET responses carry X-RateLimit-Limit / X-RateLimit-Remaining headers
+    left_members: int - last members of every team whose membership ended 30 days after start
+    """
+
+    def __init__(self,
+                 worklogs: int = 10_000,
+                 teams: int = 20,
+                 members_per_team: int = 10,
+                 attributes_per_worklog: int = 2,
+                 projects: int = 10,
+                 max_page_size: int = 5_000,
+                 reject_page_size: Optional[int] = None,
+                 start: date = date(2024, 1, 1),
+                 rate_limit: Optional[int] = None,
+                 left_members: int = 0):
+        self.worklogs = worklogs
+        self.teams = teams
+        self.members_per_team = members_per_team
+        self.attributes_per_worklog = attributes_per_worklog
+        self.projects = projects
+        self.max_page_size = max_page_size
+        self.reject_page_size = reject_page_size
+        self.limits: list[int] = []
+        self.start = start
+        self.rate_limit = rate_limit
+        self.left_members = left_members
+        self.users = max(1, members_per_team * 2)
+        self.requests = 0
+        self.base_url = tempo.DEFAULT_BASE_URL
+
+    def client(self, **kwargs) -> tempo.TempoClient:
+        """ TempoClient that is served by this tenant """
+        client = tempo.TempoClient("synthetic-token", base_url=self.base_url, **kwargs)
+        client._raw_get = self.get
+        client._raw_post = self.post
+        return client
+
+    # payload items
+
+    def account_id(self, index: int) -> str:
+        return f"user-{index % self.users:06d}"
+
+    def worklog_seconds(self, index: int) -> int:
+        return 900 * (1 + index % 16)
+
+    def account_worklog_indexes(self, account_id: str, date_from: date, date_to: date) -> list[int]:
+        """ indexes of worklogs of the account with start date in <date_from, date_to> """
+        first_day = (date_from - self.start).days
+        last_day = (date_to - self.start).days
+        first = int(account_id.rsplit("-", 1)[1])
+        return [i for i in range(first, self.worklogs, self.users) if first_day <= i % 365 <= last_day]
+
+    def worklog(self, index: int) -> dict:
+        day = self.start + timedelta(days=index % 365)
+        return {
+            "self": f"{self.base_url}/worklogs/{index + 1}",
+            "tempoWorklogId": index + 1,
+            "issue": {"self": f"https://example.atlassian.net/rest/api/2/issue/{10_000 + index % 5_000}",
+                      "id": 10_000 + index % 5_000},
+            "timeSpentSeconds": self.worklog_seconds(index),
+            "billableSeconds": self.worklog_seconds(index),
+            "startDate": str(day),
+            "startTime": f"{8 + index % 9:02d}:00:00",
+            "startDateTimeUtc": f"{day}T{8 + index % 9:02d}:00:00Z",
+            "description": f"Working on issue {index % 5_000}",
+            "createdAt": f"{day}T18:00:00Z",
+            "updatedAt": f"{day}T18:{index % 60:02d}:00Z",
+            "author": {"self": f"https://example.atlassian.net/rest/api/2/user?accountId={self.account_id(index)}",
+                       "accountId": self.account_id(index)},
+            "attributes": {"self": f"{self.base_url}/worklogs/{index + 1}/work-attribute-values", "values": []}
+        }
+
+    def team(self, index: int) -> dict:
+        return {
+            "self": f"{self.base_url}/teams/{index + 1}",
+            "id": index + 1,
+            "name": f"Team {index + 1}",
+            "summary": "",
+            "lead": {"accountId": self.account_id(index)} if index % 3 else None,
+            "members": {"self": f"{self.base_url}/team-memberships/team/{index + 1}"}
+        }
+
+    def membership(self, team_id: int, member: int) -> dict:
+        return {
+            "id": team_id * 1_000 + member,
+            "team": {"self": f"{self.base_url}/teams/{team_id}", "id": team_id},
+            "member": {"accountId": self.account_id((team_id - 1) * self.members_per_team + member)},
+            "role": {"id": 1, "name": "Member", "default": True},
+            "from": str(self.start),
+            "to": str(self.start + timedelta(days=30)) if member >= self.members_per_team - self.left_members else None,
+            "commitmentPercent": 100
+        }
+
+    # transport
+
+    def get(self, endpoint: str, params=None, stream: bool = False, timeout=None) -> SyntheticResponse:
+        self.requests += 1
+        response = self._get(endpoint, params)
+        if self.rate_limit is not None:
+            response.headers = {"X-RateLimit-Limit": str(self.rate_limit),
+                                "X-RateLimit-Remaining": str(max(0, self.rate_limit - self.requests))}
+        return response
+
+    def _get(self, endpoint: str, params=None) -> SyntheticResponse:
+        path, query = self._split(endpoint, params)
+        offset = int(query.get("offset", 0))
+        limit = min(int(query.get("limit", 50)), self.max_page_size)
+        self.limits.append(int(query.get("limit", 50)))
+        if self.reject_page_size is not None and limit > self.reject_page_size:
+            return SyntheticResponse({"message": "gateway timeout"}, status_code=500)
+        if path == "/worklogs":
+            items = [self.worklog(i) for i in range(offset, min(offset + limit, self.worklogs))]
+            return self._page(path, query, items, offset, limit, self.worklogs)
+        if path == "/teams":
+            items = [self.team(i) for i in range(offset, min(offset + limit, self.teams))]
+            return self._page(path, query, items, offset, limit, self.teams)
+        match = re.fullmatch(r"/team-memberships/team/(\d+)", path)
+        if match:
+            team_id = int(match.group(1))
+            items = [self.membership(team_id, m) for m in range(offset, min(offset + limit, self.members_per_team))]
+            return self._page(path, query, items, offset, limit, self.members_per_team)
+        if path == "/work-attributes":
+            items = [{"key": f"_attr{i}_", "name": f"Attribute {i}", "type": "STATIC_LIST",
+                      "values": [f"value-{v}" for v in range(5)]} for i in range(self.attributes_per_worklog)]
+            return self._page(path, query, items, 0, 50, len(items))
+        match = re.fullmatch(r"/timesheet-approvals/team/(\d+)", path)
+        if match:
+            return SyntheticResponse(self._approvals(int(match.group(1)), date.fromisoformat(query["from"])))
+        match = re.fullmatch(r"/worklogs/(user|project)/([\w-]+)", path)
+        if match and "from" not in query:
+            # partition listing - every worklog belongs to exactly one account and one project
+            if match.group(1) == "user":
+                first, step = int(match.group(2).rsplit("-", 1)[1]), self.users
+            else:
+                first, step = int(match.group(2)) - 1, self.projects
+            indexes = range(first, self.worklogs, step)
+            items = [self.worklog(i) for i in indexes[offset:offset + limit]]
+            return self._page(path, query, items, offset, limit, len(indexes))
+        match = re.fullmatch(r"/worklogs/user/([\w-]+)", path)
+        if match:
+            indexes = self.account_worklog_indexes(match.group(1), date.fromisoformat(query["from"]),
+                                                   date.fromisoformat(query["to"]))
+            items = [self.worklog(i) for i in indexes[offset:offset + limit]]
+            return self._page(path, query, items, offset, limit, len(indexes))
+        return SyntheticResponse({"message": f"unknown endpoint {path}"}, status_code=404)
+
+    def post(self, endpoint: str, data=None) -> SyntheticResponse:
+        self.requests += 1
+        path, _ = self._split(endpoint, None)
+        if path == "/worklogs/work-attribute-values/search":
+            return SyntheticResponse([
+                {"tempoWorklogId": worklog_id,
+                 "workAttributeValues": [{"key": f"_attr{a}_", "value": f"value-{(worklog_id + a) % 5}"}
+                                         for a in range(self.attributes_per_worklog)]}
+                for worklog_id in data["tempoWorklogIds"]
+            ])
+        if path == "/worklogs/tempo-to-jira":
+            ids = data["tempoWorklogIds"]
+            return SyntheticResponse({"metadata": {"count": len(ids)},
+                                      "results": [{"tempoWorklogId": i, "jiraWorklogId": 500_000 + i} for i in ids]})
+        return SyntheticResponse({"message": f"unknown endpoint {path}"}, status_code=404)
+
+    def _approvals(self, team_id: int, period_from: date) -> dict:
+        # weekly periods starting on monday
+        period_start = period_from - timedelta(days=period_from.weekday())
+        period_end = period_start + timedelta(days=6)
+        results = []
+        for member in range(self.members_per_team):
+            account_id = self.account_id((team_id - 1) * self.members_per_team + member)
+            status = "APPROVED" if member % 2 else "OPEN"
+            results.append({
+                "self": f"{self.base_url}/timesheet-approvals/user/{account_id}?from={period_start}",
+                "user": {"accountId": account_id},
+                "period": {"from": str(period_start), "to": str(period_end)},
+                "timeSpentSeconds": sum(self.worklog_seconds(i) for i in self.account_worklog_indexes(
+                    account_id, period_start, period_end)),
+                "requiredSeconds": 144000,
+                "status": {"key": status, "actor": {"accountId": self.account_id(team_id)}},
+                "reviewer": {"accountId": self.account_id(team_id)},
+                "worklogs": {"self": f"{self.base_url}/worklogs/user/{account_id}?from={period_start}&to={period_end}"}
+            })
+        return {"self": f"{self.base_url}/timesheet-approvals/team/{team_id}", "metadata": {"count": len(results)},
+                "results": results}
+
+    def _page(self, path: str, query: dict, items: list, offset: int, limit: int, total: int) -> SyntheticResponse:
+        metadata = {"count": len(items), "offset": offset, "limit": limit}
+        if offset + limit < total:
+            next_query = dict(query, offset=offset + limit, limit=limit)
+            metadata["next"] = f"{self.base_url}{path}?" + "&".join(f"{k}={v}" for k, v in next_query.items())
+        return SyntheticResponse({"self": f"{self.base_url}{path}", "metadata": metadata, "results": items})
+
+    @staticmethod
+    def _split(endpoint: str, params) -> tuple[str, dict]:
+        url = urlsplit(endpoint)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        # values already present in the url win - same as Tempo for the re-sent first page params
+        for k, v in (params or {}).items():
+            query.setdefault(k, v)
+        return url.path, query
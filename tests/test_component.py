@@ -9,6 +9,7 @@ import os
 from freezegun import freeze_time
 
 from component import Component
+from configuration import Configuration
 
 
 class TestComponent(unittest.TestCase):
@@ -22,6 +23,42 @@ class TestComponent(unittest.TestCase):
             comp = Component()
             comp.run()
 
+    @mock.patch.object(Component, "configuration", mock.Mock(parameters={}))
+    @mock.patch.object(Component, "get_state_file", return_value={"row_hashes": {}})
+    @mock.patch("component.Configuration")
+    def test_state_written_only_after_successful_run(self, *_):
+        comp = Component.__new__(Component)
+        with mock.patch.object(Component, "write_state_file") as write_state_file:
+            with mock.patch.object(Component, "_run_tenant", side_effect=Exception("no worklogs")):
+                with self.assertRaises(Exception):
+                    comp.run()
+            write_state_file.assert_not_called()
+            with mock.patch.object(Component, "_run_tenant"):
+                comp.run()
+            write_state_file.assert_called_once_with({"row_hashes": {}})
+
+    @mock.patch.object(Component, "files_out_path", "./non-existing-dir/out/files")
+    @mock.patch("component.tempo.TempoClient")
+    def test_client_closed_when_extraction_fails(self, client_type):
+        params = Configuration(**{"org_name": "o", "user_email": "e", "#tempo_token": "t", "#jira_token": "j",
+                                  "since": "today", "datasets": ["teams"]})
+        comp = Component.__new__(Component)
+        with mock.patch.object(Component, "_extract_tenant", side_effect=Exception("no teams")):
+            with self.assertRaises(Exception):
+                comp._run_tenant(params, {})
+        client_type.return_value.close.assert_called_once()
+
+    @mock.patch("component.jirac.JiraClient")
+    @mock.patch("component.tempo.TempoClient")
+    def test_plan_closes_clients_when_project_lookup_fails(self, tempo_client_type, jira_client_type):
+        params = Configuration(**{"org_name": "o", "user_email": "e", "#tempo_token": "t", "#jira_token": "j",
+                                  "since": "today", "datasets": ["worklogs"], "worklogs_strategy": "projects"})
+        jira_client_type.return_value.project_ids.side_effect = Exception("jira unavailable")
+        with self.assertRaises(Exception):
+            Component.__new__(Component)._plan_tenant(params)
+        jira_client_type.return_value.close.assert_called_once()
+        tempo_client_type.return_value.close.assert_called_once()
+
 
 if __name__ == "__main__":
     # import sys;sys.argv = ['', 'Test.testName']
@@ -0,0 +1,46 @@
+import unittest
+
+from keboola.component.exceptions import UserException
+
+from configuration import BatchConfiguration
+
+
+def _tenant(name: str, **overrides) -> dict:
+    tenant = {
+        "name": name,
+        "org_name": f"org-{name}",
+        "user_email": "user@example.com",
+        "#tempo_token": "tempo",
+        "#jira_token": "jira"
+    }
+    tenant.update(overrides)
+    return tenant
+
+
+class TestBatchConfiguration(unittest.TestCase):
+
+    def test_tenant_overrides_shared_parameters(self):
+        batch = BatchConfiguration(
+            since="2 days ago",
+            datasets=["teams"],
+            tenants=[_tenant("a"), _tenant("b", datasets=["worklogs"])]
+        )
+        tenants = batch.tenant_configurations()
+        self.assertEqual(["teams"], tenants["a"].datasets)
+        self.assertEqual(["worklogs"], tenants["b"].datasets)
+        self.assertEqual("2 days ago", tenants["b"].since)
+        self.assertEqual("org-b", tenants["b"].org_name)
+
+    def test_duplicate_tenant_name_fails(self):
+        batch = BatchConfiguration(since="today", datasets=["teams"], tenants=[_tenant("a"), _tenant("a")])
+        with self.assertRaises(UserException):
+            batch.tenant_configurations()
+
+    def test_invalid_tenant_name_fails(self):
+        batch = BatchConfiguration(since="today", datasets=["teams"], tenants=[_tenant("a/b")])
+        with self.assertRaises(UserException):
+            batch.tenant_configurations()
+
+
+if __name__ == "__main__":
+    unittest.main()
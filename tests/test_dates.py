@@ -0,0 +1,46 @@
+from datetime import datetime
+import unittest
+
+import dates
+from approvals import read_until_date
+
+
+class TestParseSince(unittest.TestCase):
+
+    def setUp(self):
+        self.now = datetime(2024, 3, 31, 10, 30)
+
+    def test_relative_forms(self):
+        self.assertEqual(datetime(2024, 3, 29, 10, 30), dates.parse_since("2 days ago", self.now))
+        self.assertEqual(datetime(2024, 3, 24, 10, 30), dates.parse_since("a week ago", self.now))
+        self.assertEqual(datetime(2024, 3, 31, 9, 30), dates.parse_since("1 hour ago", self.now))
+        self.assertEqual(datetime(2024, 2, 29, 10, 30), dates.parse_since("1 month ago", self.now))
+        self.assertEqual(datetime(2023, 3, 31, 10, 30), dates.parse_since("1 year ago", self.now))
+
+    def test_iso_dates(self):
+        self.assertEqual(datetime(2024, 1, 15), dates.parse_since("2024-01-15"))
+        self.assertEqual(datetime(2024, 1, 15, 8, 0), dates.parse_since(" 2024-01-15T08:00:00 "))
+
+    def test_fast_path_matches_dateparser(self):
+        parser = dates._date_data_parser()
+        for raw in ("2 days ago", "3 weeks ago", "10 min ago", "2024-01-15"):
+            expected = parser.get_date_data(raw).date_obj
+            actual = dates.parse_since(raw)
+            self.assertLess(abs((expected - actual).total_seconds()), 5, raw)
+
+    def test_other_forms_fall_back_to_dateparser(self):
+        parsed = dates.parse_since("3 months, 1 week and 1 day ago")
+        self.assertIsNotNone(parsed)
+        self.assertLess(parsed, datetime.now())
+        self.assertIsNone(dates.parse_since("not a date"))
+
+
+class TestReadUntilDate(unittest.TestCase):
+
+    def test_first_day_of_next_month(self):
+        self.assertEqual(datetime(2024, 2, 1, 10), read_until_date(datetime(2024, 1, 31, 10)))
+        self.assertEqual(datetime(2025, 1, 1), read_until_date(datetime(2024, 12, 1)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+from unittest import mock
+import csv
+import os
+import unittest
+
+import approvals
+import worklogs
+from component import Component
+from dedup import PrimaryKeyFilter
+from output import TableWriter
+
+
+def _worklog(tempo_id: int, updated: str) -> dict:
+    return {
+        "tempo_id": tempo_id,
+        "issue_id": 10,
+        "author_account_id": "user",
+        "start_date_time_utc": "2024-01-01T08:00:00Z",
+        "time_spent_seconds": 60,
+        "created": "2024-01-01T08:00:00Z",
+        "updated": updated
+    }
+
+
+class _CsvComponent:
+    """ writes output tables into a directory, manifests are not written """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def create_out_table_definition(self, name: str, incremental: bool, schema: dict):
+        return SimpleNamespace(full_path=os.path.join(self.directory, name))
+
+    def write_out_data(self, table, fieldnames, data, append=False, encoder=None):
+        Component.write_out_data(self, table, fieldnames, data, append, encoder)
+
+    def write_manifest(self, table):
+        pass
+
+
+class TestPrimaryKeyFilter(unittest.TestCase):
+
+    def test_newer_duplicate_replaces_written_row(self):
+        key_filter = PrimaryKeyFilter(["tempo_id"], "updated")
+        first = list(key_filter.filter([_worklog(1, "2024-01-02T10:00:00Z"), _worklog(2, "2024-01-02T10:00:00Z")]))
+        second = list(key_filter.filter([_worklog(1, "2024-01-03T09:00:00Z"), _worklog(2, "2024-01-02T10:00:00Z"),
+                                         _worklog(2, "2024-01-01T10:00:00Z")]))
+        self.assertEqual(2, len(first))
+        self.assertEqual(["2024-01-03T09:00:00Z"], [row["updated"] for row in second])
+        self.assertEqual({0}, key_filter.superseded)
+        self.assertEqual(2, key_filter.dropped)
+
+    def test_composite_keys_without_updated_keep_first(self):
+        key_filter = PrimaryKeyFilter(["worklog_id", "approval_id"])
+        rows = [{"worklog_id": wl, "approval_id": appr} for appr in ("a", "b") for wl in range(3)]
+        self.assertEqual(6, len(list(key_filter.filter(rows + rows[:4]))))
+        self.assertEqual(4, key_filter.dropped)
+        self.assertEqual(set(), key_filter.superseded)
+
+    def test_keys_with_colliding_low_digest_word_are_kept(self):
+        # digests equal in the low 64 bits, the high words tell the keys apart
+        digests = {"a": 5 | 1 << 64, "b": 5 | 2 << 64}
+        key_filter = PrimaryKeyFilter(["worklog_id", "approval_id"], "updated")
+        rows = [{"worklog_id": 1, "approval_id": appr, "updated": "2024-01-02T10:00:00Z"} for appr in ("b", "a")]
+        with mock.patch("dedup._digest", lambda row, columns: digests[row["approval_id"]]):
+            self.assertEqual(2, len(list(key_filter.filter(rows))))
+            self.assertEqual(0, len(list(key_filter.filter(rows))))
+        self.assertEqual(2, key_filter.dropped)
+
+    def test_many_keys_with_common_stride(self):
+        key_filter = PrimaryKeyFilter(["tempo_id"], "updated")
+        rows = [_worklog(i * 1024, "2024-01-01T00:00:00Z") for i in range(20_000)]
+        self.assertEqual(20_000, len(list(key_filter.filter(rows))))
+        self.assertEqual(0, len(list(key_filter.filter(rows))))
+
+
+class TestTableWriterDeduplication(unittest.TestCase):
+
+    def test_streamed_table_keeps_latest_rows(self):
+        with TemporaryDirectory() as directory:
+            writer = TableWriter(_CsvComponent(directory), "", incremental=True)
+            write_page = writer.sink(worklogs.FILENAME, worklogs.column_definitions())
+            write_page([_worklog(1, "2024-01-02T10:00:00Z"), _worklog(2, "2024-01-02T10:00:00Z")])
+            write_page([_worklog(3, "2024-01-02T10:00:00Z"), _worklog(1, "2024-01-04T10:00:00Z")])
+            appr_schema = approvals.table_column_definitions()[approvals._TABLE_APPROVAL_WORKLOGS]
+            writer.write(approvals.FILENAME_APPROVAL_WORKLOGS, appr_schema,
+                         [{"worklog_id": 1, "approval_id": "a"}, {"worklog_id": 1, "approval_id": "a"}])
+            writer.finish()
+            with open(os.path.join(directory, worklogs.FILENAME), newline="") as in_file:
+                rows = {int(values[0]): values[-1] for values in csv.reader(in_file)}
+            with open(os.path.join(directory, approvals.FILENAME_APPROVAL_WORKLOGS), newline="") as in_file:
+                approval_rows = list(csv.reader(in_file))
+        self.assertEqual({1: "2024-01-04T10:00:00Z", 2: "2024-01-02T10:00:00Z", 3: "2024-01-02T10:00:00Z"}, rows)
+        self.assertEqual(1, len(approval_rows))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+from datetime import datetime
+from unittest import mock
+import unittest
+
+import approvals
+import deferred
+import tempo
+from exceptions import TempoResponseException
+from tests.synthetic import SyntheticResponse, SyntheticTempo
+
+
+class _Flaky:
+    """ unit that fails with an API error the first `failures` times """
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise TempoResponseException("/teams/1/members", SyntheticResponse({}, status_code=503))
+
+
+class TestDeferredQueue(unittest.TestCase):
+
+    def test_failed_units_are_retried_at_the_end(self):
+        log = deferred.FailureLog(retries=2, backoff_sec=0)
+        queue = log.queue("teams")
+        flaky, broken = _Flaky(2), _Flaky(10)
+        self.assertFalse(queue.run("team 1", flaky))
+        self.assertFalse(queue.run("team 2", broken))
+        self.assertTrue(queue.run("team 3", _Flaky(0)))
+        queue.retry()
+        self.assertEqual(3, flaky.calls)
+        self.assertEqual(3, broken.calls)
+        self.assertEqual([("teams", "team 2", 3)], [(f["dataset"], f["unit"], f["attempts"]) for f in log.rows()])
+        self.assertTrue(log.failed("teams"))
+        state = {}
+        log.save(state)
+        self.assertEqual(["team 2"], [failure["unit"] for failure in state[deferred.STATE_KEY]])
+
+    def test_other_errors_are_raised(self):
+        queue = deferred.FailureLog(backoff_sec=0).queue("teams")
+        with self.assertRaises(KeyError):
+            queue.run("team 1", lambda: {}["id"])
+
+
+class TestApprovalsIsolation(unittest.TestCase):
+
+    @mock.patch.object(tempo, "_RETRY_DELAY_SEC", 0)
+    def test_failing_team_does_not_stop_the_others(self):
+        tenant = SyntheticTempo(teams=3, members_per_team=2)
+        client = tenant.client()
+
+        def get(endpoint, params=None, stream=False):
+            if endpoint.startswith("/timesheet-approvals/team/2"):
+                return SyntheticResponse({}, status_code=500)
+            return tenant.get(endpoint, params, stream)
+        client._raw_get = get
+        log = deferred.FailureLog(retries=1, backoff_sec=0)
+        with mock.patch.object(approvals, "read_until_date", return_value=datetime(2024, 1, 15)):
+            approvals_data, _ = approvals.run(client, datetime(2024, 1, 1), approvals.LOAD_TEMPO_WORKLOGS,
+                                              queue=log.queue("approvals_tempo"))
+        self.assertEqual({1, 3}, {row["team_id"] for row in approvals_data})
+        self.assertEqual(["team 2"], [failure["unit"] for failure in log.rows()])
+
+    @mock.patch.object(tempo, "_RETRY_DELAY_SEC", 0)
+    def test_without_queue_failure_is_raised(self):
+        tenant = SyntheticTempo(teams=1)
+        client = tenant.client()
+        client._raw_get = lambda endpoint, params=None, stream=False: SyntheticResponse({}, status_code=500)
+        with self.assertRaises(TempoResponseException):
+            approvals.run(client, datetime(2024, 1, 1), approvals.LOAD_TEMPO_WORKLOGS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import csv
+import io
+import unittest
+
+from encoding import CsvEncoder
+
+_FIELDNAMES = ["id", "name", "note"]
+_ROWS = [
+    {"id": 1, "name": "plain", "note": None},
+    {"id": 2, "name": "quote \" and, comma", "note": "line\nbreak"},
+    {"id": 3, "name": "čeština", "extra": "ignored"},
+    {"name": "no id", "note": 1.5, "id": ""},
+]
+
+
+def _dict_writer(rows: list[dict]) -> bytes:
+    text = io.StringIO(newline="")
+    csv.DictWriter(text, fieldnames=_FIELDNAMES, extrasaction="ignore").writerows(rows)
+    return text.getvalue().encode("utf-8")
+
+
+class TestCsvEncoder(unittest.TestCase):
+
+    def test_same_output_as_dict_writer(self):
+        out = io.BytesIO()
+        CsvEncoder().write(out, _FIELDNAMES, _ROWS)
+        self.assertEqual(_dict_writer(_ROWS), out.getvalue())
+
+    def test_extra_key_of_first_row_is_rejected(self):
+        renamed = [{"id": 1, "title": "renamed column", "note": None}] + _ROWS
+        with self.assertRaisesRegex(ValueError, "fields not in fieldnames: 'title'"):
+            CsvEncoder().write(io.BytesIO(), _FIELDNAMES, renamed)
+
+    def test_single_column(self):
+        out = io.BytesIO()
+        CsvEncoder().write(out, ["id"], [{"id": 1}, {"id": None}])
+        self.assertEqual(b"1\r\n\"\"\r\n", out.getvalue())
+
+    def test_chunks_encoded_by_worker_processes_in_order(self):
+        rows = [{"id": i, "name": f"row {i}", "note": "x" * (i % 7)} for i in range(2_500)]
+        encoder = CsvEncoder(processes=2, chunk_rows=100)
+        try:
+            out = io.BytesIO()
+            encoder.write(out, _FIELDNAMES, iter(rows))
+        finally:
+            encoder.close()
+        self.assertEqual(_dict_writer(rows), out.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+from datetime import datetime
+from unittest import mock
+import unittest
+
+import paging
+import tempo
+import worklogs
+from paging import PageSizer, STATE_KEY, with_limit
+from tests.synthetic import SyntheticTempo
+
+
+class TestPageSizer(unittest.TestCase):
+
+    def test_fast_full_pages_grow_until_max(self):
+        sizer = PageSizer()
+        for _ in range(10):
+            limit = sizer.limit("teams")
+            sizer.record("teams", limit, rows=limit, latency_sec=0.1, size_bytes=1_000)
+        self.assertEqual(paging.PAGE_LIMITS["teams"][2], sizer.limit("teams"))
+
+    def test_partial_page_keeps_limit(self):
+        sizer = PageSizer()
+        sizer.record("teams", 50, rows=12, latency_sec=0.1, size_bytes=1_000)
+        self.assertEqual(50, sizer.limit("teams"))
+
+    def test_slow_page_shrinks_and_is_remembered(self):
+        state = {}
+        PageSizer(state).record("worklogs", 5000, rows=5000, latency_sec=20, size_bytes=1_000)
+        self.assertEqual({"worklogs": 2500}, state[STATE_KEY])
+        self.assertEqual(2500, PageSizer(state).limit("worklogs"))
+
+    def test_stored_limits_are_clamped(self):
+        state = {STATE_KEY: {"worklogs": 100_000, "removed_endpoint": 10}}
+        self.assertEqual(5000, PageSizer(state).limit("worklogs"))
+        self.assertEqual({"worklogs": 5000}, state[STATE_KEY])
+
+    def test_with_limit_replaces_limit(self):
+        self.assertEqual("/worklogs?updatedFrom=2024-01-01&offset=10&limit=20",
+                         with_limit("/worklogs?updatedFrom=2024-01-01&limit=5000&offset=10", 20))
+
+
+class TestAdaptivePagination(unittest.TestCase):
+
+    @mock.patch.object(tempo, "_RETRY_DELAY_SEC", 0)
+    def test_failing_big_pages_are_retried_smaller(self):
+        tenant = SyntheticTempo(worklogs=3_000, reject_page_size=1_000)
+        state = {}
+        data = worklogs.run(tenant.client(page_sizer=PageSizer(state)), datetime(2024, 1, 1))
+        self.assertEqual(list(range(1, 3_001)), sorted(wl["tempo_id"] for wl in data))
+        self.assertLessEqual(state[STATE_KEY]["worklogs"], 1_000)
+
+    def test_fixed_limits_without_sizer(self):
+        tenant = SyntheticTempo(worklogs=12_000)
+        worklogs.run(tenant.client(), datetime(2024, 1, 1))
+        self.assertEqual([5000, 5000, 5000], tenant.limits)
+
+
+if __name__ == "__main__":
+    unittest.main()
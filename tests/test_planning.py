@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+import unittest
+
+import approvals
+import planning
+import team_membership
+import wl_attributes
+import worklogs
+from worklog_index import WorklogIndex
+from tests.synthetic import SyntheticTempo
+
+
+class TestProber(unittest.TestCase):
+
+    def test_counts_items_by_probing_offsets(self):
+        for count in (0, 1, 4_999, 5_000, 5_001, 10_000, 123_457):
+            tenant = SyntheticTempo(worklogs=count)
+            prober = planning.Prober(tenant.client())
+            self.assertEqual(count, prober.count("/worklogs", {"updatedFrom": "2024-01-01"}, 5_000)[0])
+            self.assertLess(prober.requests, 40)
+
+
+class TestPlan(unittest.TestCase):
+
+    def setUp(self):
+        self.since = datetime.now() - timedelta(weeks=3)
+        self.tenant = SyntheticTempo(worklogs=20_000, teams=3, members_per_team=4, start=self.since.date(),
+                                     rate_limit=100_000)
+
+    def test_estimates_match_requests_of_a_run(self):
+        datasets = ["worklogs", "worklog_attributes", "teams", "approvals_tempo"]
+        plan = planning.run(self.tenant.client(), self.since, datasets)
+        probes = self.tenant.requests
+        self.assertEqual(probes, plan["probe_requests"])
+        self.assertEqual(20_000, plan["datasets"]["worklogs"]["rows"])
+
+        client = self.tenant.client()
+        loaded = []
+        index = WorklogIndex()
+        actual = {}
+        for dataset, load in (
+            ("worklogs", lambda: loaded.extend(worklogs.run(client, self.since))),
+            ("worklog_attributes", lambda: wl_attributes.run(client, loaded)),
+            ("teams", lambda: team_membership.run(client)),
+            ("approvals_tempo", lambda: approvals.run(client, self.since, approvals.LOAD_TEMPO_WORKLOGS,
+                                                      worklog_index=index)),
+        ):
+            before = self.tenant.requests
+            load()
+            actual[dataset] = self.tenant.requests - before
+            if dataset == "worklogs":
+                index.add_page(loaded)
+        for dataset in ("worklogs", "worklog_attributes", "teams"):
+            self.assertEqual(actual[dataset], plan["datasets"][dataset]["requests"], dataset)
+        # approvals depend on the number of periods and members, the teams listing is not counted
+        self.assertAlmostEqual(actual["approvals_tempo"], plan["datasets"]["approvals_tempo"]["requests"],
+                               delta=actual["approvals_tempo"] * 0.3)
+        # approval worklogs found in the downloaded worklogs are not requested
+        self.assertLess(plan["probe_requests"] * 3, sum(actual.values()))
+
+    def test_reports_rate_limit_headroom(self):
+        plan = planning.run(self.tenant.client(), self.since, ["worklogs"])
+        remaining = 100_000 - self.tenant.requests
+        self.assertEqual(str(remaining), plan["rate_limit"]["x-ratelimit-remaining"])
+        self.assertEqual(remaining - plan["requests"], plan["rate_limit_headroom"])
+
+
+if __name__ == "__main__":
+    unittest.main()
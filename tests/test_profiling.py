@@ -0,0 +1,55 @@
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import TemporaryDirectory
+import json
+import os
+import pstats
+import unittest
+
+import profiling
+
+
+def _parse_pages(count: int) -> int:
+    return sum(len(json.loads(json.dumps({"results": list(range(200))}))["results"]) for _ in range(count))
+
+
+class TestStageProfiler(unittest.TestCase):
+
+    def test_artefacts_include_worker_threads(self):
+        with TemporaryDirectory() as out_dir:
+            profiler = profiling.StageProfiler(True, out_dir, prefix="acme_")
+            with profiler.stage("worklogs"):
+                with ThreadPoolExecutor(max_workers=2) as pool:
+                    self.assertEqual(4_000, sum(pool.map(_parse_pages, [10, 10])))
+            self.assertEqual({"acme_worklogs.pstats", "acme_worklogs_cpu.txt", "acme_worklogs_alloc.txt"},
+                             set(os.listdir(out_dir)))
+            stats = pstats.Stats(os.path.join(out_dir, "acme_worklogs.pstats"))
+            with open(os.path.join(out_dir, "acme_worklogs_cpu.txt")) as cpu_file:
+                cpu = cpu_file.read()
+            with open(os.path.join(out_dir, "acme_worklogs_alloc.txt")) as alloc_file:
+                alloc = alloc_file.read()
+        # the pages are parsed only on the pool threads
+        parsed = [calls for (_, _, function), (_, calls, *_) in stats.stats.items() if function == "_parse_pages"]
+        self.assertEqual([2], parsed)
+        self.assertRegex(cpu, r"worker threads \(merged, times summed over threads\): [12]\n")
+        self.assertIn("peak traced memory", alloc)
+
+    def test_long_lived_pool_opts_out(self):
+        pool = ThreadPoolExecutor(max_workers=1, initializer=profiling.unprofiled_thread)
+        try:
+            with TemporaryDirectory() as out_dir:
+                with profiling.StageProfiler(True, out_dir).stage("teams"):
+                    pool.submit(_parse_pages, 1).result()
+                stats = pstats.Stats(os.path.join(out_dir, "teams.pstats"))
+            self.assertNotIn("_parse_pages", [function for _, _, function in stats.stats])
+        finally:
+            pool.shutdown()
+
+    def test_disabled_writes_nothing(self):
+        with TemporaryDirectory() as out_dir:
+            with profiling.StageProfiler(False, out_dir).stage("teams"):
+                _parse_pages(1)
+            self.assertEqual([], os.listdir(out_dir))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+from unittest import mock
+import unittest
+
+from progress import Progress
+
+
+class _Clock:
+    """ monotonic clock moved by the test """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestProgress(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = _Clock()
+        patcher = mock.patch("progress.time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _logged(self, action) -> list[str]:
+        with mock.patch("progress.logging.info") as log:
+            action()
+        return [call.args[0] for call in log.call_args_list]
+
+    def test_logs_at_most_once_per_interval(self):
+        progress = Progress("worklogs", interval_sec=30)
+
+        def fetch():
+            for _ in range(10):
+                self.clock.now += 10
+                progress.add(rows=100, pages=1)
+        logged = self._logged(fetch)
+        # 30, 60 and 90 s after the start
+        self.assertEqual(3, len(logged))
+        self.assertEqual("[progress] worklogs: 300 rows, 3 pages in 30 s (10.0 rows/s, 0.10 pages/s)", logged[0])
+        self.assertEqual(1000, progress.rows)
+        self.assertEqual(10, progress.pages)
+
+    def test_eta_from_finished_units(self):
+        progress = Progress("teams", total=4, unit="teams", interval_sec=30)
+
+        def fetch():
+            self.clock.now += 40
+            progress.add(rows=40, pages=2)
+            progress.unit_done()
+            self.clock.now += 20
+            progress.unit_done()
+        logged = self._logged(fetch)
+        self.assertEqual(["[progress] teams: 40 rows, 2 pages in 40 s (1.0 rows/s, 0.05 pages/s)"
+                          ", 0 / 4 teams"], logged)
+        # 2 of 4 teams in 60 s
+        self.assertEqual("40 rows, 2 pages in 60 s (0.7 rows/s, 0.03 pages/s), 2 / 4 teams, ETA 60 s",
+                         progress._summary())
+
+    def test_units_without_total_and_finish(self):
+        progress = Progress("attributes", unit="batches")
+        progress.unit_done(3)
+        self.clock.now += 5
+        progress.set_total(3)
+        logged = self._logged(progress.finish)
+        self.assertEqual(["[progress] attributes finished: 0 rows, 0 pages in 5 s (0.0 rows/s, 0.00 pages/s)"
+                          ", 3 / 3 batches"], logged)
+        progress.set_total(0)
+        self.assertTrue(progress._summary().endswith(", 3 batches"))
+
+
+if __name__ == "__main__":
+    unittest.main()
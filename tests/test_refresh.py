@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta, timezone
+import unittest
+
+from keboola.component.exceptions import UserException
+
+from configuration import Configuration
+from refresh import RefreshSchedule
+
+
+class TestRefreshSchedule(unittest.TestCase):
+
+    def setUp(self):
+        self.now = datetime(2024, 6, 3, 12, 0, tzinfo=timezone.utc)
+        self.state = {}
+        first = RefreshSchedule(self.state, {"teams": 60}, now=self.now)
+        for dataset in first.select(["worklogs", "teams"]):
+            first.extracted(dataset, {"teams": [{"id": 1}]} if dataset == "teams" else None)
+        first.commit()
+
+    def test_fresh_datasets_are_skipped_until_the_interval_passes(self):
+        later = RefreshSchedule(self.state, {"teams": 60}, now=self.now + timedelta(minutes=59))
+        self.assertEqual(["worklogs"], later.select(["worklogs", "teams"]))
+        self.assertEqual({"teams": [{"id": 1}]}, later.cached("teams"))
+        later = RefreshSchedule(self.state, {"teams": 60}, now=self.now + timedelta(minutes=60))
+        self.assertEqual(["worklogs", "teams"], later.select(["worklogs", "teams"]))
+
+    def test_failed_run_is_not_recorded(self):
+        failed = RefreshSchedule(self.state, {"teams": 60}, now=self.now + timedelta(hours=2))
+        failed.extracted("teams")
+        # no commit
+        self.assertEqual(self.now.isoformat(), self.state["refreshed"]["teams"])
+
+    def test_cache_of_datasets_without_interval_is_dropped(self):
+        schedule = RefreshSchedule(self.state, {}, now=self.now + timedelta(minutes=1))
+        self.assertEqual(["worklogs", "teams"], schedule.select(["worklogs", "teams"]))
+        schedule.commit()
+        self.assertEqual({}, self.state["reference_data"])
+
+    def test_unknown_dataset_interval_fails(self):
+        params = {"org_name": "o", "user_email": "e", "#tempo_token": "t", "#jira_token": "j", "since": "today",
+                  "datasets": ["teams"]}
+        self.assertEqual({"teams": 60}, Configuration(**params, refresh_minutes={"teams": 60}).refresh_minutes)
+        with self.assertRaises(UserException):
+            Configuration(**params, refresh_minutes={"team": 60})
+
+
+if __name__ == "__main__":
+    unittest.main()
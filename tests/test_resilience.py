@@ -0,0 +1,170 @@
+from requests.exceptions import ConnectionError, ReadTimeout
+from unittest import mock
+import threading
+import time
+import unittest
+
+import resilience
+import tempo
+from resilience import CircuitBreaker, LatencyTracker
+from tests.synthetic import SyntheticResponse
+
+
+_ENDPOINT = "/timesheet-approvals/team/7"
+
+
+class TestLatencyTracker(unittest.TestCase):
+
+    def test_hedge_delay_is_p95_of_endpoint_shape(self):
+        tracker = LatencyTracker(window=100, min_samples=20)
+        for latency in range(1, 20):
+            tracker.record(f"/timesheet-approvals/team/{latency}?from=2024-01-01", latency)
+        self.assertIsNone(tracker.hedge_delay(_ENDPOINT))
+        tracker.record("/timesheet-approvals/team/20", 20)
+        self.assertEqual(20, tracker.hedge_delay(_ENDPOINT))
+        self.assertIsNone(tracker.hedge_delay("/teams"))
+        for latency in range(21, 101):
+            tracker.record(_ENDPOINT, latency)
+        self.assertEqual(96, tracker.hedge_delay(_ENDPOINT))
+
+    def test_hedge_delay_has_a_floor_and_a_window(self):
+        tracker = LatencyTracker(window=20, min_samples=20)
+        for _ in range(20):
+            tracker.record(_ENDPOINT, 100)
+        for _ in range(20):
+            tracker.record(_ENDPOINT, 0.01)
+        self.assertEqual(resilience._HEDGE_MIN_DELAY_SEC, tracker.hedge_delay(_ENDPOINT))
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_opens_on_error_rate_and_closes_after_successful_probe(self):
+        breaker = CircuitBreaker(window=10, min_requests=4, error_rate=0.5, cooldown_sec=0.2)
+        for success in (True, False, True):
+            breaker.record(success)
+        self.assertFalse(breaker.is_open)
+        breaker.record(False)
+        self.assertTrue(breaker.is_open)
+        started = time.monotonic()
+        breaker.wait()
+        self.assertGreaterEqual(time.monotonic() - started, 0.15)
+        # half-open - the caller that got through is the probe, the others wait for its outcome
+        waiter_released = threading.Event()
+        waiter = threading.Thread(target=lambda: (breaker.wait(), waiter_released.set()))
+        waiter.start()
+        self.assertFalse(waiter_released.wait(0.1))
+        breaker.record(True)
+        self.assertTrue(waiter_released.wait(1))
+        waiter.join()
+        self.assertFalse(breaker.is_open)
+
+    def test_failed_probe_keeps_breaker_open(self):
+        breaker = CircuitBreaker(window=2, min_requests=2, error_rate=0.5, cooldown_sec=0.1)
+        breaker.record(False)
+        breaker.record(False)
+        breaker.wait()
+        # outcomes of other threads (requests sent before the breaker opened) do not decide
+        late = threading.Thread(target=breaker.record, args=(True,))
+        late.start()
+        late.join()
+        self.assertTrue(breaker.is_open)
+        breaker.record(False)
+        self.assertTrue(breaker.is_open)
+        started = time.monotonic()
+        breaker.wait()
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+        breaker.record(True)
+        self.assertFalse(breaker.is_open)
+
+    @mock.patch.object(tempo, "_RETRY_DELAY_SEC", 0)
+    def test_request_errors_are_counted(self):
+        client = tempo.TempoClient("token", circuit_breaker=True)
+        client._breaker = CircuitBreaker(window=4, min_requests=4, error_rate=0.5, cooldown_sec=60)
+        client._raw_get = mock.Mock(side_effect=ConnectionError("connection reset"))
+        for _ in range(4):
+            with self.assertRaises(ConnectionError):
+                client._checked_get("/teams")
+        self.assertTrue(client._breaker.is_open)
+        client.close()
+
+
+class _Server:
+    """
+    _raw_get of a client - answers the n-th request after delays[n] s,
+    an exception fails it right away, (delay, exception) after delay s
+    """
+
+    def __init__(self, *delays):
+        self.delays = list(delays)
+        self.threads = []
+        self._lock = threading.Lock()
+
+    def get(self, endpoint, params=None, stream=False, timeout=None) -> SyntheticResponse:
+        with self._lock:
+            number = len(self.threads)
+            self.threads.append(threading.current_thread().name)
+        delay = self.delays[number]
+        if isinstance(delay, Exception):
+            raise delay
+        if isinstance(delay, tuple):
+            time.sleep(delay[0])
+            raise delay[1]
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise ReadTimeout(f"no response in {timeout} s")
+        time.sleep(delay)
+        return SyntheticResponse({"request": number})
+
+
+@mock.patch.object(resilience, "_HEDGE_MIN_DELAY_SEC", 0.05)
+class TestHedgedGet(unittest.TestCase):
+
+    def setUp(self):
+        self.client = tempo.TempoClient("token", hedge_requests=True)
+        for _ in range(resilience._LATENCY_MIN_SAMPLES):
+            self.client._latency.record(_ENDPOINT, 0.01)
+        self.addCleanup(self.client.close)
+
+    def _get(self, server: _Server) -> dict:
+        self.client._raw_get = server.get
+        started = time.monotonic()
+        response = self.client._hedged_get(_ENDPOINT)
+        self.elapsed = time.monotonic() - started
+        return response.json()
+
+    def test_fast_request_is_not_duplicated(self):
+        server = _Server(0.0, 0.0)
+        self.assertEqual({"request": 0}, self._get(server))
+        time.sleep(0.1)
+        # sent from the calling thread
+        self.assertEqual([threading.current_thread().name], server.threads)
+
+    def test_duplicate_beats_slow_request(self):
+        server = _Server(1.0, 0.01)
+        self.assertEqual({"request": 1}, self._get(server))
+        # the request gives up after twice the hedge delay, not after its full second
+        self.assertLess(self.elapsed, 0.5)
+        self.assertEqual(threading.current_thread().name, server.threads[0])
+        self.assertTrue(server.threads[1].startswith("tempo-hedge"))
+
+    def test_request_failing_early_is_not_duplicated(self):
+        server = _Server(ConnectionError("connection reset"), 0.0)
+        # failing before the hedge delay - nothing to replace it, the error goes to the retries
+        with self.assertRaises(ConnectionError):
+            self._get(server)
+        time.sleep(0.1)
+        self.assertEqual(1, len(server.threads))
+
+    def test_duplicate_replaces_failed_request(self):
+        server = _Server((0.08, ConnectionError("connection reset")), 0.05)
+        self.assertEqual({"request": 1}, self._get(server))
+
+    def test_latency_of_duplicate_is_recorded(self):
+        server = _Server(1.0, 0.01)
+        self._get(server)
+        self.assertEqual(resilience._LATENCY_MIN_SAMPLES + 1,
+                         len(self.client._latency._samples[resilience.endpoint_key(_ENDPOINT)]))
+
+
+if __name__ == "__main__":
+    unittest.main()
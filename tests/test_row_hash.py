@@ -0,0 +1,38 @@
+import unittest
+
+from row_hash import RowHashStore, STATE_KEY
+
+
+class TestRowHashStore(unittest.TestCase):
+
+    def setUp(self):
+        self.rows = [
+            {"id": 1, "name": "A", "lead": None},
+            {"id": 2, "name": "B", "lead": "x"}
+        ]
+
+    def test_unchanged_rows_are_dropped_on_next_run(self):
+        state = {}
+        first = RowHashStore(state, ["teams"]).filter_changed("teams", ["id"], ["id", "name", "lead"], self.rows)
+        self.assertEqual(2, len(first))
+        changed = [{"id": 1, "name": "A", "lead": None}, {"id": 2, "name": "B2", "lead": "x"}]
+        second = RowHashStore(state, ["teams"]).filter_changed("teams", ["id"], ["id", "name", "lead"], changed)
+        self.assertEqual([{"id": 2, "name": "B2", "lead": "x"}], second)
+
+    def test_full_load_returns_all_rows(self):
+        state = {}
+        RowHashStore(state, ["teams"]).filter_changed("teams", ["id"], ["id", "name", "lead"], self.rows)
+        rows = RowHashStore(state, ["teams"]).filter_changed(
+            "teams", ["id"], ["id", "name", "lead"], self.rows, incremental=False
+        )
+        self.assertEqual(2, len(rows))
+
+    def test_disabled_table_is_untouched_and_forgotten(self):
+        state = {STATE_KEY: {"approvals": {"a": "b"}}}
+        rows = RowHashStore(state, ["teams"]).filter_changed("approvals", ["id"], ["id"], self.rows)
+        self.assertEqual(self.rows, rows)
+        self.assertNotIn("approvals", state[STATE_KEY])
+
+
+if __name__ == "__main__":
+    unittest.main()
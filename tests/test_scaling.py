@@ -0,0 +1,121 @@
+"""
+Memory and runtime scaling of the dataset modules against a synthetic tenant.
+
+TEMPO_SCALE multiplies the tenant size (default 1 keeps the suite fast enough for CI),
+e.g. TEMPO_SCALE=500 runs worklogs extraction over 10M worklogs.
+Streaming paths must keep their peak memory flat when the tenant grows,
+materializing paths must stay under a fixed budget per row.
+Throughput floors are wall-clock measurements, they are checked only when TEMPO_SCALE is set
+(on a dedicated machine), not on shared CI runners.
+"""
+from datetime import datetime, timedelta
+import os
+import time
+import tracemalloc
+import unittest
+
+import approvals
+import team_membership
+import wl_attributes
+import worklogs
+from tests.synthetic import SyntheticTempo
+
+
+SCALE = max(1, int(os.environ.get("TEMPO_SCALE", "1")))
+CHECK_SPEED = "TEMPO_SCALE" in os.environ
+
+# peak of a streaming run over a 4x larger tenant may grow at most by this factor
+_FLAT_GROWTH = 1.5
+# tracemalloc slows python down ~2-3x, the throughput floors account for that
+_MIN_WORKLOGS_PER_SEC = 2_000
+_MAX_BYTES_PER_WORKLOG = 1_536
+_MAX_BYTES_PER_MEMBERSHIP = 2_048
+
+
+def measure(func, *args, **kwargs):
+    """ returns (result, peak allocated bytes, seconds) """
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak, elapsed
+
+
+def discard(*_):
+    pass
+
+
+class TestWorklogsScaling(unittest.TestCase):
+
+    def test_streamed_worklogs_keep_flat_peak(self):
+        small = SyntheticTempo(worklogs=5_000 * SCALE, max_page_size=1_000)
+        large = SyntheticTempo(worklogs=20_000 * SCALE, max_page_size=1_000)
+        since = datetime(2024, 1, 1)
+        _, small_peak, _ = measure(worklogs.run, small.client(), since, on_page=discard)
+        _, large_peak, elapsed = measure(worklogs.run, large.client(), since, on_page=discard)
+        self.assertLess(large_peak, small_peak * _FLAT_GROWTH,
+                        f"streaming peak grew from {small_peak} B to {large_peak} B")
+        if CHECK_SPEED:
+            self.assertGreater(large.worklogs / elapsed, _MIN_WORKLOGS_PER_SEC)
+
+    def test_collected_worklogs_stay_in_row_budget(self):
+        tenant = SyntheticTempo(worklogs=20_000 * SCALE)
+        data, peak, _ = measure(worklogs.run, tenant.client(), datetime(2024, 1, 1))
+        self.assertEqual(tenant.worklogs, len(data))
+        self.assertLess(peak / len(data), _MAX_BYTES_PER_WORKLOG)
+
+
+class TestWorklogAttributesScaling(unittest.TestCase):
+
+    def test_streamed_attributes_keep_flat_peak(self):
+        peaks = []
+        for count in (4_000 * SCALE, 16_000 * SCALE):
+            tenant = SyntheticTempo(worklogs=count)
+            source = [{"tempo_id": i + 1} for i in range(count)]
+            _, peak, _ = measure(wl_attributes.run, tenant.client(), source, on_batch=discard)
+            # the id list is proportional to the input, everything else has to be per batch
+            peaks.append(peak - count * 16)
+        self.assertLess(peaks[1], peaks[0] * _FLAT_GROWTH, f"streaming peak grew from {peaks[0]} B to {peaks[1]} B")
+
+
+class TestApprovalsScaling(unittest.TestCase):
+
+    def test_streamed_approvals_keep_flat_peak(self):
+        since = datetime.now() - timedelta(weeks=3)
+        peaks = []
+        for teams in (5 * SCALE, 20 * SCALE):
+            tenant = SyntheticTempo(teams=teams, members_per_team=8, start=since.date() - timedelta(days=30))
+            rows = []
+            _, peak, _ = measure(approvals.run, tenant.client(), since, approvals.LOAD_TEMPO_WORKLOGS,
+                                 on_team=lambda appr, appr_wl: rows.append(len(appr)))
+            self.assertEqual(teams, len(rows))
+            self.assertTrue(all(count > 0 for count in rows))
+            peaks.append(peak)
+        self.assertLess(peaks[1], peaks[0] * _FLAT_GROWTH, f"streaming peak grew from {peaks[0]} B to {peaks[1]} B")
+
+    def test_jira_worklog_ids_are_mapped(self):
+        since = datetime.now() - timedelta(weeks=1)
+        tenant = SyntheticTempo(teams=2, members_per_team=2, start=since.date())
+        appr, appr_worklogs = approvals.run(tenant.client(), since, approvals.LOAD_JIRA_WORKLOGS)
+        self.assertGreater(len(appr), 0)
+        self.assertGreater(len(appr_worklogs), 0)
+        self.assertTrue(all(row["worklog_id"] > 500_000 for row in appr_worklogs))
+
+
+class TestTeamMembershipScaling(unittest.TestCase):
+
+    def test_memberships_stay_in_row_budget(self):
+        tenant = SyntheticTempo(teams=200 * SCALE, members_per_team=40)
+        data, peak, _ = measure(team_membership.run, tenant.client())
+        memberships = data["team_membership"]
+        self.assertEqual(200 * SCALE, len(data["teams"]))
+        self.assertGreater(len(memberships), 0)
+        self.assertLess(peak / len(memberships), _MAX_BYTES_PER_MEMBERSHIP)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import threading
+import time
+import unittest
+
+import scheduling
+from scheduling import RequestScheduler
+
+
+class TestRequestScheduler(unittest.TestCase):
+
+    def test_max_in_flight_is_enforced(self):
+        scheduler = RequestScheduler(max_in_flight=3)
+        lock = threading.Lock()
+        running = [0]
+        peak = [0]
+
+        def request(flow):
+            with scheduler.slot(flow):
+                with lock:
+                    running[0] += 1
+                    peak[0] = max(peak[0], running[0])
+                time.sleep(0.005)
+                with lock:
+                    running[0] -= 1
+
+        threads = [threading.Thread(target=request, args=(flow,))
+                   for flow in [scheduling.FLOW_WORKLOGS, scheduling.FLOW_APPROVALS] * 20]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(3, peak[0])
+        self.assertEqual({scheduling.FLOW_WORKLOGS: 20, scheduling.FLOW_APPROVALS: 20}, scheduler.granted)
+
+    def test_waiting_flows_share_slots_by_weight(self):
+        scheduler = RequestScheduler(max_in_flight=1)
+        order = []
+
+        def request(flow):
+            scheduler.acquire(flow)
+            order.append(flow)
+            scheduler.release()
+
+        scheduler.acquire(scheduling.FLOW_OTHER)
+        threads = [threading.Thread(target=request, args=(flow,))
+                   for flow in [scheduling.FLOW_APPROVALS] * 10 + [scheduling.FLOW_WORKLOGS] * 20]
+        for thread in threads:
+            thread.start()
+        while sum(scheduler.waited.values()) < len(threads):
+            time.sleep(0.001)
+        scheduler.release()
+        for thread in threads:
+            thread.join()
+        # 4 worklog pages per approval request, approvals are not starved
+        self.assertEqual(8, order[:10].count(scheduling.FLOW_WORKLOGS))
+        self.assertEqual(2, order[:10].count(scheduling.FLOW_APPROVALS))
+        self.assertEqual([scheduling.FLOW_APPROVALS] * 5, order[-5:])
+
+    def test_unlimited_scheduler_does_not_wait(self):
+        scheduler = RequestScheduler()
+        for _ in range(100):
+            scheduler.acquire(scheduling.FLOW_WORKLOGS)
+        self.assertEqual({}, scheduler.waited)
+
+    def test_enclosing_flow_wins(self):
+        scheduler = RequestScheduler()
+        self.assertEqual(scheduling.FLOW_OTHER, scheduler.current_flow())
+        with scheduler.flow(scheduling.FLOW_APPROVALS):
+            with scheduler.flow(scheduling.FLOW_OTHER):
+                self.assertEqual(scheduling.FLOW_APPROVALS, scheduler.current_flow())
+        self.assertEqual(scheduling.FLOW_OTHER, scheduler.current_flow())
+
+
+if __name__ == "__main__":
+    unittest.main()
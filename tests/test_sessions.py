@@ -0,0 +1,33 @@
+import threading
+import unittest
+
+from sessions import SessionProvider
+
+
+class TestSessionProvider(unittest.TestCase):
+
+    def test_shared_session_is_created_once(self):
+        provider = SessionProvider(configure=lambda session: None)
+        sessions = []
+        threads = [threading.Thread(target=lambda: sessions.append(provider.get())) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+        self.assertEqual(4, len(sessions))
+        self.assertEqual(1, len({id(session) for session in sessions}))
+        provider.close()
+
+    def test_session_per_thread(self):
+        provider = SessionProvider(configure=lambda session: None, per_thread=True)
+        sessions = [provider.get()]
+        thread = threading.Thread(target=lambda: sessions.append(provider.get()))
+        thread.start()
+        thread.join(timeout=5)
+        self.assertIsNot(sessions[0], sessions[1])
+        self.assertIs(sessions[0], provider.get())
+        provider.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+
+import worklogs
+from staging import StagingStore
+
+
+def _worklog(tempo_id: int, updated: str) -> dict:
+    return {
+        "tempo_id": tempo_id,
+        "issue_id": 10,
+        "author_account_id": "user",
+        "start_date_time_utc": "2024-01-01T08:00:00Z",
+        "time_spent_seconds": 60,
+        "created": "2024-01-01T08:00:00Z",
+        "updated": updated
+    }
+
+
+class TestStagingStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = StagingStore()
+        self.store.create_table("worklogs", worklogs.column_definitions())
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_duplicate_key_keeps_latest_updated(self):
+        self.store.insert("worklogs", [_worklog(1, "2024-01-02"), _worklog(2, "2024-01-02")])
+        self.store.insert("worklogs", [_worklog(1, "2024-01-03"), _worklog(2, "2024-01-01")])
+        rows = {row["tempo_id"]: row["updated"] for row in self.store.rows("worklogs")}
+        self.assertEqual({1: "2024-01-03", 2: "2024-01-02"}, rows)
+
+    def test_rows_selects_columns(self):
+        self.store.insert("worklogs", [_worklog(1, "2024-01-02")])
+        self.assertEqual([{"tempo_id": 1}], list(self.store.rows("worklogs", ["tempo_id"])))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+from datetime import datetime
+import io
+import json
+import tracemalloc
+import unittest
+
+import streaming
+import worklogs
+from tests.synthetic import SyntheticTempo
+
+
+@unittest.skipUnless(streaming.available(), "ijson is not installed")
+class TestParsePage(unittest.TestCase):
+
+    def setUp(self):
+        self.tenant = SyntheticTempo(worklogs=2_000)
+        self.payload = self.tenant.get("/worklogs", {"limit": 2_000}).content
+
+    def test_projects_items_and_reads_metadata_after_results(self):
+        payload = json.dumps({"results": [{"id": 1, "x": {"y": [1, 2]}}, {"id": 2, "x": None}],
+                              "metadata": {"count": 2, "next": "n"}}).encode()
+        page = streaming.parse_page(io.BytesIO(payload), lambda item: item["id"])
+        self.assertEqual({"metadata": {"count": 2, "next": "n"}, "results": [1, 2]}, page)
+
+    def test_matches_json_parsing(self):
+        page = streaming.parse_page(io.BytesIO(self.payload))
+        self.assertEqual(json.loads(self.payload)["results"], page["results"])
+
+    def test_truncated_page_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            streaming.parse_page(io.BytesIO(self.payload[:-100]))
+
+    def test_projected_page_peak_is_lower(self):
+        def buffered():
+            return [len(item) for item in json.loads(self.payload)["results"]]
+
+        def streamed():
+            return streaming.parse_page(io.BytesIO(self.payload), len)["results"]
+        peaks = []
+        for parse in (buffered, streamed):
+            tracemalloc.start()
+            parse()
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        self.assertLess(peaks[1] * 5, peaks[0])
+
+    def test_client_streams_same_worklogs(self):
+        since = datetime(2024, 1, 1)
+        expected = worklogs.run(self.tenant.client(), since)
+        self.assertEqual(expected, worklogs.run(self.tenant.client(stream_json=True), since))
+
+
+if __name__ == "__main__":
+    unittest.main()
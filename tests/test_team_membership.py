@@ -0,0 +1,31 @@
+from datetime import date
+import unittest
+
+import team_membership
+from tests.synthetic import SyntheticTempo
+
+
+class TestTeamMembership(unittest.TestCase):
+
+    def test_memberships_of_all_pages_and_teams(self):
+        tenant = SyntheticTempo(teams=7, members_per_team=120)
+        data = team_membership.run(tenant.client(), max_workers=4)
+        self.assertEqual([team["id"] for team in data["teams"]], list(range(1, 8)))
+        memberships = data["team_membership"]
+        self.assertEqual(7 * 120, len(memberships))
+        # grouped in the order of teams, 3 pages of the default limit per team
+        self.assertEqual([m["team_id"] for m in memberships], [t for t in range(1, 8) for _ in range(120)])
+        self.assertEqual(1 + 7 * 3, tenant.requests)
+
+    def test_only_memberships_active_on_date(self):
+        tenant = SyntheticTempo(teams=3, members_per_team=10, left_members=4, start=date(2024, 1, 1))
+        self.assertEqual(30, len(team_membership.run(tenant.client())["team_membership"]))
+        active = team_membership.run(tenant.client(), active_on=date(2024, 1, 31))["team_membership"]
+        self.assertEqual(30, len(active))
+        active = team_membership.run(tenant.client(), active_on=date(2024, 2, 1))["team_membership"]
+        self.assertEqual(18, len(active))
+        self.assertEqual([], team_membership.run(tenant.client(), active_on=date(2023, 12, 31))["team_membership"])
+
+
+if __name__ == "__main__":
+    unittest.main()
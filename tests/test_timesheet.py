@@ -0,0 +1,57 @@
+from datetime import datetime
+import unittest
+
+import team_membership
+import timesheet
+import worklogs
+from tests.synthetic import SyntheticTempo
+
+
+class TestTimesheetAccumulator(unittest.TestCase):
+
+    def setUp(self):
+        self.tenant = SyntheticTempo(worklogs=3_000, teams=1, members_per_team=10)
+        self.since = datetime(2024, 7, 1)
+        all_worklogs = [worklogs._map_worklog_to_table(self.tenant.worklog(i)) for i in range(self.tenant.worklogs)]
+        self.expected = {}
+        for wl in all_worklogs:
+            key = (wl["author_account_id"], wl["start_date_time_utc"][:10])
+            seconds, count = self.expected.get(key, (0, 0))
+            self.expected[key] = (seconds + wl["time_spent_seconds"], count + 1)
+        # worklogs updated since: everything dated since + a few older edited worklogs
+        since_day = str(self.since.date())
+        self.changed = [wl for i, wl in enumerate(all_worklogs)
+                        if wl["start_date_time_utc"][:10] >= since_day or i % 97 == 0]
+
+    def accumulate(self) -> timesheet.TimesheetAccumulator:
+        accumulator = timesheet.TimesheetAccumulator(self.since)
+        for start in range(0, len(self.changed), 100):
+            accumulator.add_page(self.changed[start:start + 100])
+        accumulator.refresh(self.tenant.client(), max_workers=4)
+        return accumulator
+
+    def test_affected_buckets_match_full_recount(self):
+        rows = list(self.accumulate().rows())
+        affected = {(wl["author_account_id"], wl["start_date_time_utc"][:10]) for wl in self.changed}
+        self.assertEqual(affected, {(row["account_id"], row["date"]) for row in rows})
+        for row in rows:
+            self.assertEqual(self.expected[(row["account_id"], row["date"])],
+                             (row["time_spent_seconds"], row["worklog_count"]))
+            self.assertEqual("", row["team_id"])
+
+    def test_rows_are_joined_with_teams(self):
+        memberships = team_membership.run(self.tenant.client())[team_membership._TABLE_TEAM_MEMBERSHIPS]
+        members = {m["account_id"] for m in memberships}
+        for row in self.accumulate().rows(memberships):
+            self.assertEqual("1" if row["account_id"] in members else "", row["team_id"])
+
+    def test_only_old_days_are_reloaded(self):
+        accumulator = timesheet.TimesheetAccumulator(datetime(2023, 1, 1))
+        accumulator.add_page(self.changed)
+        requests = self.tenant.requests
+        accumulator.refresh(self.tenant.client())
+        self.assertEqual(requests, self.tenant.requests)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+from datetime import datetime
+from tempfile import TemporaryDirectory
+from unittest import mock
+import json
+import os
+import unittest
+
+import approvals
+import tempo
+import tracing
+from exceptions import TempoResponseException
+from tests.synthetic import SyntheticTempo
+
+
+class TestTracing(unittest.TestCase):
+
+    def test_spans_of_approvals(self):
+        tenant = SyntheticTempo(teams=2, members_per_team=3)
+        tracer = tracing.Tracer(True)
+        client = tenant.client(tracer=tracer)
+        with mock.patch.object(approvals, "read_until_date", return_value=datetime(2024, 1, 15)):
+            approvals.run(client, datetime(2024, 1, 1), approvals.LOAD_TEMPO_WORKLOGS)
+        events = tracer.events()
+        teams = [e for e in events if e["cat"] == tracing.CAT_UNIT and e["name"] == "team"]
+        periods = [e for e in events if e["cat"] == tracing.CAT_UNIT and e["name"] == "period"]
+        requests = [e for e in events if e["cat"] == tracing.CAT_REQUEST]
+        self.assertEqual([1, 2], [e["args"]["team_id"] for e in teams])
+        self.assertGreater(len(periods), 0)
+        self.assertEqual(tenant.requests, len(requests))
+        for period in periods:
+            team = teams[period["args"]["team_id"] - 1]
+            # periods are nested in their team span
+            self.assertGreaterEqual(period["ts"], team["ts"])
+            self.assertLessEqual(period["ts"] + period["dur"], team["ts"] + team["dur"])
+        self.assertTrue(all(e["args"]["outcome"] == tracing.OUTCOME_OK for e in events))
+        self.assertIn("GET /timesheet-approvals/team/1", [e["name"] for e in requests])
+
+    @mock.patch.object(tempo, "_RETRY_DELAY_SEC", 0)
+    def test_retries_and_failure_outcomes(self):
+        tenant = SyntheticTempo(worklogs=3_000, reject_page_size=1_000)
+        tracer = tracing.Tracer(True)
+        client = tenant.client(tracer=tracer)
+        with self.assertRaises(TempoResponseException):
+            client.worklogs_updated_from("2024-01-01")
+        events = tracer.events()
+        attempts = [e for e in events if e["name"] == "GET /worklogs"]
+        self.assertEqual(list(range(tempo._MAX_RETRY_COUNT + 1)), [e["args"]["attempt"] for e in attempts])
+        self.assertTrue(all(e["args"]["outcome"] == "http 500" for e in attempts))
+        self.assertEqual(tempo._MAX_RETRY_COUNT, len([e for e in events if e["name"] == "retry wait"]))
+        page = [e for e in events if e["cat"] == tracing.CAT_PAGE]
+        self.assertEqual("error: TempoResponseException", page[0]["args"]["outcome"])
+
+    def test_write_chrome_trace(self):
+        with TemporaryDirectory() as out_dir:
+            tracer = tracing.Tracer(True, out_dir, prefix="acme_")
+            with tracer.span("run", tracing.CAT_RUN):
+                with tracer.span("worklogs", tracing.CAT_DATASET) as span:
+                    span["rows"] = 10
+            path = tracer.write()
+            self.assertEqual(os.path.join(out_dir, "acme_trace.json"), path)
+            with open(path) as trace_file:
+                trace = json.load(trace_file)
+        spans = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+        self.assertEqual(["worklogs", "run"], [e["name"] for e in spans])
+        self.assertEqual({"rows": 10, "outcome": "ok"}, spans[0]["args"])
+        self.assertEqual(["thread_name"], [e["name"] for e in trace["traceEvents"] if e["ph"] == "M"])
+
+    def test_disabled_records_nothing(self):
+        tracer = tracing.Tracer(False)
+        with tracer.span("run", tracing.CAT_RUN):
+            pass
+        self.assertEqual([], tracer.events())
+        self.assertEqual("", tracer.write())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+from datetime import datetime
+import json
+import unittest
+
+from requests import exceptions as requests_exceptions
+
+import tempo
+import transport
+import worklogs
+from tests.synthetic import SyntheticTempo
+
+if transport.http2_available():
+    import httpx
+
+
+@unittest.skipUnless(transport.http2_available(), "httpx / h2 is not installed")
+class TestHttp2Transport(unittest.TestCase):
+
+    def setUp(self):
+        self.tenant = SyntheticTempo(worklogs=1_200)
+        self.failures: list[Exception] = []
+
+    def handler(self, request: "httpx.Request") -> "httpx.Response":
+        if len(self.failures) > 0:
+            raise self.failures.pop(0)
+        endpoint = request.url.raw_path.decode()[len("/4"):]
+        if request.method == "POST":
+            response = self.tenant.post(endpoint, json.loads(request.content))
+        else:
+            response = self.tenant.get(endpoint)
+        return httpx.Response(response.status_code, content=response.content, headers={"X-RateLimit-Remaining": "7"})
+
+    def client(self, **kwargs) -> tempo.TempoClient:
+        client = tempo.TempoClient("token", http_transport=transport.TRANSPORT_HTTP2, **kwargs)
+        self.assertIsInstance(client._transport, transport.Http2Transport)
+        client._transport._client = httpx.Client(transport=httpx.MockTransport(self.handler))
+        return client
+
+    def test_worklogs_are_the_same_as_with_requests(self):
+        since = datetime(2024, 1, 1)
+        expected = worklogs.run(self.tenant.client(), since)
+        self.assertEqual(expected, worklogs.run(self.client(), since))
+        self.assertEqual(expected, worklogs.run(self.client(stream_json=True), since))
+
+    def test_post_and_response_headers(self):
+        client = self.client()
+        self.assertEqual({1: 500_001, 2: 500_002}, client.tempo_to_jira_worklog_ids([1, 2]))
+        _, _, headers = client.probe("/teams")
+        self.assertEqual({"x-ratelimit-remaining": "7"}, headers)
+
+    def test_request_of_terminated_connection_is_sent_again(self):
+        self.failures = [httpx.RemoteProtocolError("ConnectionTerminated"), httpx.ReadError("reset")]
+        self.assertEqual(20, len(self.client().teams()))
+
+    def test_errors_are_raised_as_requests_exceptions(self):
+        self.failures = [httpx.ConnectError("refused")]
+        with self.assertRaises(requests_exceptions.ConnectionError):
+            self.client().teams()
+        self.failures = [httpx.ReadTimeout("timed out")]
+        with self.assertRaises(requests_exceptions.Timeout):
+            self.client().teams()
+        response = transport.Http2Response(httpx.Response(200, content=b"{not json"))
+        with self.assertRaises(requests_exceptions.JSONDecodeError):
+            response.json()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+import wl_attributes
+from tests.synthetic import SyntheticTempo
+
+
+class TestAttributeIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tenant = SyntheticTempo(worklogs=1_000)
+        self.worklogs = [{"tempo_id": i, "updated": "2024-02-01T10:00:00Z"} for i in range(1, 1_001)]
+
+    def test_only_updated_worklogs_are_reloaded(self):
+        state = {}
+        first = wl_attributes.run(self.tenant.client(), self.worklogs,
+                                  index=wl_attributes.AttributeIndex(state, "2024-01-01"))
+        self.assertEqual(2_000, len(first["worklog_attributes"]))
+
+        self.worklogs[5]["updated"] = "2024-02-02T08:00:00Z"
+        second = wl_attributes.run(self.tenant.client(), self.worklogs,
+                                   index=wl_attributes.AttributeIndex(state, "2024-01-01"))
+        self.assertEqual({6}, {row["tempo_worklog_id"] for row in second["worklog_attributes"]})
+        # attribute config is still downloaded to detect changes
+        self.assertEqual(2, len(second["worklog_attributes_config"]))
+
+    def test_worklogs_not_updated_since_are_forgotten(self):
+        state = {wl_attributes.STATE_KEY: {"updated": {"1": "2023-12-31T10:00:00Z", "2": "2024-01-02T10:00:00Z"}}}
+        wl_attributes.AttributeIndex(state, "2024-01-01")
+        self.assertEqual({"2": "2024-01-02T10:00:00Z"}, state[wl_attributes.STATE_KEY]["updated"])
+
+    def test_config_hash(self):
+        index = wl_attributes.AttributeIndex({}, "2024-01-01")
+        configs = self.tenant.client().attribute_config()
+        self.assertTrue(index.config_changed(configs))
+        index.mark_config(configs)
+        self.assertFalse(index.config_changed(list(reversed(configs))))
+        configs[0]["attribute_name"] = "renamed"
+        self.assertTrue(index.config_changed(configs))
+
+
+if __name__ == "__main__":
+    unittest.main()
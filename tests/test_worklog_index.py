@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+import unittest
+
+import approvals
+import worklogs
+from tests.synthetic import SyntheticTempo
+from worklog_index import WorklogIndex
+
+
+def row(tempo_id: int, author: str, start_utc: str, seconds: int) -> dict:
+    return {
+        worklogs._COL_ID: tempo_id,
+        worklogs._COL_AUTHOR_ACCOUNT_ID: author,
+        worklogs._COL_START_DATE_TIME_UTC: start_utc,
+        worklogs._COL_TIME_SPENT_SECONDS: seconds,
+    }
+
+
+def approval(author: str, period_from: str, period_to: str, seconds: int) -> dict:
+    return {"user": {"accountId": author}, "period": {"from": period_from, "to": period_to},
+            "timeSpentSeconds": seconds}
+
+
+class TestWorklogIndex(unittest.TestCase):
+
+    def test_approval_worklogs_are_the_same_as_from_the_api(self):
+        since = datetime.now() - timedelta(weeks=4)
+        tenant = SyntheticTempo(worklogs=5_000, teams=3, members_per_team=4, start=since.date())
+        client = tenant.client()
+        expected = approvals.run(client, since, approvals.LOAD_TEMPO_WORKLOGS)
+        paged = tenant.requests
+
+        index = WorklogIndex()
+        index.add_page(worklogs.run(client, since))
+        before = tenant.requests
+        actual = approvals.run(client, since, approvals.LOAD_TEMPO_WORKLOGS, worklog_index=index)
+        self.assertEqual(expected[0], actual[0])
+        key = lambda wl: (wl["approval_id"], wl["worklog_id"])  # noqa: E731
+        self.assertEqual(sorted(expected[1], key=key), sorted(actual[1], key=key))
+        self.assertGreater(index.resolved, index.missed)
+        self.assertLess(tenant.requests - before, paged / 2)
+
+    def test_local_period_of_an_author_east_of_utc(self):
+        index = WorklogIndex()
+        # UTC+2: monday 00:00 is sunday 22:00 UTC, the next monday 00:00 is out of the period
+        index.add_page([
+            row(1, "a", "2024-01-07T22:00:00Z", 3_600),
+            row(2, "a", "2024-01-10T08:00:00Z", 7_200),
+            row(3, "a", "2024-01-14T22:00:00Z", 1_800),
+            row(4, "b", "2024-01-10T08:00:00Z", 600),
+        ])
+        self.assertEqual([1, 2], index.resolve(approval("a", "2024-01-08", "2024-01-14", 10_800)))
+        # the worklogs of the api do not add up to the indexed ones
+        self.assertIsNone(index.resolve(approval("a", "2024-01-08", "2024-01-14", 12_000)))
+        self.assertEqual(1, index.missed)
+
+    def test_ambiguous_period_is_left_to_the_api_until_the_offset_is_learned(self):
+        index = WorklogIndex()
+        index.add_page([
+            row(1, "a", "2024-01-07T22:00:00Z", 3_600),
+            row(2, "a", "2024-01-10T08:00:00Z", 7_200),
+            row(3, "a", "2024-01-14T22:00:00Z", 3_600),
+            row(4, "a", "2024-01-21T22:00:00Z", 3_600),
+            row(5, "a", "2024-01-28T22:00:00Z", 3_600),
+        ])
+        first = approval("a", "2024-01-08", "2024-01-14", 10_800)
+        # UTC+2 (1, 2) or UTC (2, 3) add up to the same time
+        self.assertIsNone(index.resolve(first))
+        index.learn(first, [1, 2])
+        self.assertEqual([3], index.resolve(approval("a", "2024-01-15", "2024-01-21", 3_600)))
+        self.assertEqual([4], index.resolve(approval("a", "2024-01-22", "2024-01-28", 3_600)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+from datetime import datetime
+import unittest
+
+import team_membership
+import worklogs
+from tests.synthetic import SyntheticTempo
+
+
+class TestPartitionedWorklogs(unittest.TestCase):
+
+    def setUp(self):
+        self.tenant = SyntheticTempo(worklogs=2_500, teams=4, members_per_team=10, projects=7, max_page_size=100)
+        self.since = datetime(2024, 1, 1)
+        self.expected = sorted(wl["tempo_id"] for wl in worklogs.run(self.tenant.client(), self.since))
+
+    def test_accounts_strategy_loads_same_worklogs(self):
+        client = self.tenant.client()
+        accounts = team_membership.account_ids(team_membership.run(client))
+        data = worklogs.run(client, self.since, strategy=worklogs.STRATEGY_ACCOUNTS, partitions=accounts)
+        self.assertEqual(self.expected, sorted(wl["tempo_id"] for wl in data))
+
+    def test_projects_strategy_streams_deduplicated_pages(self):
+        pages = []
+        # repeated partitions must not produce duplicate rows
+        projects = [str(p) for p in range(1, 8)] * 2
+        worklogs.run(self.tenant.client(), self.since, pages.append,
+                     strategy=worklogs.STRATEGY_PROJECTS, partitions=projects, max_workers=3)
+        ids = [wl["tempo_id"] for page in pages for wl in page]
+        self.assertEqual(self.expected, sorted(ids))
+
+
+if __name__ == "__main__":
+    unittest.main()